@@ -240,3 +240,6 @@ CONST_WEEKINDEX_LAST = "Last"
 CONST_DEFAULT_CONFIGURATION_NAME = "default"
 CONST_AUTOUPGRADE_CONFIGURATION_NAME = "aksManagedAutoUpgradeSchedule"
 CONST_NODEOSUPGRADE_CONFIGURATION_NAME = "aksManagedNodeOSUpgradeSchedule"
+
+# consts for parallel node image upgrades
+CONST_NODE_POOL_OPERATION_POLLING_INTERVAL = 15
@@ -614,9 +614,14 @@ helps['aks upgrade'] = """
         - name: --aks-custom-headers
           type: string
           short-summary: Send custom headers. When specified, format should be Key1=Value1,Key2=Value2
+        - name: --max-parallel-pools
+          type: int
+          short-summary: Upgrade the node image of at most this many node pools at a time and wait for all of them to finish, printing the progress of each node pool. Only used with --node-image-only.
     examples:
       - name: Upgrade a existing managed cluster to a managed cluster snapshot.
         text: az aks upgrade -g MyResourceGroup -n MyManagedCluster --cluster-snapshot-id "/subscriptions/00000/resourceGroups/AnotherResourceGroup/providers/Microsoft.ContainerService/managedclustersnapshots/mysnapshot1"
+      - name: Upgrade the node image of every node pool, three node pools at a time.
+        text: az aks upgrade -g MyResourceGroup -n MyManagedCluster --node-image-only --max-parallel-pools 3
 """
 
 helps['aks update'] = """
@@ -8,8 +8,9 @@ import platform
 import re
 import stat
 import tempfile
+import time
 import yaml
-from typing import Any, List, TypeVar
+from typing import Any, Callable, Dict, List, TypeVar
 from azure.cli.command_modules.acs._helpers import map_azure_error_to_cli_error
 from azure.cli.core.azclierror import InvalidArgumentValueError, ResourceNotFoundError
 from azure.core.exceptions import AzureError
@@ -18,6 +19,7 @@ from knack.prompting import NoTTYException, prompt_y_n
 from knack.util import CLIError
 
 from azext_aks_preview._client_factory import get_nodepool_snapshots_client, get_mc_snapshots_client
+from azext_aks_preview._consts import CONST_NODE_POOL_OPERATION_POLLING_INTERVAL
 
 logger = get_logger(__name__)
 
@@ -282,3 +284,63 @@ def check_is_apiserver_vnet_integration_cluster(mc: ManagedCluster) -> bool:
     if mc and mc.api_server_access_profile:
         return bool(mc.api_server_access_profile.enable_vnet_integration)
     return False
+
+
+def format_node_pool_progress(statuses: Dict[str, str], elapsed: Dict[str, float]) -> str:
+    """Format the status of each node pool operation as a table."""
+    width = max([len("Node pool")] + [len(name) for name in statuses])
+    lines = ["{}  {:<12}  {}".format("Node pool".ljust(width), "Status", "Elapsed")]
+    for name, status in statuses.items():
+        seconds = int(elapsed.get(name, 0))
+        lines.append("{}  {:<12}  {}m{:02d}s".format(name.ljust(width), status, seconds // 60, seconds % 60))
+    return "\n".join(lines)
+
+
+def run_node_pool_operations(
+    start_operation: Callable[[str], Any],
+    nodepool_names: List[str],
+    max_parallel: int,
+    polling_interval: float = CONST_NODE_POOL_OPERATION_POLLING_INTERVAL,
+) -> Dict[str, Exception]:
+    """Run a long running operation on each node pool, at most `max_parallel` at a time.
+
+    `start_operation` starts the operation on a node pool and returns its poller. All the pollers in flight are checked
+    by the same loop, which starts the operation on the next node pool as soon as one finishes and logs a table of the
+    progress of every node pool whenever it changes.
+    :return: the errors of the node pools whose operation failed, keyed by node pool name
+    """
+    pending = list(nodepool_names)
+    statuses = {name: "Waiting" for name in nodepool_names}
+    started, elapsed, running, errors = {}, {}, {}, {}
+    last_progress = None
+    while pending or running:
+        while pending and len(running) < max_parallel:
+            name = pending.pop(0)
+            started[name] = time.time()
+            try:
+                running[name] = start_operation(name)
+                statuses[name] = "InProgress"
+            except (AzureError, CLIError) as ex:
+                statuses[name] = "Failed"
+                errors[name] = ex
+
+        for name, poller in list(running.items()):
+            elapsed[name] = time.time() - started[name]
+            if not poller.done():
+                continue
+            del running[name]
+            try:
+                poller.result()
+                statuses[name] = "Succeeded"
+            except (AzureError, CLIError) as ex:
+                statuses[name] = "Failed"
+                errors[name] = ex
+
+        progress = [(name, statuses[name]) for name in nodepool_names]
+        if progress != last_progress:
+            logger.warning(format_node_pool_progress(statuses, elapsed))
+            last_progress = progress
+        # only wait when no operation can be started on the next node pool
+        if running and (not pending or len(running) >= max_parallel):
+            time.sleep(polling_interval)
+    return {name: errors[name] for name in nodepool_names if name in errors}
@@ -117,6 +117,7 @@ from azext_aks_preview._validators import (
     validate_max_surge,
     validate_message_of_the_day,
     validate_nat_gateway_idle_timeout,
+    validate_max_parallel_pools,
     validate_nat_gateway_managed_outbound_ip_count,
     validate_nodepool_id,
     validate_nodepool_labels,
@@ -517,6 +518,7 @@ def load_arguments(self, _):
         c.argument('kubernetes_version', completer=get_k8s_upgrades_completion_list)
         c.argument('cluster_snapshot_id', validator=validate_cluster_snapshot_id, is_preview=True)
         c.argument('yes', options_list=['--yes', '-y'], help='Do not prompt for confirmation.', action='store_true')
+        c.argument('max_parallel_pools', type=int, validator=validate_max_parallel_pools, is_preview=True)
 
     with self.argument_context('aks scale') as c:
         c.argument('nodepool_name', help='Node pool name, upto 12 alphanumeric characters', validator=validate_nodepool_name)
@@ -348,6 +348,18 @@ def validate_nat_gateway_managed_outbound_ip_count(namespace):
                 "--nat-gateway-managed-outbound-ip-count must be in the range [1,16]")
 
 
+def validate_max_parallel_pools(namespace):
+    """validate the number of node pools upgraded at the same time"""
+    if namespace.max_parallel_pools is not None:
+        if namespace.max_parallel_pools < 1:
+            raise InvalidArgumentValueError("--max-parallel-pools must be at least 1")
+        if not namespace.node_image_only:
+            raise RequiredArgumentMissingError("--max-parallel-pools can only be used with --node-image-only")
+        if namespace.no_wait:
+            raise MutuallyExclusiveArgumentError("--max-parallel-pools waits for the node pools to be upgraded "
+                                                 "and cannot be used with --no-wait")
+
+
 def validate_nat_gateway_idle_timeout(namespace):
     """validate NAT gateway profile idle timeout"""
     if namespace.nat_gateway_idle_timeout is not None:
@@ -387,7 +387,7 @@ def _display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-m
         universal_newlines=True)
     logger.debug(nodes)
     node_lines = nodes.splitlines()
-    ready_nodes = {}
+    ready_nodes = []
     for node_line in node_lines:
         columns = node_line.split()
         logger.debug(node_line)
@@ -395,7 +395,7 @@ def _display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-m
             logger.warning(
                 "Node %s is not Ready. Current state is: %s.", columns[0], columns[1])
         else:
-            ready_nodes[columns[0]] = False
+            ready_nodes.append(columns[0])
 
     logger.debug('There are %s ready nodes in the cluster',
                  str(len(ready_nodes)))
@@ -404,65 +404,8 @@ def _display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-m
         logger.warning(
             'No nodes are ready in the current cluster. Diagnostics info might not be available.')
 
-    network_config_array = []
-    network_status_array = []
-    apds_created = False
-
-    max_retry = 10
-    for retry in range(0, max_retry):
-        if not apds_created:
-            apd = subprocess.check_output(
-                ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get",
-                    "apd", "-n", CONST_PERISCOPE_NAMESPACE, "--no-headers"],
-                universal_newlines=True
-            )
-            apd_lines = apd.splitlines()
-            if apd_lines and 'No resources found' in apd_lines[0]:
-                apd_lines.pop(0)
-
-            print("Got {} diagnostic results for {} ready nodes{}\r".format(len(apd_lines),
-                                                                            len(ready_nodes),
-                                                                            '.' * retry), end='')
-            if len(apd_lines) < len(ready_nodes):
-                time.sleep(3)
-            else:
-                apds_created = True
-                print()
-        else:
-            for node_name in ready_nodes:
-                if ready_nodes[node_name]:
-                    continue
-                apdName = "aks-periscope-diagnostic-" + node_name
-                try:
-                    network_config = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         CONST_PERISCOPE_NAMESPACE, "-o=jsonpath={.spec.networkconfig}"],
-                        universal_newlines=True)
-                    logger.debug('Dns status for node %s is %s',
-                                 node_name, network_config)
-                    network_status = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         CONST_PERISCOPE_NAMESPACE, "-o=jsonpath={.spec.networkoutbound}"],
-                        universal_newlines=True)
-                    logger.debug('Network status for node %s is %s',
-                                 node_name, network_status)
-
-                    if not network_config or not network_status:
-                        print("The diagnostics information for node {} is not ready yet. "
-                              "Will try again in 10 seconds.".format(node_name))
-                        time.sleep(10)
-                        break
-
-                    network_config_array += json.loads(
-                        '[' + network_config + ']')
-                    network_status_object = json.loads(network_status)
-                    network_status_array += _format_diag_status(
-                        network_status_object)
-                    ready_nodes[node_name] = True
-                except subprocess.CalledProcessError as err:
-                    raise CLIError(err.output)
+    network_config_array, network_status_array = _collect_diagnostics_results(
+        temp_kubeconfig_path, ready_nodes)
 
     print()
     if network_config_array:
@@ -483,6 +426,70 @@ def _display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-m
                        "Please run 'az aks kanalyze' command later to get the analysis results.")
 
 
+def _get_periscope_diagnostics(temp_kubeconfig_path):
+    """Get the spec of every aks-periscope diagnostic in one call, keyed by name."""
+    try:
+        apds = subprocess.check_output(
+            ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get",
+             "apd", "-n", CONST_PERISCOPE_NAMESPACE, "-o", "json"],
+            universal_newlines=True)
+    except subprocess.CalledProcessError as err:
+        raise CLIError(err.output)
+    return {item["metadata"]["name"]: item.get("spec") or {}
+            for item in json.loads(apds).get("items", [])}
+
+
+def _collect_diagnostics_results(temp_kubeconfig_path, ready_nodes):
+    """Poll the diagnostics of every node until each node has reported its network config and status.
+
+    Each poll lists the diagnostics of all nodes at once and only the nodes that have not reported yet are checked.
+    """
+    start = time.time()
+    results = {}
+    outstanding = set(ready_nodes)
+    max_retry = 10
+    for retry in range(0, max_retry):
+        apds = _get_periscope_diagnostics(temp_kubeconfig_path)
+        created = 0
+        for node_name in ready_nodes:
+            spec = apds.get("aks-periscope-diagnostic-" + node_name)
+            if spec is None:
+                continue
+            created += 1
+            if node_name not in outstanding:
+                continue
+            network_config = spec.get("networkconfig")
+            network_status = spec.get("networkoutbound")
+            logger.debug('Dns status for node %s is %s', node_name, network_config)
+            logger.debug('Network status for node %s is %s', node_name, network_status)
+            if network_config and network_status:
+                results[node_name] = (json.loads('[' + network_config + ']'),
+                                      _format_diag_status(json.loads(network_status)))
+                outstanding.discard(node_name)
+
+        print("Got {} diagnostic results for {} ready nodes{}\r".format(len(ready_nodes) - len(outstanding),
+                                                                        len(ready_nodes),
+                                                                        '.' * retry), end='')
+        if not outstanding or retry == max_retry - 1:
+            break
+        # wait less while the diagnostics are still being created
+        time.sleep(3 if created < len(ready_nodes) else 10)
+
+    print()
+    if outstanding:
+        logger.warning("The diagnostics information for node(s) %s is not ready yet.", ", ".join(sorted(outstanding)))
+    logger.warning("Collected the diagnostics of %s of %s ready nodes in %.1f seconds",
+                   len(results), len(ready_nodes), time.time() - start)
+
+    network_config_array = []
+    network_status_array = []
+    for node_name in ready_nodes:
+        if node_name in results:
+            network_config_array += results[node_name][0]
+            network_status_array += results[node_name][1]
+    return network_config_array, network_status_array
+
+
 def _cloud_storage_account_service_factory(cli_ctx, kwargs):
     from azure.cli.core.profiles import ResourceType, get_sdk
     t_cloud_storage_account = get_sdk(
@@ -89,7 +89,12 @@ from azext_aks_preview._consts import (
     CONST_VIRTUAL_NODE_ADDON_NAME,
     CONST_VIRTUAL_NODE_SUBNET_NAME,
 )
-from azext_aks_preview._helpers import print_or_merge_credentials, get_nodepool_snapshot_by_snapshot_id, get_cluster_snapshot_by_snapshot_id
+from azext_aks_preview._helpers import (
+    get_cluster_snapshot_by_snapshot_id,
+    get_nodepool_snapshot_by_snapshot_id,
+    print_or_merge_credentials,
+    run_node_pool_operations,
+)
 from azext_aks_preview._podidentity import (
     _ensure_managed_identity_operator_permission,
     _ensure_pod_identity_addon_is_enabled,
@@ -997,7 +1002,8 @@ def aks_upgrade(cmd,    # pylint: disable=unused-argument, too-many-return-state
                 node_image_only=False,
                 cluster_snapshot_id=None,
                 aks_custom_headers=None,
-                yes=False):
+                yes=False,
+                max_parallel_pools=None):
     msg = 'Kubernetes may be unavailable during cluster upgrades.\n Are you sure you want to perform this operation?'
     if not yes and not prompt_y_n(msg, default="n"):
         return None
@@ -1016,22 +1022,8 @@ def aks_upgrade(cmd,    # pylint: disable=unused-argument, too-many-return-state
                        'If you only want to upgrade the node version please use the "--node-image-only" option only.')
 
     if node_image_only:
-        msg = "This node image upgrade operation will run across every node pool in the cluster " \
-              "and might take a while. Do you wish to continue?"
-        if not yes and not prompt_y_n(msg, default="n"):
-            return None
-
-        # This only provide convenience for customer at client side so they can run az aks upgrade to upgrade all
-        # nodepools of a cluster. The SDK only support upgrade single nodepool at a time.
-        for agent_pool_profile in instance.agent_pool_profiles:
-            if vmas_cluster:
-                raise CLIError('This cluster is not using VirtualMachineScaleSets. Node image upgrade only operation '
-                               'can only be applied on VirtualMachineScaleSets cluster.')
-            agent_pool_client = cf_agent_pools(cmd.cli_ctx)
-            _upgrade_single_nodepool_image_version(
-                True, agent_pool_client, resource_group_name, name, agent_pool_profile.name, None)
-        mc = client.get(resource_group_name, name)
-        return _remove_nulls([mc])[0]
+        return _upgrade_all_nodepool_images(cmd, client, resource_group_name, name, instance, vmas_cluster, yes,
+                                            max_parallel_pools)
 
     if cluster_snapshot_id:
         CreationData = cmd.get_models(
@@ -1091,6 +1083,37 @@ def aks_upgrade(cmd,    # pylint: disable=unused-argument, too-many-return-state
     return sdk_no_wait(no_wait, client.begin_create_or_update, resource_group_name, name, instance, headers=headers)
 
 
+def _upgrade_all_nodepool_images(cmd, client, resource_group_name, name, instance, vmas_cluster, yes,
+                                 max_parallel_pools):
+    msg = "This node image upgrade operation will run across every node pool in the cluster " \
+          "and might take a while. Do you wish to continue?"
+    if not yes and not prompt_y_n(msg, default="n"):
+        return None
+
+    # This only provide convenience for customer at client side so they can run az aks upgrade to upgrade all
+    # nodepools of a cluster. The SDK only support upgrade single nodepool at a time.
+    if vmas_cluster:
+        raise CLIError('This cluster is not using VirtualMachineScaleSets. Node image upgrade only operation '
+                       'can only be applied on VirtualMachineScaleSets cluster.')
+    agent_pool_client = cf_agent_pools(cmd.cli_ctx)
+    nodepool_names = [agent_pool_profile.name for agent_pool_profile in instance.agent_pool_profiles]
+    if max_parallel_pools:
+        errors = run_node_pool_operations(
+            lambda nodepool_name: _upgrade_single_nodepool_image_version(
+                False, agent_pool_client, resource_group_name, name, nodepool_name, None),
+            nodepool_names,
+            max_parallel_pools)
+        if errors:
+            raise CLIError('Failed to upgrade the node image of node pool(s) {}:\n{}'.format(
+                ', '.join(errors), '\n'.join('{}: {}'.format(pool, error) for pool, error in errors.items())))
+    else:
+        for nodepool_name in nodepool_names:
+            _upgrade_single_nodepool_image_version(
+                True, agent_pool_client, resource_group_name, name, nodepool_name, None)
+    mc = client.get(resource_group_name, name)
+    return _remove_nulls([mc])[0]
+
+
 def _upgrade_single_nodepool_image_version(no_wait, client, resource_group_name, cluster_name, nodepool_name, snapshot_id=None):
     headers = {}
     if snapshot_id:
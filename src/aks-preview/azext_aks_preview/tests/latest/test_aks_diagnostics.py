@@ -3,7 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
 import unittest
+from unittest import mock
+
 import azext_aks_preview.aks_diagnostics as commands
 
 
@@ -27,5 +30,44 @@ class TestGenerateContainerName(unittest.TestCase):
         self.assertEqual(expected_container_name, trim_container_name)
 
 
+def _apd_list(specs):
+    return json.dumps({"items": [{"metadata": {"name": "aks-periscope-diagnostic-" + node}, "spec": spec}
+                                 for node, spec in specs.items()]})
+
+
+class TestCollectDiagnosticsResults(unittest.TestCase):
+    ready = {"networkconfig": '{"HostName": "%s"}', "networkoutbound": '{"Type": "DNS"}'}
+
+    def _spec(self, node):
+        return {"networkconfig": self.ready["networkconfig"] % node, "networkoutbound": self.ready["networkoutbound"]}
+
+    @mock.patch("azext_aks_preview.aks_diagnostics._format_diag_status", side_effect=lambda status: [status])
+    @mock.patch("azext_aks_preview.aks_diagnostics.time.sleep")
+    def test_only_outstanding_nodes_are_polled(self, sleep, _format):
+        polls = [
+            _apd_list({"node1": self._spec("node1")}),
+            _apd_list({"node1": self._spec("node1"), "node2": {}}),
+            _apd_list({"node1": {}, "node2": self._spec("node2")}),
+        ]
+        with mock.patch("azext_aks_preview.aks_diagnostics.subprocess.check_output", side_effect=polls) as kubectl:
+            network_config, network_status = commands._collect_diagnostics_results("kubeconfig", ["node1", "node2"])
+
+        self.assertEqual(kubectl.call_count, 3)
+        self.assertIn("json", kubectl.call_args[0][0])
+        # node1 reported in the first poll and is not read again
+        self.assertEqual(network_config, [{"HostName": "node1"}, {"HostName": "node2"}])
+        self.assertEqual(network_status, [{"Type": "DNS"}, {"Type": "DNS"}])
+        # polls are shorter while diagnostics are still being created
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [3, 10])
+
+    @mock.patch("azext_aks_preview.aks_diagnostics.time.sleep")
+    def test_gives_up_after_max_retry(self, sleep):
+        with mock.patch("azext_aks_preview.aks_diagnostics.subprocess.check_output",
+                        return_value=_apd_list({})) as kubectl:
+            self.assertEqual(commands._collect_diagnostics_results("kubeconfig", ["node1"]), ([], []))
+        self.assertEqual(kubectl.call_count, 10)
+        self.assertEqual(sleep.call_count, 9)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,10 +8,12 @@ from unittest.mock import Mock, patch
 
 from azext_aks_preview._helpers import (
     _fuzzy_match,
+    format_node_pool_progress,
     get_cluster_snapshot,
     get_cluster_snapshot_by_snapshot_id,
     get_nodepool_snapshot,
     get_nodepool_snapshot_by_snapshot_id,
+    run_node_pool_operations,
 )
 from azure.cli.core.azclierror import (
     BadRequestError,
@@ -111,5 +113,73 @@ class GetManagedClusterSnapShotTestCase(unittest.TestCase):
             get_cluster_snapshot("mock_cli_ctx", "test_sub", "mock_rg", "mock_snapshot_name")
 
 
+
+class MockPoller:
+    def __init__(self, polls, error=None):
+        self.polls = polls
+        self.error = error
+
+    def done(self):
+        self.polls -= 1
+        return self.polls < 0
+
+    def result(self):
+        if self.error:
+            raise self.error
+
+
+class TestRunNodePoolOperations(unittest.TestCase):
+    def test_bounded_window(self):
+        running = []
+        max_running = []
+
+        def start_operation(nodepool_name):
+            running.append(nodepool_name)
+            max_running.append(len(running))
+            poller = MockPoller(polls=int(nodepool_name[-1]))
+            original_result = poller.result
+
+            def result():
+                running.remove(nodepool_name)
+                return original_result()
+
+            poller.result = result
+            return poller
+
+        names = ["pool{}".format(i) for i in range(5)]
+        with patch("azext_aks_preview._helpers.time.sleep") as sleep:
+            errors = run_node_pool_operations(start_operation, names, 2, polling_interval=1)
+        self.assertEqual(errors, {})
+        self.assertEqual(max(max_running), 2)
+        self.assertEqual(running, [])
+        self.assertTrue(sleep.called)
+
+    def test_failed_node_pools(self):
+        error = AzureError("upgrade failed")
+        pollers = {"pool1": MockPoller(polls=1), "pool2": MockPoller(polls=0, error=error)}
+
+        def start_operation(nodepool_name):
+            if nodepool_name == "pool3":
+                raise HttpResponseError("conflict")
+            return pollers[nodepool_name]
+
+        with patch("azext_aks_preview._helpers.time.sleep"), \
+                patch("azext_aks_preview._helpers.logger.warning") as warning:
+            errors = run_node_pool_operations(start_operation, ["pool1", "pool2", "pool3"], 3)
+        self.assertEqual(list(errors), ["pool2", "pool3"])
+        self.assertIs(errors["pool2"], error)
+        last_progress = warning.call_args[0][0]
+        self.assertIn("pool1      Succeeded", last_progress)
+        self.assertIn("pool2      Failed", last_progress)
+
+    def test_format_node_pool_progress(self):
+        self.assertEqual(
+            format_node_pool_progress({"nodepool1": "InProgress", "np2": "Waiting"}, {"nodepool1": 125}),
+            "Node pool  Status        Elapsed\n"
+            "nodepool1  InProgress    2m05s\n"
+            "np2        Waiting       0m00s",
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,7 +6,11 @@ import unittest
 from types import SimpleNamespace
 
 from azure.cli.core.util import CLIError
-from azure.cli.core.azclierror import InvalidArgumentValueError
+from azure.cli.core.azclierror import (
+    InvalidArgumentValueError,
+    MutuallyExclusiveArgumentError,
+    RequiredArgumentMissingError,
+)
 import azext_aks_preview._validators as validators
 from azext_aks_preview._consts import ADDONS
 
@@ -638,5 +642,27 @@ class TestValidateMaintenanceWindow(unittest.TestCase):
         validators.validate_start_time(namespace)
 
 
+
+class MaxParallelPoolsNamespace:
+    def __init__(self, max_parallel_pools, node_image_only=True, no_wait=False):
+        self.max_parallel_pools = max_parallel_pools
+        self.node_image_only = node_image_only
+        self.no_wait = no_wait
+
+
+class TestValidateMaxParallelPools(unittest.TestCase):
+    def test_valid_max_parallel_pools(self):
+        validators.validate_max_parallel_pools(MaxParallelPoolsNamespace(None, node_image_only=False))
+        validators.validate_max_parallel_pools(MaxParallelPoolsNamespace(3))
+
+    def test_invalid_max_parallel_pools(self):
+        with self.assertRaises(InvalidArgumentValueError):
+            validators.validate_max_parallel_pools(MaxParallelPoolsNamespace(0))
+        with self.assertRaises(RequiredArgumentMissingError):
+            validators.validate_max_parallel_pools(MaxParallelPoolsNamespace(3, node_image_only=False))
+        with self.assertRaises(MutuallyExclusiveArgumentError):
+            validators.validate_max_parallel_pools(MaxParallelPoolsNamespace(3, no_wait=True))
+
+
 if __name__ == "__main__":
     unittest.main()
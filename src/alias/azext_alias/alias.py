@@ -4,7 +4,6 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
 import json
 import shlex
 import hashlib
@@ -12,23 +11,24 @@ from collections import defaultdict
 
 from knack.log import get_logger
 
-import azext_alias
 from azext_alias import telemetry
 from azext_alias._const import (
     GLOBAL_CONFIG_DIR,
     ALIAS_FILE_NAME,
     ALIAS_HASH_FILE_NAME,
     COLLIDED_ALIAS_FILE_NAME,
+    ALIAS_INDEX_FILE_NAME,
     CONFIG_PARSING_ERROR,
     DEBUG_MSG,
     COLLISION_CHECK_LEVEL_DEPTH,
     POS_ARG_DEBUG_MSG
 )
-from azext_alias.argument import build_pos_args_table, render_template
+from azext_alias.index import AliasIndex
 from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_config_parser,
+    get_reserved_command_trie,
     build_tab_completion_table
 )
 
@@ -36,6 +36,7 @@ from azext_alias.util import (
 GLOBAL_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_FILE_NAME)
 GLOBAL_ALIAS_HASH_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_HASH_FILE_NAME)
 GLOBAL_COLLIDED_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, COLLIDED_ALIAS_FILE_NAME)
+GLOBAL_ALIAS_INDEX_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_INDEX_FILE_NAME)
 
 logger = get_logger(__name__)
 
@@ -48,8 +49,25 @@ class AliasManager(object):
         self.collided_alias = defaultdict(list)
         self.alias_config_str = ''
         self.alias_config_hash = ''
-        self.load_alias_table()
-        self.load_alias_hash()
+        self.alias_config_stat = None
+        # The alias config file is only parsed when it has changed since the alias index was compiled
+        self.alias_index = self.load_alias_index()
+        if self.alias_index is None:
+            self.load_alias_table()
+            self.load_alias_hash()
+
+    def load_alias_index(self):
+        """
+        Load the compiled alias index.
+
+        Returns:
+            The alias index, None if the alias config file has changed since the alias index was compiled.
+        """
+        self.alias_config_stat = AliasIndex.stat(GLOBAL_ALIAS_PATH)
+        alias_index = AliasIndex.load(GLOBAL_ALIAS_INDEX_PATH, self.alias_config_stat)
+        if alias_index is not None:
+            telemetry.set_number_of_aliases_registered(len(alias_index))
+        return alias_index
 
     def load_alias_table(self):
         """
@@ -118,18 +136,24 @@ class AliasManager(object):
         Returns:
             A list of transformed commands according to the alias configuration file.
         """
-        if self.parse_error():
+        if self.alias_index is not None:
+            self.collided_alias = self.alias_index.collided_alias
+        elif self.parse_error():
             # Write an empty hash so next run will check the config file against the entire command table again
             AliasManager.write_alias_config_hash(empty_hash=True)
             return args
-
-        # Only load the entire command table if it detects changes in the alias config
-        if self.detect_alias_config_change():
-            self.load_full_command_table()
-            self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
-            build_tab_completion_table(self.alias_table)
         else:
-            self.load_collided_alias()
+            # Only load the entire command table if it detects changes in the alias config
+            if self.detect_alias_config_change():
+                self.load_full_command_table()
+                self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
+                build_tab_completion_table(self.alias_table)
+                AliasManager.write_alias_config_hash(self.alias_config_hash)
+                AliasManager.write_collided_alias(self.collided_alias)
+            else:
+                self.load_collided_alias()
+            self.alias_index = AliasIndex.compile(self.alias_table, self.collided_alias, self.alias_config_stat)
+            self.alias_index.save(GLOBAL_ALIAS_INDEX_PATH)
 
         transformed_commands = []
         alias_iter = enumerate(args, 1)
@@ -144,16 +168,23 @@ class AliasManager(object):
                 transformed_commands.append(alias)
                 continue
 
-            full_alias = self.get_full_alias(alias)
+            full_alias, alias_entry = self.alias_index.get(alias)
 
-            if self.alias_table.has_option(full_alias, 'command'):
-                cmd_derived_from_alias = self.alias_table.get(full_alias, 'command')
+            if alias_entry:
+                cmd_derived_from_alias = alias_entry['command']
                 telemetry.set_alias_hit(full_alias)
             else:
                 transformed_commands.append(alias)
                 continue
 
-            pos_args_table = build_pos_args_table(full_alias, args, alias_index)
+            if alias_entry['tokens'] is not None:
+                logger.debug(DEBUG_MSG, full_alias, cmd_derived_from_alias)
+                transformed_commands += alias_entry['tokens']
+                continue
+
+            # Jinja is only imported when an alias with positional arguments is used
+            from azext_alias.argument import build_pos_args_table, render_template
+            pos_args_table = build_pos_args_table(full_alias, args, alias_index, alias_entry['placeholders'])
             if pos_args_table:
                 logger.debug(POS_ARG_DEBUG_MSG, full_alias, cmd_derived_from_alias, pos_args_table)
                 transformed_commands += render_template(cmd_derived_from_alias, pos_args_table)
@@ -177,6 +208,9 @@ class AliasManager(object):
         Returns:
             The full alias (with the placeholders, if any).
         """
+        if self.alias_index is not None:
+            return self.alias_index.get(query)[0]
+
         if query in self.alias_table.sections():
             return query
 
@@ -192,7 +226,7 @@ class AliasManager(object):
 
     def post_transform(self, args):
         """
-        Inject environment variables, and write hash to alias hash file after transforming alias to commands.
+        Inject environment variables after transforming alias to commands.
 
         Args:
             args: A list of args to post-transform.
@@ -208,9 +242,6 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
-
         return post_transform_commands
 
     def parse_error(self):
@@ -246,14 +277,13 @@ class AliasManager(object):
             levels: the amount of levels we tranverse through the command table tree.
         """
         collided_alias = defaultdict(list)
+        reserved_command_trie = get_reserved_command_trie()
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level in reserved_command_trie.get_levels(word.lower()):
+                if level <= levels and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
@@ -66,3 +66,34 @@ class CommandBranch(CommandTree):
     """ represents a branch of the tree """
     def __init__(self, data, children=None):
         CommandTree.__init__(self, data, children=children)
+
+
+class ReservedCommandTrie(CommandHead):
+    """ the reserved commands as a tree of words, where every word is indexed by its branches """
+
+    def __init__(self, reserved_commands):
+        CommandHead.__init__(self)
+        # word -> [(level, parent command, branch)] in the order they first appear in reserved_commands
+        self.branches_by_word = {}
+        for reserved_command in reserved_commands:
+            tree = self
+            words = reserved_command.split()
+            for level, word in enumerate(words, 1):
+                if not tree.has_child(word):
+                    tree.add_child(CommandBranch(word))
+                    self.branches_by_word.setdefault(word, []).append(
+                        (level, ' '.join(words[:level - 1]), tree.get_child(word)))
+                tree = tree.get_child(word)
+
+    def get_levels(self, word):
+        """ the levels of the tree at which word is a reserved command """
+        return sorted({level for level, _, _ in self.branches_by_word.get(word, [])})
+
+    def get_parent_commands(self, command):
+        """ the commands that command is a sub-command of, '' if command is a top level command """
+        words = command.split()
+        parent_commands = []
+        for _, parent_command, branch in self.branches_by_word.get(words[0] if words else None, []):
+            if branch.in_tree(words[1:]) and parent_command not in parent_commands:
+                parent_commands.append(parent_command)
+        return parent_commands
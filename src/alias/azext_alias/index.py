@@ -0,0 +1,151 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import shlex
+import tempfile
+
+from knack.log import get_logger
+from knack.util import CLIError
+
+from azext_alias.version import VERSION
+
+logger = get_logger(__name__)
+
+# An alias config file modified this recently may be modified again without changing its mtime
+RACY_CONFIG_SECONDS = 2
+
+
+class AliasIndex(object):
+    """
+    The alias configuration file compiled into a lookup table, cached on disk.
+
+    The index maps every word that invokes an alias to the full alias and its pre-tokenized command, so transforming
+    the arguments needs neither configparser nor a scan of the alias table. It is keyed by the modification time
+    and the size of the alias configuration file.
+    """
+
+    def __init__(self, aliases, entries, collided_alias, config_stat=None):
+        self.aliases = aliases
+        self.entries = entries
+        self.collided_alias = collided_alias
+        self.config_stat = config_stat
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, query):
+        """
+        Get the full alias and its compiled entry given a search query.
+
+        Args:
+            query: The query this function performs searching on.
+
+        Returns:
+            A tuple with [0] being the full alias (with the placeholders, if any) and [1] being its entry, which
+            is None if the query is not an alias or the alias has no command.
+        """
+        full_alias = self.aliases.get(query, '')
+        return full_alias, self.entries.get(full_alias)
+
+    @staticmethod
+    def stat(alias_path):
+        """
+        Get the key of the alias configuration file, None if the file does not exist.
+        """
+        try:
+            alias_stat = os.stat(alias_path)
+        except OSError:
+            return None
+        return [alias_stat.st_mtime_ns, alias_stat.st_size]
+
+    @staticmethod
+    def compile(alias_table, collided_alias, config_stat=None):
+        """
+        Compile the alias table.
+
+        Args:
+            alias_table: The alias table.
+            collided_alias: The collision table of the aliases.
+            config_stat: The key of the alias configuration file the alias table was read from.
+
+        Returns:
+            The alias index.
+        """
+        aliases = {}
+        entries = {}
+        for section in alias_table.sections():
+            words = section.split()
+            if words:
+                # The first alias starting with the word wins, like a linear scan of the alias table would
+                aliases.setdefault(words[0], section)
+            entries[section] = AliasIndex._compile_entry(alias_table, section)
+        # An exact match of the alias takes precedence
+        aliases.update({section: section for section in alias_table.sections()})
+        return AliasIndex(aliases, entries, dict(collided_alias), config_stat)
+
+    @staticmethod
+    def _compile_entry(alias_table, section):
+        from azext_alias.argument import get_placeholders
+
+        if not alias_table.has_option(section, 'command'):
+            return None
+
+        entry = {'command': alias_table.get(section, 'command'), 'tokens': None, 'placeholders': None}
+        try:
+            placeholders = get_placeholders(section, check_duplicates=True)
+            if placeholders:
+                entry['placeholders'] = placeholders
+            else:
+                entry['tokens'] = shlex.split(entry['command'])
+        except (CLIError, ValueError):
+            # Leave the entry uncompiled so the error is reported when the alias is used
+            pass
+        return entry
+
+    @staticmethod
+    def load(index_path, config_stat):
+        """
+        Load the alias index.
+
+        Returns:
+            The alias index, None if it does not exist or the alias configuration file has changed since.
+        """
+        if config_stat is None:
+            return None
+        try:
+            with open(index_path, 'r') as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(index, dict) or index.get('version') != VERSION or index.get('config') != config_stat:
+            return None
+        return AliasIndex(index['aliases'], index['entries'], index['collided_alias'], config_stat)
+
+    def save(self, index_path):
+        """
+        Save the alias index, unless the alias configuration file could still change unnoticed.
+        """
+        if self.config_stat is None or self.config_stat[0] / 1e9 > time.time() - RACY_CONFIG_SECONDS:
+            return
+
+        index = {
+            'version': VERSION,
+            'config': self.config_stat,
+            'aliases': self.aliases,
+            'entries': self.entries,
+            'collided_alias': self.collided_alias
+        }
+        try:
+            # Write to a temporary file first so other invocations never load a partial index
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as index_file:
+                json.dump(index, index_file)
+            os.replace(temp_path, index_path)
+        except OSError as exception:
+            logger.debug('Alias Manager: Unable to write the alias index. Error detail: %s', exception)
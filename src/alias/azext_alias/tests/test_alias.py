@@ -199,6 +199,9 @@ class TestAlias(unittest.TestCase):
 
 class MockAliasManager(azext_alias.alias.AliasManager):
 
+    def load_alias_index(self):
+        return None
+
     def load_alias_table(self):
 
         self.alias_config_str = self.kwargs.get('mock_alias_str', '')
@@ -0,0 +1,105 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+
+import os
+import time
+import shlex
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import azext_alias
+from azext_alias.alias import AliasManager
+from azext_alias.index import AliasIndex
+from azext_alias._const import (
+    ALIAS_FILE_NAME,
+    ALIAS_HASH_FILE_NAME,
+    COLLIDED_ALIAS_FILE_NAME,
+    ALIAS_INDEX_FILE_NAME,
+    ALIAS_TAB_COMP_TABLE_FILE_NAME
+)
+from azext_alias.tests._const import DEFAULT_MOCK_ALIAS_STRING, COLLISION_MOCK_ALIAS_STRING, TEST_RESERVED_COMMANDS
+
+
+class TestAliasIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.alias_path = os.path.join(self.mock_config_dir, ALIAS_FILE_NAME)
+        self.index_path = os.path.join(self.mock_config_dir, ALIAS_INDEX_FILE_NAME)
+        self.patchers = []
+        self.patchers.append(mock.patch('azext_alias.alias.GLOBAL_ALIAS_PATH', self.alias_path))
+        self.patchers.append(mock.patch('azext_alias.alias.GLOBAL_ALIAS_HASH_PATH', os.path.join(self.mock_config_dir, ALIAS_HASH_FILE_NAME)))
+        self.patchers.append(mock.patch('azext_alias.alias.GLOBAL_COLLIDED_ALIAS_PATH', os.path.join(self.mock_config_dir, COLLIDED_ALIAS_FILE_NAME)))
+        self.patchers.append(mock.patch('azext_alias.alias.GLOBAL_ALIAS_INDEX_PATH', self.index_path))
+        self.patchers.append(mock.patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)))
+        self.patchers.append(mock.patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS))
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def write_alias_config(self, alias_config_str, age=10):
+        with open(self.alias_path, 'w') as alias_config_file:
+            alias_config_file.write(alias_config_str)
+        mtime = time.time() - age
+        os.utime(self.alias_path, (mtime, mtime))
+
+    def transform(self, args):
+        return AliasManager().transform(shlex.split(args))
+
+    def test_steady_state_uses_index(self):
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING)
+        self.assertEqual(self.transform('ac ls'), ['account', 'list', '-otable'])
+        self.assertTrue(os.path.exists(self.index_path))
+
+        with mock.patch.object(AliasManager, 'load_alias_table', side_effect=AssertionError), \
+                mock.patch.object(AliasManager, 'write_alias_config_hash', side_effect=AssertionError), \
+                mock.patch.object(AliasManager, 'write_collided_alias', side_effect=AssertionError), \
+                mock.patch.object(AliasIndex, 'save', side_effect=AssertionError):
+            self.assertEqual(self.transform('ac ls'), ['account', 'list', '-otable'])
+            self.assertEqual(self.transform('cp test1 test2'), shlex.split('storage blob copy start-batch --source-uri test1 --destination-container test2'))
+            self.assertEqual(self.transform('pos-arg-2 test1 test2'), shlex.split('sf test1 test1 test2 test2'))
+            self.assertEqual(self.transform('-n ac'), ['-n', 'ac'])
+            self.assertEqual(AliasManager().get_full_alias('storage-ls'), 'storage-ls {{ arg_1 }}')
+
+    def test_changed_alias_config(self):
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING)
+        self.transform('ac')
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING + '\n[grp]\ncommand = group\n')
+        self.assertIsNone(AliasManager().alias_index)
+        self.assertEqual(self.transform('grp ls'), ['group', 'list', '-otable'])
+        self.assertIsNotNone(AliasManager().alias_index)
+
+    def test_recently_modified_alias_config_is_not_indexed(self):
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING, age=0)
+        self.assertEqual(self.transform('ac'), ['account'])
+        self.assertFalse(os.path.exists(self.index_path))
+
+    def test_collided_alias(self):
+        self.write_alias_config(COLLISION_MOCK_ALIAS_STRING)
+        self.assertEqual(self.transform('account list-locations'), ['account', 'list-locations'])
+        alias_manager = AliasManager()
+        self.assertIsNotNone(alias_manager.alias_index)
+        self.assertEqual(alias_manager.transform(shlex.split('network dns')), ['network', 'dns'])
+        self.assertEqual(alias_manager.transform(shlex.split('list-locations')), shlex.split('diagnostic-settings create'))
+
+    def test_corrupted_index(self):
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING)
+        self.transform('ac')
+        with open(self.index_path, 'w') as index_file:
+            index_file.write('{')
+        self.assertIsNone(AliasManager().alias_index)
+        self.assertEqual(self.transform('ac'), ['account'])
+
+
+if __name__ == '__main__':
+    unittest.main()
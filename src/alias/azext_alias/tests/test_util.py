@@ -11,7 +11,8 @@ import tempfile
 import unittest
 from unittest import mock
 
-from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser
+from azext_alias.util import remove_pos_arg_placeholders, build_tab_completion_table, get_config_parser, get_reserved_command_trie
+from azext_alias.command_tree import ReservedCommandTrie
 from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME
 from azext_alias.tests._const import TEST_RESERVED_COMMANDS
 
@@ -61,6 +62,21 @@ class TestUtil(unittest.TestCase):
             'account list-locations': ['']
         }, tab_completion_table)
 
+    def test_reserved_command_trie(self):
+        trie = ReservedCommandTrie(TEST_RESERVED_COMMANDS + ['network dns-account account show'])
+        self.assertEqual([1, 2, 3], trie.get_levels('account'))
+        self.assertEqual([], trie.get_levels('list'))
+        self.assertEqual(['', 'storage', 'network dns-account'], trie.get_parent_commands('account'))
+        self.assertEqual(['network dns-account'], trie.get_parent_commands('account show'))
+        self.assertEqual([], trie.get_parent_commands('account show create'))
+        self.assertEqual([], trie.get_parent_commands(''))
+
+    def test_reserved_command_trie_is_built_once(self):
+        trie = get_reserved_command_trie()
+        self.assertIs(trie, get_reserved_command_trie())
+        with mock.patch('azext_alias.cached_reserved_commands', ['group create']):
+            self.assertEqual([], get_reserved_command_trie().get_levels('account'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -18,6 +18,10 @@ from knack.util import CLIError
 
 import azext_alias
 from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, ALIAS_FILE_URL_ERROR
+from azext_alias.command_tree import ReservedCommandTrie
+
+# The trie of the reserved commands it was built from, see get_reserved_command_trie()
+_reserved_command_trie = (None, None)
 
 
 def get_config_parser():
@@ -79,6 +83,21 @@ def cache_reserved_commands(load_cmd_tbl_func):
         azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
 
 
+def get_reserved_command_trie():
+    """
+    Get the reserved commands as a command trie, built once per list of reserved commands.
+
+    Returns:
+        The ReservedCommandTrie of azext_alias.cached_reserved_commands.
+    """
+    global _reserved_command_trie  # pylint: disable=global-statement
+    reserved_commands, trie = _reserved_command_trie
+    if reserved_commands is not azext_alias.cached_reserved_commands:
+        trie = ReservedCommandTrie(azext_alias.cached_reserved_commands)
+        _reserved_command_trie = (azext_alias.cached_reserved_commands, trie)
+    return trie
+
+
 def remove_pos_arg_placeholders(alias_command):
     """
     Remove positional argument placeholders from alias_command.
@@ -135,19 +154,13 @@ def build_tab_completion_table(alias_table):
         The tab completion table.
     """
     alias_commands = [t[1] for t in filter_aliases(alias_table)]
+    reserved_command_trie = get_reserved_command_trie()
     tab_completion_table = defaultdict(list)
     for alias_command in alias_commands:
-        for reserved_command in azext_alias.cached_reserved_commands:
-            # Check if alias_command has no parent command
-            if reserved_command == alias_command or reserved_command.startswith(alias_command + ' ') \
-                    and '' not in tab_completion_table[alias_command]:
-                tab_completion_table[alias_command].append('')
-            elif ' {} '.format(alias_command) in reserved_command or reserved_command.endswith(' ' + alias_command):
-                # Extract parent commands
-                index = reserved_command.index(alias_command)
-                parent_command = reserved_command[:index - 1]
-                if parent_command not in tab_completion_table[alias_command]:
-                    tab_completion_table[alias_command].append(parent_command)
+        # An empty string means that alias_command has no parent command
+        parent_commands = reserved_command_trie.get_parent_commands(alias_command)
+        if parent_commands:
+            tab_completion_table[alias_command] = parent_commands
 
     with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'w') as f:
         f.write(json.dumps(tab_completion_table))
@@ -34,6 +34,8 @@ ACI_FIELD_CONTAINERS_ID = "id"
 
 ACI_FIELD_CONTAINERS_ARCHITECTURE_KEY = "Architecture"
 ACI_FIELD_CONTAINERS_ARCHITECTURE_VALUE = "amd64"
+# the diff_ids of the image's layers, added to the image info
+ACI_FIELD_CONTAINERS_LAYER_DIFF_IDS_KEY = "DiffIds"
 
 
 ACI_FIELD_CONTAINERS_EXEC_PROCESSES = "execProcesses"
@@ -132,3 +134,7 @@ SIDECAR_REGO_FILE_PATH = f"{script_directory}/{SIDECAR_REGO_FILE}"
 SIDECAR_REGO_POLICY = os_util.load_str_from_file(SIDECAR_REGO_FILE_PATH)
 # default containers to be added to all container groups
 DEFAULT_CONTAINERS = _config["default_containers"]
+# images pulled and hashed at the same time
+MAX_IMAGE_WORKERS = os.cpu_count() or 1
+# layer root hashes kept in the on-disk cache
+LAYER_CACHE_MAX_ENTRIES = 10000
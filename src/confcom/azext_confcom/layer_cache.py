@@ -0,0 +1,140 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import List, Optional
+from knack.log import get_logger
+from azext_confcom import config
+
+logger = get_logger(__name__)
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _default_cache_dir() -> str:
+    config_dir = os.environ.get("AZURE_CONFIG_DIR") or os.path.join(os.path.expanduser("~"), ".azure")
+    return os.path.join(config_dir, "confcom", "layer_hashes")
+
+
+def _file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class LayerHashCache:
+    """On-disk cache of the dm-verity root hash of image layers, keyed by the layer's diff_id.
+
+    Entries are also keyed by the digest of the dmverity-vhd binary so a new version of the tool never reuses hashes
+    computed by an older one. Each entry carries a checksum and entries that fail it are discarded. The least recently
+    used entries are evicted once there are more than max_entries.
+    """
+
+    def __init__(self, tool_path: str, cache_dir: str = None, max_entries: int = config.LAYER_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self.max_entries = max_entries
+        self.tool_digest = _file_digest(tool_path)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, diff_id: str) -> str:
+        key = hashlib.sha256(f"{self.tool_digest}:{diff_id}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _checksum(self, diff_id: str, root_hash: str) -> str:
+        return hashlib.sha256(f"{self.tool_digest}:{diff_id}:{root_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, diff_id: str) -> Optional[str]:
+        path = self._entry_path(diff_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            entry = None
+
+        root_hash = entry.get("root_hash") if isinstance(entry, dict) else None
+        if (
+            not isinstance(root_hash, str) or
+            not _HASH_PATTERN.match(root_hash) or
+            entry.get("diff_id") != diff_id or
+            entry.get("checksum") != self._checksum(diff_id, root_hash)
+        ):
+            logger.warning("Discarding corrupted layer hash cache entry %s", path)
+            self._remove(path)
+            return None
+
+        # the modification time orders the entries for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return root_hash
+
+    def put(self, diff_id: str, root_hash: str) -> None:
+        if not _HASH_PATTERN.match(root_hash):
+            return
+        path = self._entry_path(diff_id)
+        entry = {"diff_id": diff_id, "root_hash": root_hash, "checksum": self._checksum(diff_id, root_hash)}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.info("Unable to write the layer hash cache entry %s: %s", path, e)
+
+    def get_layers(self, diff_ids: List[str]) -> Optional[List[str]]:
+        """The root hashes of all the layers of an image, None unless every layer is cached"""
+        if not diff_ids:
+            return None
+        layers = []
+        for diff_id in diff_ids:
+            root_hash = self.get(diff_id)
+            if root_hash is None:
+                self.misses += 1
+                return None
+            layers.append(root_hash)
+        self.hits += 1
+        return layers
+
+    def put_layers(self, diff_ids: List[str], layers: List[str]) -> None:
+        # the layers are hashed in the order of the image's rootfs
+        if not diff_ids or len(diff_ids) != len(layers):
+            return
+        for diff_id, root_hash in zip(diff_ids, layers):
+            self.put(diff_id, root_hash)
+
+    def evict(self) -> None:
+        """Removes the least recently used entries above max_entries"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
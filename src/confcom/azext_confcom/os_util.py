@@ -7,7 +7,9 @@ import base64
 import binascii
 import json
 import os
-from tarfile import TarFile
+import tarfile
+import threading
+from typing import Any
 from azext_confcom.errors import (
     eprint,
 )
@@ -87,49 +89,105 @@ def load_tar_mapping_from_file(path: str) -> dict:
     return raw_json
 
 
-def map_image_from_tar(image_name: str, tar: TarFile, tar_location: str):
-    tar_dir = os.path.dirname(tar_location)
-    # grab all files in the folder and only take the one that's named with hex values and a json extension
-    members = tar.getmembers()
-    info_file_name = [
-        file
-        for file in members
-        if file.name.endswith(".json") and not file.name.startswith("manifest")
+class TarIndex:
+    """Member table of an image tarball, built by reading the member headers once.
+
+    The data of the members is skipped while scanning. The json members (the manifest and the image configs) are
+    small, so they are read straight into memory instead of being extracted to disk.
+    """
+
+    def __init__(self, tar_location: str):
+        self.tar_location = tar_location
+        # member name to (offset of the data, size)
+        self.members = {}
+        self._json = {}
+        self._compressed = False
+        try:
+            tar = tarfile.open(tar_location, "r:")
+        except tarfile.ReadError:
+            # compressed tarballs can't be read at an offset, so read the json members while scanning
+            tar = tarfile.open(tar_location, "r:*")
+            self._compressed = True
+        with tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                self.members[member.name] = (member.offset_data, member.size)
+                if self._compressed and member.name.endswith(".json"):
+                    self._json[member.name] = tar.extractfile(member).read()
+
+    def read(self, name: str) -> bytes:
+        if name in self._json:
+            return self._json[name]
+        offset, size = self.members[name]
+        with open(self.tar_location, "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def read_json(self, name: str) -> Any:
+        return load_json_from_str(self.read(name).decode("utf-8"))
+
+
+_tar_indexes = {}
+# the lock of each tarball being scanned, so images read from it at the same time share one scan
+_tar_scan_locks = {}
+_tar_indexes_lock = threading.Lock()
+
+
+def get_tar_index(tar_location: str) -> TarIndex:
+    """The index of a tarball, only scanned again when the file changes"""
+    stat = os.stat(tar_location)
+    key = (os.path.realpath(tar_location), stat.st_size, stat.st_mtime_ns)
+    with _tar_indexes_lock:
+        index = _tar_indexes.get(key)
+        if index is not None:
+            return index
+        scan_lock = _tar_scan_locks.setdefault(key, threading.Lock())
+
+    # only the readers of the same tarball wait for its scan
+    with scan_lock:
+        with _tar_indexes_lock:
+            index = _tar_indexes.get(key)
+        if index is None:
+            index = TarIndex(tar_location)
+            with _tar_indexes_lock:
+                _tar_indexes[key] = index
+                _tar_scan_locks.pop(key, None)
+    return index
+
+
+def map_image_from_tar(image_name: str, tar_location: str):
+    tar = get_tar_index(tar_location)
+    # take all the files named with hex values and a json extension
+    info_file_names = [
+        name
+        for name in tar.members
+        if name.endswith(".json") and not name.startswith("manifest")
     ]
     info_file = None
     # if there's more than one image in the tarball, we need to do some more logic
-    if len(info_file_name) > 1:
-        # extract just the manifest file and see if any of the RepoTags match the image_name we're searching for
+    if len(info_file_names) > 1:
+        # see if any of the RepoTags in the manifest match the image_name we're searching for
         # the manifest.json should have a list of all the image tags
         # and what json files they map to to get env vars, startup cmd, etc.
-        tar.extract("manifest.json", path=tar_dir)
-        manifest_path = os.path.join(tar_dir, "manifest.json")
-        manifest = load_json_from_file(manifest_path)
+        manifest = tar.read_json("manifest.json")
         # if we match a RepoTag to the image, stop searching
         for image in manifest:
-            if image_name in image.get("RepoTags"):
-                info_file = [
-                    item for item in info_file_name if item.name == image.get("Config")
-                ][0]
+            if image_name in (image.get("RepoTags") or []) and image.get("Config") in info_file_names:
+                info_file = image.get("Config")
                 break
-        # remove the extracted manifest file to clean up
-        os.remove(manifest_path)
-    elif len(info_file_name) == 0:
+    elif len(info_file_names) == 0:
         eprint(f"Tarball at {tar_location} contains no images")
     else:
-        info_file = info_file_name[0]
+        info_file = info_file_names[0]
 
     if not info_file:
         eprint(f"Image {image_name} is not found in tarball at {tar_location}")
-    tar.extract(info_file.name, path=tar_dir)
 
-    # get the path of the json file and read it in
-    image_info_file_path = os.path.join(tar_dir, info_file.name)
-    image_info_raw = load_json_from_file(image_info_file_path)
-    # delete the extracted json file to clean up
-    os.remove(image_info_file_path)
+    image_info_raw = tar.read_json(info_file)
     image_info = image_info_raw.get("config")
     # importing the constant from config.py gives a circular dependency error
     image_info["Architecture"] = image_info_raw.get("architecture")
+    image_info["DiffIds"] = image_info_raw.get("rootfs", {}).get("diff_ids")
 
     return image_info
@@ -4,8 +4,10 @@
 # --------------------------------------------------------------------------------------------
 
 import json
+import threading
 import warnings
 import copy
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, List, Dict, Tuple
 from enum import Enum, auto
 import docker
@@ -34,10 +36,27 @@ from azext_confcom.template_util import (
     get_image_info
 )
 from azext_confcom.rootfs_proxy import SecurityPolicyProxy
+from azext_confcom.layer_cache import LayerHashCache
 
 logger = get_logger()
 
 
+class _LockedProgress:
+    """Lets the image workers update the same progress bar"""
+
+    def __init__(self, progress):
+        self._progress = progress
+        self._lock = threading.Lock()
+
+    def update(self, n=1) -> None:
+        with self._lock:
+            self._progress.update(n)
+
+    def close(self) -> None:
+        with self._lock:
+            self._progress.close()
+
+
 class OutputType(Enum):
     DEFAULT = auto()
     RAW = auto()
@@ -55,6 +74,7 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
     ) -> None:
         self._docker_client = None
         self._rootfs_proxy = None
+        self._layer_hash_cache = None
         self._policy_str = None
         self._policy_str_pp = None
         self._disable_stdio = disable_stdio
@@ -136,6 +156,12 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
 
         return self._rootfs_proxy
 
+    def _get_layer_hash_cache(self) -> LayerHashCache:
+        if not self._layer_hash_cache:
+            self._layer_hash_cache = LayerHashCache(str(self._get_rootfs_proxy().policy_bin))
+
+        return self._layer_hash_cache
+
     def _close_docker_client(self) -> None:
         if self._docker_client:
             self._get_docker_client().close()
@@ -397,94 +423,79 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
 
         client = None
         tar_location = ""
-        layer_cache = {}
         if not tar_mapping:
             client = self._get_docker_client()
         elif isinstance(tar_mapping, str):
             tar_location = tar_mapping
         proxy = self._get_rootfs_proxy()
+        layer_hash_cache = self._get_layer_hash_cache()
         container_images = self.get_images()
 
         # total tasks to complete is number of images to pull and get layers
         # (i.e. total images * 2 tasks)
         _TOTAL = 2 * len(container_images)
 
+        # images used by several containers are only pulled and hashed once
+        unique_images = {}
+        for image in container_images:
+            unique_images.setdefault(f"{image.base}:{image.tag}", image)
+        workers = max(1, min(len(unique_images), config.MAX_IMAGE_WORKERS))
+
         with tqdm(
             total=_TOTAL,
             desc="Pulling and hashing images...",
             unit="percent",
             colour="green",
             leave=True,
-        ) as progress:
+        ) as tqdm_progress:
+            progress = _LockedProgress(tqdm_progress)
             # make a message queue so we don't interrupt the printing of the
-            # progress bar
+            # progress bar. each image gets its own queue so the messages are
+            # shown in the order of the images whichever is pulled first
             message_queue = []
+            image_messages = {image_name: [] for image_name in unique_images}
+
+            def _get_layers(image, image_info):
+                # images whose layers were all hashed by earlier runs don't need to be hashed again
+                diff_ids = (image_info or {}).get(config.ACI_FIELD_CONTAINERS_LAYER_DIFF_IDS_KEY)
+                layers = layer_hash_cache.get_layers(diff_ids)
+                if layers is None:
+                    layers = proxy.get_policy_image_layers(
+                        image.base, image.tag, tar_location=tar_location
+                    )
+                    layer_hash_cache.put_layers(diff_ids, layers)
+                progress.update()
+                return layers
+
+            # pull the images concurrently and hash each one as soon as it is
+            # pulled, while the others are still being pulled
+            image_infos, layer_cache = _pull_and_hash_images(
+                unique_images,
+                lambda image_name, image: get_image_info(
+                    progress, image_messages[image_name], client, tar_mapping, image
+                ),
+                _get_layers,
+                workers,
+            )
+
             # populate regular container images(s)
             for image in container_images:
 
                 image_name = f"{image.base}:{image.tag}"
-                image_info = get_image_info(progress, message_queue, client, tar_mapping, image)
+                if image is not unique_images[image_name]:
+                    # the image was pulled and hashed for an earlier container
+                    progress.update(2)
 
-                # verify and populate the working directory property
-                if not image.get_working_dir() and image_info:
-                    workingDir = image_info.get("WorkingDir")
-                    image.set_working_dir(
-                        workingDir if workingDir else config.DEFAULT_WORKING_DIR
-                    )
-
-                if (
-                    isinstance(image, UserContainerImage) or individual_image
-                ) and image_info:
-                    # verify and populate the startup command
-                    if not image.get_command():
-                        # precondition: image_info exists. this is shown by the
-                        # "and image_info" earlier
-                        command = image_info.get("Cmd")
-
-                        # since we don't have an entrypoint field,
-                        # it needs to be added to the front of the command
-                        # array
-                        entrypoint = image_info.get("Entrypoint")
-                        if entrypoint and command:
-                            command = entrypoint + command
-                        elif entrypoint and not command:
-                            command = entrypoint
-                        image.set_command(command)
-
-                    # merge envs for user container image
-                    envs = image_info.get("Env")
-                    env_names = [
-                        env_var[
-                            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
-                        ].split("=")[0]
-                        for env_var in image.get_environment_rules()
-                    ]
-
-                    for env in envs:
-                        name, value = env.split("=", 1)
-                        # when user set environment variables conflict with the ones read from image, always
-                        # keep user set environment variables
-                        if name not in env_names:
-                            image.get_environment_rules().append(
-                                {
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
-                                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
-                                }
-                            )
+                _populate_image_from_info(image, image_infos[image_name], individual_image)
 
                 # populate layer info
-                if layer_cache.get(image_name):
-                    image.set_layers(layer_cache.get(image_name))
-                else:
-                    image.set_layers(proxy.get_policy_image_layers(
-                        image.base, image.tag, tar_location=tar_location
-                    ))
-                    layer_cache[image_name] = image.get_layers()
-                progress.update()
+                image.set_layers(layer_cache[image_name])
             progress.close()
             self.close()
+            layer_hash_cache.evict()
 
+            for image_name in unique_images:
+                message_queue.extend(image_messages[image_name])
             # unload the message queue
             for message in message_queue:
                 logger.warning(message)
@@ -497,6 +508,87 @@ class AciPolicy:  # pylint: disable=too-many-instance-attributes
         return client.images.pull(image.base, image.tag)
 
 
+def _pull_and_hash_images(
+    images: Dict[str, ContainerImage], pull_image, hash_layers, workers: int
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Pull the images concurrently and hash the layers of each one as soon as it is pulled.
+    Returns the image info and the layers of each image by name"""
+    with ThreadPoolExecutor(max_workers=workers) as pull_executor, \
+            ThreadPoolExecutor(max_workers=workers) as hash_executor:
+        info_futures = {
+            pull_executor.submit(pull_image, image_name, image): image_name
+            for image_name, image in images.items()
+        }
+        layer_futures = {}
+        image_infos = {}
+        try:
+            for future in as_completed(info_futures):
+                image_name = info_futures[future]
+                image_infos[image_name] = future.result()
+                layer_futures[image_name] = hash_executor.submit(
+                    hash_layers, images[image_name], image_infos[image_name]
+                )
+            layers = {image_name: future.result() for image_name, future in layer_futures.items()}
+        except BaseException:
+            for future in list(info_futures) + list(layer_futures.values()):
+                future.cancel()
+            raise
+    return image_infos, layers
+
+
+def _populate_image_from_info(image: ContainerImage, image_info: Any, individual_image: bool) -> None:
+    """Fill in the working directory, command and environment variables the user
+    didn't set with the ones from the image config"""
+    if not image_info:
+        return
+
+    # verify and populate the working directory property
+    if not image.get_working_dir():
+        workingDir = image_info.get("WorkingDir")
+        image.set_working_dir(
+            workingDir if workingDir else config.DEFAULT_WORKING_DIR
+        )
+
+    if not isinstance(image, UserContainerImage) and not individual_image:
+        return
+
+    # verify and populate the startup command
+    if not image.get_command():
+        command = image_info.get("Cmd")
+
+        # since we don't have an entrypoint field,
+        # it needs to be added to the front of the command
+        # array
+        entrypoint = image_info.get("Entrypoint")
+        if entrypoint and command:
+            command = entrypoint + command
+        elif entrypoint and not command:
+            command = entrypoint
+        image.set_command(command)
+
+    # merge envs for user container image
+    envs = image_info.get("Env")
+    env_names = [
+        env_var[
+            config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE
+        ].split("=")[0]
+        for env_var in image.get_environment_rules()
+    ]
+
+    for env in envs:
+        name, value = env.split("=", 1)
+        # when user set environment variables conflict with the ones read from image, always
+        # keep user set environment variables
+        if name not in env_names:
+            image.get_environment_rules().append(
+                {
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_RULE: f"{name}={value}",
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_ENVS_STRATEGY: "string",
+                    config.POLICY_FIELD_CONTAINERS_ELEMENTS_REQUIRED: False,
+                }
+            )
+
+
 def load_policy_from_arm_template_str(
     template_data: str,
     parameter_data: str,
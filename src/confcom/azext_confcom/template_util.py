@@ -6,7 +6,6 @@
 import re
 import json
 import copy
-import tarfile
 from typing import Any, Tuple, Dict, List
 import deepdiff
 import yaml
@@ -44,11 +43,8 @@ def get_image_info(progress, message_queue, client, tar_mapping, image):
     # we want to do
     if tar_mapping:
         tar_location = get_tar_location_from_mapping(tar_mapping, image_name)
-        with tarfile.open(tar_location) as tar:
-            # get all the info out of the tarfile
-            image_info = os_util.map_image_from_tar(
-                image_name, tar, tar_location
-            )
+        # get all the info out of the tarfile
+        image_info = os_util.map_image_from_tar(image_name, tar_location)
         message_queue.append("read from local tar file")
     else:
         # see if we have the image locally so we can have a
@@ -84,6 +80,9 @@ def get_image_info(progress, message_queue, client, tar_mapping, image):
                 'Using image tag "latest" is not recommended'
             )
 
+    if raw_image and image_info is not None:
+        image_info[config.ACI_FIELD_CONTAINERS_LAYER_DIFF_IDS_KEY] = raw_image.attrs.get("RootFS", {}).get("Layers")
+
     progress.update()
 
     # error out if we're attempting to build for an unsupported
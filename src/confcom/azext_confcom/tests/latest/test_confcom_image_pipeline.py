@@ -0,0 +1,164 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_confcom import security_policy
+from azext_confcom.security_policy import AciPolicy, load_policy_from_str
+
+
+class _FakeProgress:
+    def __init__(self, total, **_):
+        self.total = total
+        self.count = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def update(self, n=1):
+        self.count += n
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeProxy:
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def get_policy_image_layers(self, base, tag, tar_location=""):
+        with self._lock:
+            self.calls.append(f"{base}:{tag}")
+        if f"{base}:{tag}" == self.fail_on:
+            raise ValueError(f"cannot hash {base}:{tag}")
+        return [f"{base}:{tag}-layer"]
+
+
+class _FakeLayerHashCache:
+    def get_layers(self, diff_ids):
+        return None
+
+    def put_layers(self, diff_ids, layers):
+        pass
+
+    def evict(self):
+        pass
+
+
+class PopulatePolicyContentTest(unittest.TestCase):
+    """populate_policy_content_for_all_images with the docker client and the
+    hashing binary replaced by fakes"""
+
+    def _policy(self, *images):
+        return load_policy_from_str(json.dumps({
+            "version": "1.0",
+            "containers": [
+                {"containerImage": image, "environmentVariables": [], "command": []} for image in images
+            ],
+        }))
+
+    def _populate(self, policy, get_image_info, proxy=None, workers=4):
+        self.proxy = proxy or _FakeProxy()
+        self.progress = None
+
+        def make_progress(**kwargs):
+            self.progress = _FakeProgress(**kwargs)
+            return self.progress
+
+        with mock.patch.object(security_policy, "get_image_info", side_effect=get_image_info) as info, \
+                mock.patch.object(security_policy, "tqdm", side_effect=make_progress), \
+                mock.patch.object(security_policy.config, "MAX_IMAGE_WORKERS", workers), \
+                mock.patch.object(AciPolicy, "_get_docker_client"), \
+                mock.patch.object(AciPolicy, "close"), \
+                mock.patch.object(AciPolicy, "_get_rootfs_proxy", return_value=self.proxy), \
+                mock.patch.object(AciPolicy, "_get_layer_hash_cache", return_value=_FakeLayerHashCache()), \
+                mock.patch.object(security_policy.logger, "warning") as warning:
+            try:
+                policy.populate_policy_content_for_all_images()
+            finally:
+                self.info_calls = [f"{call.args[4].base}:{call.args[4].tag}" for call in info.call_args_list]
+                self.warnings = [call.args[0] for call in warning.call_args_list]
+
+    @staticmethod
+    def _image_info(delays=None):
+        def get_image_info(progress, message_queue, client, tar_mapping, image):
+            time.sleep((delays or {}).get(image.base, 0))
+            message_queue.append(f"pulled {image.base}")
+            progress.update()
+            return {
+                "Cmd": [f"{image.base}-cmd"],
+                "Entrypoint": ["/entry"],
+                "Env": [f"NAME={image.base}"],
+                "WorkingDir": f"/{image.base}",
+            }
+        return get_image_info
+
+    def test_containers_keep_their_order(self):
+        # the first image is pulled last, but every container still gets its own image config
+        policy = self._policy("first:1", "second:1", "third:1")
+        self._populate(policy, self._image_info({"first": 0.2, "second": 0.1}))
+
+        images = policy.get_images()
+        self.assertEqual([image.base for image in images], ["first", "second", "third"])
+        for image in images:
+            self.assertEqual(image.get_command(), ["/entry", f"{image.base}-cmd"])
+            self.assertEqual(image.get_working_dir(), f"/{image.base}")
+            self.assertEqual(image.get_layers(), [f"{image.base}:1-layer"])
+            self.assertEqual(
+                [env["pattern"] for env in image.get_environment_rules()], [f"NAME={image.base}"]
+            )
+        # the messages are shown in the order of the images, not the order they were pulled
+        self.assertEqual(self.warnings, ["pulled first", "pulled second", "pulled third"])
+
+    def test_duplicate_images_are_pulled_and_hashed_once(self):
+        policy = self._policy("app:1", "sidecar:1", "app:1")
+        self._populate(policy, self._image_info())
+
+        self.assertEqual(sorted(self.info_calls), ["app:1", "sidecar:1"])
+        self.assertEqual(sorted(self.proxy.calls), ["app:1", "sidecar:1"])
+        images = policy.get_images()
+        self.assertEqual(images[0].get_layers(), images[2].get_layers())
+        self.assertIsNot(images[0], images[2])
+        self.assertEqual(images[2].get_command(), ["/entry", "app-cmd"])
+
+    def test_progress_counts_two_tasks_per_container(self):
+        policy = self._policy("app:1", "sidecar:1", "app:1", "app:1")
+        self._populate(policy, self._image_info())
+
+        self.assertEqual(self.progress.total, 8)
+        self.assertEqual(self.progress.count, 8)
+        self.assertTrue(self.progress.closed)
+
+    def test_pull_error_cancels_pending_images(self):
+        def get_image_info(progress, message_queue, client, tar_mapping, image):
+            if image.base == "broken":
+                raise ValueError("cannot pull broken:1")
+            return self._image_info()(progress, message_queue, client, tar_mapping, image)
+
+        # with one worker the images queued behind the broken one are never pulled
+        policy = self._policy("broken:1", "app:1", "sidecar:1")
+        with self.assertRaisesRegex(ValueError, "cannot pull broken:1"):
+            self._populate(policy, get_image_info, workers=1)
+
+        self.assertEqual(self.info_calls, ["broken:1"])
+        self.assertEqual(self.proxy.calls, [])
+
+    def test_hash_error_is_raised(self):
+        policy = self._policy("app:1", "broken:1")
+        with self.assertRaisesRegex(ValueError, "cannot hash broken:1"):
+            self._populate(policy, self._image_info(), proxy=_FakeProxy(fail_on="broken:1"))
+
+        # the containers aren't populated with a partial result
+        self.assertIsNone(policy.get_images()[0].get_working_dir())
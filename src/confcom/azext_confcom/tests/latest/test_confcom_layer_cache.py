@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from azext_confcom.layer_cache import LayerHashCache
+
+
+DIFF_IDS = ["sha256:" + str(i) * 64 for i in range(3)]
+ROOT_HASHES = [c * 64 for c in "abc"]
+
+
+class LayerHashCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, "cache")
+        self.tool_path = os.path.join(self.work_dir, "dmverity-vhd")
+        with open(self.tool_path, "wb") as f:
+            f.write(b"tool v1")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def _cache(self, **kwargs):
+        return LayerHashCache(self.tool_path, cache_dir=self.cache_dir, **kwargs)
+
+    def _entries(self):
+        return [os.path.join(root, name) for root, _, names in os.walk(self.cache_dir) for name in names]
+
+    def test_layers_are_reused(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get_layers(DIFF_IDS))
+        cache.put_layers(DIFF_IDS, ROOT_HASHES)
+        self.assertEqual(self._cache().get_layers(DIFF_IDS), ROOT_HASHES)
+
+        # an image with a changed top layer needs to be hashed again
+        self.assertIsNone(cache.get_layers(DIFF_IDS[:2] + ["sha256:" + "f" * 64]))
+        self.assertEqual(cache.get(DIFF_IDS[0]), ROOT_HASHES[0])
+
+    def test_unusable_layers_are_not_cached(self):
+        cache = self._cache()
+        cache.put_layers(DIFF_IDS, ROOT_HASHES[:2])
+        cache.put_layers(None, ROOT_HASHES)
+        cache.put("sha256:1", "not a hash")
+        self.assertEqual(self._entries(), [])
+        self.assertIsNone(cache.get_layers(None))
+
+    def test_new_tool_version(self):
+        self._cache().put_layers(DIFF_IDS, ROOT_HASHES)
+        with open(self.tool_path, "wb") as f:
+            f.write(b"tool v2")
+        self.assertIsNone(self._cache().get_layers(DIFF_IDS))
+
+    def test_corrupted_entry_is_discarded(self):
+        cache = self._cache()
+        cache.put(DIFF_IDS[0], ROOT_HASHES[0])
+        path = self._entries()[0]
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["root_hash"] = ROOT_HASHES[1]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+        self.assertIsNone(cache.get(DIFF_IDS[0]))
+        self.assertFalse(os.path.exists(path))
+
+        cache.put(DIFF_IDS[0], ROOT_HASHES[0])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{")
+        self.assertIsNone(cache.get(DIFF_IDS[0]))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = self._cache(max_entries=2)
+        for age, (diff_id, root_hash) in zip([300, 200, 100], zip(DIFF_IDS, ROOT_HASHES)):
+            cache.put(diff_id, root_hash)
+            os.utime(cache._entry_path(diff_id), (time.time() - age, time.time() - age))
+        # reading an entry makes it the most recently used
+        cache.get(DIFF_IDS[0])
+        cache.evict()
+        self.assertEqual(len(self._entries()), 2)
+        self.assertEqual(cache.get(DIFF_IDS[0]), ROOT_HASHES[0])
+        self.assertIsNone(cache.get(DIFF_IDS[1]))
+        self.assertEqual(cache.get(DIFF_IDS[2]), ROOT_HASHES[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_confcom import os_util
+from azext_confcom.os_util import TarIndex, map_image_from_tar
+
+
+def _config(cmd, diff_id):
+    return {
+        "architecture": "amd64",
+        "config": {"Cmd": [cmd], "WorkingDir": "/"},
+        "rootfs": {"type": "layers", "diff_ids": [diff_id]},
+    }
+
+
+class TarIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        os_util._tar_indexes.clear()
+        os_util._tar_scan_locks.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+        os_util._tar_indexes.clear()
+        os_util._tar_scan_locks.clear()
+
+    def _write_tar(self, name, images, mode="w"):
+        """Writes a tarball like the output of docker save with an image per RepoTag"""
+        path = os.path.join(self.work_dir, name)
+        members = {"manifest.json": []}
+        for i, (tag, cmd) in enumerate(images):
+            config_name = f"{i}" * 64 + ".json"
+            members[config_name] = _config(cmd, f"sha256:{i}")
+            members[f"layer{i}/layer.tar"] = "x" * 4096
+            members["manifest.json"].append({"Config": config_name, "RepoTags": [tag],
+                                             "Layers": [f"layer{i}/layer.tar"]})
+        with tarfile.open(path, mode) as tar:
+            for member_name, content in members.items():
+                data = content.encode() if isinstance(content, str) else json.dumps(content).encode()
+                info = tarfile.TarInfo(member_name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return path
+
+    def test_map_several_images_with_one_scan(self):
+        path = self._write_tar("images.tar", [("nginx:1.22", "nginx"), ("redis:7", "redis")])
+        with mock.patch.object(os_util, "TarIndex", wraps=TarIndex) as index:
+            nginx = map_image_from_tar("nginx:1.22", path)
+            redis = map_image_from_tar("redis:7", path)
+        self.assertEqual(index.call_count, 1)
+        self.assertEqual(nginx, {"Cmd": ["nginx"], "WorkingDir": "/", "Architecture": "amd64", "DiffIds": ["sha256:0"]})
+        self.assertEqual(redis["Cmd"], ["redis"])
+        # nothing is extracted next to the tarball
+        self.assertEqual(os.listdir(self.work_dir), ["images.tar"])
+
+    def test_concurrent_reads_share_one_scan(self):
+        path = self._write_tar("images.tar", [("nginx:1.22", "nginx"), ("redis:7", "redis")])
+
+        def _slow_scan(tar_location):
+            time.sleep(0.2)
+            return TarIndex(tar_location)
+
+        with mock.patch.object(os_util, "TarIndex", side_effect=_slow_scan) as index:
+            threads = [threading.Thread(target=map_image_from_tar, args=(image, path))
+                       for image in ["nginx:1.22", "redis:7"] * 2]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(index.call_count, 1)
+
+    def test_scan_does_not_block_other_tarballs(self):
+        slow_path = self._write_tar("slow.tar", [("nginx:1.22", "nginx")])
+        other_path = self._write_tar("other.tar", [("redis:7", "redis")])
+        other_mapped = threading.Event()
+        waited = []
+
+        def _scan(tar_location):
+            if tar_location == slow_path:
+                # the scan only ends once the other tarball is read
+                waited.append(other_mapped.wait(5))
+            return TarIndex(tar_location)
+
+        with mock.patch.object(os_util, "TarIndex", side_effect=_scan):
+            slow = threading.Thread(target=map_image_from_tar, args=("nginx:1.22", slow_path))
+            slow.start()
+            while not os_util._tar_scan_locks:
+                time.sleep(0.01)
+            self.assertEqual(map_image_from_tar("redis:7", other_path)["Cmd"], ["redis"])
+            other_mapped.set()
+            slow.join()
+        self.assertEqual(waited, [True])
+
+    def test_single_image(self):
+        path = self._write_tar("image.tar", [("nginx:1.22", "nginx")])
+        self.assertEqual(map_image_from_tar("nginx", path)["Cmd"], ["nginx"])
+
+    def test_compressed_tarball(self):
+        path = self._write_tar("images.tar.gz", [("nginx:1.22", "nginx"), ("redis:7", "redis")], mode="w:gz")
+        self.assertEqual(map_image_from_tar("redis:7", path)["Cmd"], ["redis"])
+
+    def test_changed_tarball_is_scanned_again(self):
+        path = self._write_tar("images.tar", [("nginx:1.22", "nginx")])
+        map_image_from_tar("nginx:1.22", path)
+        os.remove(path)
+        self._write_tar("images.tar", [("nginx:1.22", "nginx"), ("redis:7", "redis")])
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(map_image_from_tar("redis:7", path)["Cmd"], ["redis"])
+
+    def test_image_not_in_tarball(self):
+        path = self._write_tar("images.tar", [("nginx:1.22", "nginx"), ("redis:7", "redis")])
+        with self.assertRaises(SystemExit):
+            map_image_from_tar("alpine:3", path)
+
+
+if __name__ == "__main__":
+    unittest.main()
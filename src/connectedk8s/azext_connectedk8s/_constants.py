@@ -183,6 +183,10 @@ Agent_State = "agent_state.txt"
 Arc_Agents_Events = "arc_agent_events.txt"
 Diagnoser_Results = "diagnoser_output.txt"
 Connected_Cluster_Resource = "connected_cluster_resource_snapshot.txt"
+# Arc agents logs collection
+Arc_Agents_Logs_Max_Workers = 4  # matches the connection pool size of the kubernetes client
+Arc_Agents_Container_Log_Max_Bytes = 50 * 1024 * 1024
+Arc_Agents_Logs_Chunk_Size = 64 * 1024
 DNS_Check = "dns_check.txt"
 K8s_Cluster_Info = "k8s_cluster_info.txt"
 Outbound_Network_Connectivity_Check = "outbound_network_connectivity_check.txt"
@@ -13,6 +13,7 @@ import json
 import datetime
 from subprocess import Popen, PIPE, run, STDOUT, call, DEVNULL
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from knack.log import get_logger
 from azure.cli.core import telemetry
 import azext_connectedk8s._constants as consts
@@ -115,22 +116,23 @@ def fetch_connected_cluster_resource(filepath_with_timestamp, connected_cluster,
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
-def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available):
+def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, storage_space_available, max_workers=consts.Arc_Agents_Logs_Max_Workers, max_bytes_per_container=consts.Arc_Agents_Container_Log_Max_Bytes):
 
     global diagnoser_output
     try:
         if storage_space_available:
             # To retrieve all of the arc agents pods that are present in the Cluster
             arc_agents_pod_list = corev1_api_instance.list_namespaced_pod(namespace="azure-arc")
+            arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
+            try:
+                os.mkdir(arc_agent_logs_path)
+            except FileExistsError:
+                pass
+            container_logs = []
             # Traversing through all agents
             for each_agent_pod in arc_agents_pod_list.items:
-                # Fetching the current Pod name and creating a folder with that name inside the timestamp folder
+                # Fetching the current Pod name and creating a folder with that name inside the arc agents logs folder
                 agent_name = each_agent_pod.metadata.name
-                arc_agent_logs_path = os.path.join(filepath_with_timestamp, consts.Arc_Agents_Logs)
-                try:
-                    os.mkdir(arc_agent_logs_path)
-                except FileExistsError:
-                    pass
                 agent_name_logs_path = os.path.join(arc_agent_logs_path, agent_name)
                 try:
                     os.mkdir(agent_name_logs_path)
@@ -139,16 +141,20 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
                 # If the agent is not in Running state we wont be able to get logs of the containers
                 if(each_agent_pod.status.phase != "Running"):
                     continue
-                # Traversing through all of the containers present inside each pods
+                # Path to add the logs of each container present inside the pod
                 for each_container in each_agent_pod.spec.containers:
-                    # Fetching the Container name
-                    container_name = each_container.name
-                    # Creating a text file with the name of the container and adding that containers logs in it
-                    container_log = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc")
-                    # Path to add the arc agents container logs.
-                    arc_agent_container_logs_path = os.path.join(agent_name_logs_path, container_name + ".txt")
-                    with open(arc_agent_container_logs_path, 'w+') as container_file:
-                        container_file.write(str(container_log))
+                    container_logs.append((agent_name, each_container.name, os.path.join(agent_name_logs_path, each_container.name + ".txt")))
+
+            # The logs of the containers are fetched concurrently, every container's log is streamed to its own file
+            errors = []
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(stream_container_log, corev1_api_instance, agent_name, container_name, container_log_path, max_bytes_per_container) for agent_name, container_name, container_log_path in container_logs]
+                for future in as_completed(futures):
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+            if errors:
+                # Running out of storage is raised first as it fails the collection of all the remaining logs
+                raise next((e for e in errors if "[Errno 28]" in str(e)), errors[0])
 
         return consts.Diagnostic_Check_Passed, storage_space_available
 
@@ -172,6 +178,25 @@ def retrieve_arc_agents_logs(corev1_api_instance, filepath_with_timestamp, stora
     return consts.Diagnostic_Check_Failed, storage_space_available
 
 
+def stream_container_log(corev1_api_instance, agent_name, container_name, container_log_path, max_bytes):
+
+    # The log is streamed in chunks to the file instead of being loaded in memory as a whole
+    response = corev1_api_instance.read_namespaced_pod_log(name=agent_name, container=container_name, namespace="azure-arc", limit_bytes=max_bytes, _preload_content=False)
+    written = 0
+    try:
+        with open(container_log_path, 'wb') as container_file:
+            for chunk in response.stream(consts.Arc_Agents_Logs_Chunk_Size):
+                chunk = chunk[:max_bytes - written]
+                container_file.write(chunk)
+                written += len(chunk)
+                if written >= max_bytes:
+                    container_file.write("\n[Log truncated at {} bytes]\n".format(max_bytes).encode())
+                    break
+    finally:
+        response.release_conn()
+    return written
+
+
 def retrieve_arc_agents_event_logs(filepath_with_timestamp, storage_space_available, kubectl_client_location, kube_config, kube_context):
 
     global diagnoser_output
@@ -0,0 +1,107 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import azext_connectedk8s._constants as consts
+import azext_connectedk8s._troubleshootutils as troubleshootutils
+
+
+class FakeLogResponse:
+    def __init__(self, data):
+        self.data = data
+        self.released = False
+
+    def stream(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    def release_conn(self):
+        self.released = True
+
+
+class FakeCoreV1Api:
+    def __init__(self, pods, logs):
+        self.pods = pods
+        self.logs = logs
+        self.responses = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._lock = threading.Lock()
+
+    def list_namespaced_pod(self, namespace):
+        return SimpleNamespace(items=self.pods)
+
+    def read_namespaced_pod_log(self, name, container, namespace, limit_bytes, _preload_content):
+        assert not _preload_content
+        with self._lock:
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(0.05)
+        with self._lock:
+            self.concurrent -= 1
+        log = self.logs[(name, container)]
+        if isinstance(log, Exception):
+            raise log
+        response = FakeLogResponse(log)
+        self.responses.append(response)
+        return response
+
+
+def _pod(name, containers, phase="Running"):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), status=SimpleNamespace(phase=phase),
+                           spec=SimpleNamespace(containers=[SimpleNamespace(name=c) for c in containers]))
+
+
+class TestRetrieveArcAgentsLogs(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        troubleshootutils.diagnoser_output = []
+        pods = [_pod("clusterconnect-agent", ["proxy", "agent"]), _pod("config-agent", ["config-agent"]),
+                _pod("kube-aad-proxy", ["kube-aad-proxy"], phase="Pending")]
+        logs = {("clusterconnect-agent", "proxy"): b"proxy log\n" * 100,
+                ("clusterconnect-agent", "agent"): b"agent log\n",
+                ("config-agent", "config-agent"): b"config log\n"}
+        self.api = FakeCoreV1Api(pods, logs)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def _read(self, *path):
+        with open(os.path.join(self.work_dir, consts.Arc_Agents_Logs, *path), "rb") as f:
+            return f.read()
+
+    def test_logs_are_streamed_concurrently(self):
+        result = troubleshootutils.retrieve_arc_agents_logs(self.api, self.work_dir, True, max_workers=3)
+        self.assertEqual(result, (consts.Diagnostic_Check_Passed, True))
+        self.assertEqual(self._read("clusterconnect-agent", "proxy.txt"), b"proxy log\n" * 100)
+        self.assertEqual(self._read("config-agent", "config-agent.txt"), b"config log\n")
+        self.assertEqual(os.listdir(os.path.join(self.work_dir, consts.Arc_Agents_Logs, "kube-aad-proxy")), [])
+        self.assertEqual(self.api.max_concurrent, 3)
+        self.assertTrue(all(response.released for response in self.api.responses))
+
+    def test_byte_budget_per_container(self):
+        troubleshootutils.retrieve_arc_agents_logs(self.api, self.work_dir, True, max_bytes_per_container=25)
+        self.assertEqual(self._read("clusterconnect-agent", "proxy.txt"),
+                         b"proxy log\nproxy log\nproxy\n[Log truncated at 25 bytes]\n")
+        self.assertEqual(self._read("clusterconnect-agent", "agent.txt"), b"agent log\n")
+
+    def test_failed_container_log(self):
+        self.api.logs[("config-agent", "config-agent")] = ValueError("forbidden")
+        result = troubleshootutils.retrieve_arc_agents_logs(self.api, self.work_dir, True)
+        self.assertEqual(result, (consts.Diagnostic_Check_Failed, True))
+        # the logs of the other containers are still collected
+        self.assertEqual(self._read("clusterconnect-agent", "agent.txt"), b"agent log\n")
+        self.assertIn("forbidden", troubleshootutils.diagnoser_output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@
 import json
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.cli.core.util import send_raw_request
 from azure.cli.core.commands.client_factory import get_subscription_id
@@ -21,6 +22,7 @@ POLLING_TIMEOUT = 600  # how many seconds before exiting
 POLLING_SECONDS = 2  # how many seconds between requests
 POLLING_TIMEOUT_FOR_MANAGED_CERTIFICATE = 1500  # how many seconds before exiting
 POLLING_INTERVAL_FOR_MANAGED_CERTIFICATE = 4  # how many seconds between requests
+RESOURCE_GRAPH_API_VERSION = "2021-03-01"
 
 
 class PollingAnimation():
@@ -40,6 +42,20 @@ class PollingAnimation():
         sys.stderr.write("\r\033[K")
 
 
+def list_pages(cmd, request_url, formatter=lambda x: x):
+    """Yields the items of a paged list as the pages arrive, requesting the next page while the current one is consumed."""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        j = send_raw_request(cmd.cli_ctx, "GET", request_url).json()
+        while True:
+            next_link = j.get("nextLink")
+            next_page = executor.submit(send_raw_request, cmd.cli_ctx, "GET", next_link) if next_link else None
+            for item in j["value"]:
+                yield formatter(item)
+            if next_page is None:
+                return
+            j = next_page.result().json()
+
+
 def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
     try:
         start = time.time()
@@ -184,8 +200,10 @@ class ContainerAppClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
+        return list(cls.iter_by_subscription(cmd, formatter))
 
+    @classmethod
+    def iter_by_subscription(cls, cmd, formatter=lambda x: x):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = CURRENT_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -194,26 +212,14 @@ class ContainerAppClient():
             sub_id,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
-
-        return app_list
+        return list_pages(cmd, request_url, formatter)
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
+        return list(cls.iter_by_resource_group(cmd, resource_group_name, formatter))
 
+    @classmethod
+    def iter_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = CURRENT_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -224,21 +230,37 @@ class ContainerAppClient():
             resource_group_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
+        return list_pages(cmd, request_url, formatter)
 
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+    @classmethod
+    def list_resource_groups_by_environment(cls, cmd, managed_env):
+        """The resource groups with container apps in a managed environment, looked up in Azure Resource Graph.
 
-        return app_list
+        managed_env is either the resource ID or the name of the environment.
+        """
+        management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
+        sub_id = get_subscription_id(cmd.cli_ctx)
+        request_url = "{}/providers/Microsoft.ResourceGraph/resources?api-version={}".format(
+            management_hostname.strip('/'),
+            RESOURCE_GRAPH_API_VERSION)
+
+        managed_env = managed_env.lower().replace("'", "\\'")
+        if "/" in managed_env:
+            env_filter = "tolower(tostring(properties.managedEnvironmentId)) == '{}'".format(managed_env)
+        else:
+            env_filter = "tolower(tostring(properties.managedEnvironmentId)) endswith '/managedenvironments/{}'".format(managed_env)
+        query = ("resources | where type =~ 'microsoft.app/containerapps' | where {} "
+                 "| distinct resourceGroup").format(env_filter)
+        body = {"subscriptions": [sub_id], "query": query, "options": {"resultFormat": "objectArray"}}
+
+        resource_groups = []
+        while True:
+            r = send_raw_request(cmd.cli_ctx, "POST", request_url, body=json.dumps(body))
+            j = r.json()
+            resource_groups.extend(row["resourceGroup"] for row in j["data"])
+            if not j.get("$skipToken"):
+                return resource_groups
+            body["options"]["$skipToken"] = j["$skipToken"]
 
     @classmethod
     def list_secrets(cls, cmd, resource_group_name, name):
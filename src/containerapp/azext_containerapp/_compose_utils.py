@@ -4,10 +4,16 @@
 # --------------------------------------------------------------------------------------------
 # pylint: disable=line-too-long, consider-using-f-string, no-else-return, duplicate-string-formatting-argument, expression-not-assigned, too-many-locals, logging-fstring-interpolation, arguments-differ, abstract-method, logging-format-interpolation, broad-except
 
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
 from knack.log import get_logger
 from knack.prompting import prompt, prompt_choice_list
 
 from .custom import create_managed_environment
+from ._clients import POLLING_SECONDS, POLLING_TIMEOUT
+from ._constants import COMPOSE_DEPLOY_WORKERS
 from ._up_utils import (ContainerApp,
                         ContainerAppEnvironment,
                         ResourceGroup,
@@ -371,3 +377,161 @@ def resolve_service_startup_command(service):
         startup_command_array = None
         startup_args_array = None
     return (startup_command_array, startup_args_array)
+
+
+def resolve_service_dependencies(services):
+    """Map each service name to the names of the services it depends on, raising on unknown services and cycles."""
+    dependencies = {}
+    for service_name, service in services.items():
+        depends_on = [str(d) for d in service.depends_on] if service.depends_on is not None else []
+        unknown = [d for d in depends_on if d not in services]
+        if unknown:
+            raise InvalidArgumentValueError("Service {} depends on undefined service(s): {}".format(service_name, ", ".join(unknown)))
+        dependencies[service_name] = depends_on
+
+    visiting, visited = set(), set()
+
+    def _visit(service_name, path):
+        if service_name in visited:
+            return
+        if service_name in visiting:
+            cycle = path[path.index(service_name):] + [service_name]
+            raise InvalidArgumentValueError("Circular dependency between services: {}".format(" -> ".join(cycle)))
+        visiting.add(service_name)
+        for dependency in dependencies[service_name]:
+            _visit(dependency, path + [service_name])
+        visiting.discard(service_name)
+        visited.add(service_name)
+
+    for service_name in dependencies:
+        _visit(service_name, [])
+    return dependencies
+
+
+def get_provisioning_state(containerapp):
+    state = (containerapp or {}).get("properties", {}).get("provisioningState")
+    return state.lower() if state else None
+
+
+def is_provisioning_done(containerapp):
+    return get_provisioning_state(containerapp) in ["succeeded", "failed", "canceled"]
+
+
+def is_provisioning_succeeded(containerapp):
+    return get_provisioning_state(containerapp) == "succeeded"
+
+
+class ComposeDeploymentScheduler():
+    """
+    Deploys the services of a compose file as soon as the services they depend on are provisioned.
+
+    deploy(service_name) starts the deployment of a service without waiting for it to be provisioned and returns the
+    container app, get_state(service_name) returns its current state. Up to max_workers deployments are started at
+    once and every deployment in progress is checked by the same polling loop. A service is only deployed once all the
+    services it depends on succeeded, the dependents of a service that failed, was canceled or timed out are skipped.
+    """
+
+    def __init__(self, dependencies, deploy, get_state, max_workers=COMPOSE_DEPLOY_WORKERS,
+                 polling_seconds=POLLING_SECONDS, polling_timeout=POLLING_TIMEOUT):
+        self.dependencies = dependencies
+        self.deploy = deploy
+        self.get_state = get_state
+        self.max_workers = max_workers
+        self.polling_seconds = polling_seconds
+        self.polling_timeout = polling_timeout
+        self.results = {}
+        # skipped service name to the dependency that was not provisioned
+        self.skipped = {}
+        # service name to (ready, started, provisioning, done) times, relative to the start of the deployment
+        self.timeline = {}
+
+    def run(self):
+        start = time.monotonic()
+        pending = dict(self.dependencies)
+        ready_at = {}
+        running = {}
+        provisioning = {}
+        error = None
+
+        def _elapsed():
+            return time.monotonic() - start
+
+        def _finish(service_name, containerapp):
+            self.results[service_name] = containerapp
+            self.timeline[service_name] = self.timeline[service_name] + (_elapsed(),)
+
+        def _deploy(service_name):
+            self.timeline[service_name] = (ready_at[service_name], _elapsed())
+            return self.deploy(service_name)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            next_poll = 0
+            while pending or running or provisioning:
+                if error is None:
+                    self._skip_dependents_of_failures(pending)
+                    for service_name in [s for s, deps in pending.items() if all(d in self.results for d in deps)]:
+                        del pending[service_name]
+                        ready_at[service_name] = _elapsed()
+                        logger.info("Deploying service %s", service_name)
+                        running[executor.submit(_deploy, service_name)] = service_name
+                elif not running and not provisioning:
+                    break
+
+                if running:
+                    timeout = max(0, next_poll - _elapsed()) if provisioning else None
+                    done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        service_name = running.pop(future)
+                        try:
+                            containerapp = future.result()
+                        except Exception as e:
+                            error = error or e
+                            continue
+                        self.timeline[service_name] = self.timeline[service_name] + (_elapsed(),)
+                        if is_provisioning_done(containerapp):
+                            _finish(service_name, containerapp)
+                        else:
+                            if not provisioning:
+                                next_poll = _elapsed() + self.polling_seconds
+                            provisioning[service_name] = containerapp
+                elif provisioning:
+                    time.sleep(max(0, next_poll - _elapsed()))
+
+                if provisioning and _elapsed() >= next_poll:
+                    next_poll = _elapsed() + self.polling_seconds
+                    for service_name in list(provisioning):
+                        containerapp = self.get_state(service_name)
+                        timed_out = _elapsed() - self.timeline[service_name][2] > self.polling_timeout
+                        if is_provisioning_done(containerapp) or timed_out:
+                            del provisioning[service_name]
+                            _finish(service_name, containerapp)
+
+        self._log_timeline()
+        if error is not None:
+            raise error
+        return self.results
+
+    def _skip_dependents_of_failures(self, pending):
+        skipped = True
+        while skipped:
+            skipped = False
+            for service_name, dependencies in list(pending.items()):
+                failed = next((d for d in dependencies if d in self.skipped or
+                               (d in self.results and not is_provisioning_succeeded(self.results[d]))), None)
+                if failed is not None:
+                    del pending[service_name]
+                    self.skipped[service_name] = failed
+                    skipped = True
+
+    def _log_timeline(self):
+        for service_name, times in sorted(self.timeline.items(), key=lambda item: item[1]):
+            if len(times) < 4:
+                logger.warning("%s: started at %.1fs, failed", service_name, times[1])
+                continue
+            ready, started, provisioning, done = times
+            state = (self.results[service_name] or {}).get("properties", {}).get("provisioningState", "")
+            logger.warning("%s: waited %.1fs for dependencies and %.1fs for a worker, submitted in %.1fs, "
+                           "provisioned in %.1fs (%s)", service_name, ready, started - ready, provisioning - started,
+                           done - provisioning, state)
+        for service_name, dependency in self.skipped.items():
+            logger.warning("%s: skipped, the service it depends on %s was not provisioned", service_name, dependency)
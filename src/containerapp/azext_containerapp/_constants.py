@@ -52,3 +52,6 @@ DEFAULT_PORT = 8080  # used for no dockerfile scenario; not the hello world imag
 HELLO_WORLD_IMAGE = "mcr.microsoft.com/azuredocs/containerapps-helloworld:latest"
 
 LOGS_STRING = '[{"category":"ContainerAppConsoleLogs","categoryGroup":null,"enabled":true,"retentionPolicy":{"days":0,"enabled":false}},{"category":"ContainerAppSystemLogs","categoryGroup":null,"enabled":true,"retentionPolicy":{"days":0,"enabled":false}}]'  # pylint: disable=line-too-long
+
+LIST_RESOURCE_GROUP_WORKERS = 4  # resource groups listed at once by 'az containerapp list --environment'
+COMPOSE_DEPLOY_WORKERS = 5  # services deployed at once by 'az containerapp compose create'
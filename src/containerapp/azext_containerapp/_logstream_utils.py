@@ -0,0 +1,202 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import heapq
+import json
+import queue
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import requests
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# lines held to be printed in timestamp order, the producers wait when it is full
+LOG_FAN_IN_BUFFER_SIZE = 1000
+# seconds a line waits for older lines from the other streams before it is printed
+LOG_FAN_IN_REORDER_WINDOW = 1.0
+LOG_STREAM_RECONNECT_MAX_DELAY = 30
+# attempts to open a stream that is not followed before giving up on it
+LOG_STREAM_MAX_ATTEMPTS = 3
+# seconds between checks for new replicas while following the logs
+LOG_REPLICA_DISCOVERY_INTERVAL = 30
+
+LogSource = namedtuple("LogSource", ["revision", "replica", "container", "url"])
+
+_END_OF_STREAM = object()
+_TIMESTAMP_PATTERN = re.compile(r"^\s*(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:?\d{2})?")
+
+
+def clean_log_line(line):
+    # these .replaces are needed to display color/quotations properly
+    # for some reason the API returns garbled unicode special characters (may need to add more in the future)
+    return line.decode("utf-8").replace("\\u0022", "\u0022").replace("\\u001B", "\u001B").replace(
+        "\\u002B", "\u002B").replace("\\u0027", "\u0027")
+
+
+def get_log_timestamp(text):
+    """The time of a json or text log line in seconds since the epoch, None if it has none."""
+    value = text
+    if text.startswith("{"):
+        try:
+            entry = json.loads(text)
+            value = next((str(entry[key]) for key in ("TimeStamp", "timeStamp", "timestamp", "time") if key in entry),
+                         "")
+        except (ValueError, AttributeError):
+            pass
+    match = _TIMESTAMP_PATTERN.match(value)
+    if not match:
+        return None
+    seconds, fraction, zone = match.groups()
+    zone = "+00:00" if zone in (None, "Z") else zone
+    try:
+        parsed = datetime.fromisoformat(seconds.replace(" ", "T") + zone)
+    except ValueError:
+        return None
+    return parsed.timestamp() + float(fraction or 0)
+
+
+class LogFanIn:  # pylint: disable=too-many-instance-attributes
+    """
+    Streams the logs of several replicas and containers at once and prints them as one output ordered by timestamp,
+    each line prefixed with its replica and container. Dropped streams are reconnected while following the logs,
+    with headers from refresh_headers as the token may have expired.
+    """
+
+    def __init__(self, discover_sources, headers, params, follow, refresh_headers=None,
+                 buffer_size=LOG_FAN_IN_BUFFER_SIZE, reorder_window=LOG_FAN_IN_REORDER_WINDOW):
+        self.discover_sources = discover_sources
+        self.headers = headers
+        self.refresh_headers = refresh_headers
+        self.params = params
+        self.follow = follow
+        self.buffer_size = buffer_size
+        self.reorder_window = reorder_window
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._stop = threading.Event()
+        self._streams = {}
+        self._active_streams = 0
+        self._headers_lock = threading.Lock()
+
+    def run(self, print_fn=print):
+        self._discover()
+        if not self._streams:
+            logger.warning("No replicas found to stream logs from.")
+            return
+        next_discovery = time.monotonic() + LOG_REPLICA_DISCOVERY_INTERVAL
+        pending = []
+        sequence = 0
+        try:
+            while self._active_streams or pending or not self._queue.empty():
+                try:
+                    item = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    item = None
+                if item is _END_OF_STREAM:
+                    self._active_streams -= 1
+                elif item is not None:
+                    arrival, received_at, timestamp, text = item
+                    # a line without a timestamp is ordered by the time it was received, comparable to the timestamps
+                    heapq.heappush(pending, (timestamp or received_at, sequence, arrival, text))
+                    sequence += 1
+
+                now = time.monotonic()
+                while pending and (not self._active_streams or len(pending) >= self.buffer_size or
+                                   now - pending[0][2] >= self.reorder_window):
+                    print_fn(heapq.heappop(pending)[3])
+
+                if self.follow and now >= next_discovery:
+                    next_discovery = now + LOG_REPLICA_DISCOVERY_INTERVAL
+                    self._discover()
+        finally:
+            self._stop.set()
+
+    def _discover(self):
+        try:
+            sources = list(self.discover_sources())
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning("Failed to list the replicas: %s", ex)
+            return
+        for source in sources:
+            key = (source.revision, source.replica, source.container)
+            if key not in self._streams:
+                logger.info("Streaming logs of replica %s, container %s", source.replica, source.container)
+                thread = threading.Thread(target=self._stream, args=(source,))
+                thread.daemon = True
+                self._streams[key] = thread
+                self._active_streams += 1
+                thread.start()
+
+    def _get_headers(self, stale=None):
+        """The headers of the requests, refreshed once when the streams reconnect with the stale ones."""
+        with self._headers_lock:
+            if stale is self.headers and self.refresh_headers:
+                try:
+                    self.headers = self.refresh_headers()
+                except Exception as ex:  # pylint: disable=broad-except
+                    logger.info("Failed to refresh the logstream token: %s", ex)
+            return self.headers
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _stream(self, source):
+        params = dict(self.params)
+        delay = 1
+        attempts = 0
+        headers = None
+        try:
+            while not self._stop.is_set():
+                attempts += 1
+                headers = self._get_headers(stale=headers)
+                done, connected = self._read_stream(source, params, headers)
+                if done:
+                    return
+                if connected:
+                    delay = 1
+
+                if not self.follow and attempts >= LOG_STREAM_MAX_ATTEMPTS:
+                    logger.warning("Could not stream the logs of replica %s", source.replica)
+                    return
+                # reconnect without printing the past lines again
+                params["tailLines"] = 0
+                self._stop.wait(delay)
+                delay = min(delay * 2, LOG_STREAM_RECONNECT_MAX_DELAY)
+        finally:
+            self._put(_END_OF_STREAM)
+
+    def _read_stream(self, source, params, headers):
+        """Queues the lines of one connection to the stream, returns whether the stream is done and was connected."""
+        prefix = f"[{source.replica}/{source.container}] "
+        connected = False
+        try:
+            resp = requests.get(source.url, timeout=None, stream=True, params=params, headers=headers)
+            if resp.status_code == 404:
+                logger.info("Replica %s is gone, stopped streaming its logs", source.replica)
+                return True, False
+            if not resp.ok:
+                logger.info("Got bad status %s from the logstream API for replica %s",
+                            resp.status_code, source.replica)
+                return False, False
+            connected = True
+            for line in resp.iter_lines():
+                if self._stop.is_set():
+                    return True, connected
+                if line:
+                    text = clean_log_line(line)
+                    self._put((time.monotonic(), time.time(), get_log_timestamp(text), prefix + text))
+            return not self.follow, connected
+        except requests.exceptions.RequestException as ex:
+            logger.info("Log stream of replica %s dropped: %s", source.replica, ex)
+            return False, connected
@@ -50,6 +50,8 @@ def load_arguments(self, _):
         c.argument('name', name_type, id_part=None, help="The name of the Containerapp.")
         c.argument('resource_group_name', arg_type=resource_group_name_type, id_part=None)
         c.argument('kind', options_list=["--type", "-t"], help="Type of logs to stream", arg_type=get_enum_type([LOG_TYPE_CONSOLE, LOG_TYPE_SYSTEM]), default=LOG_TYPE_CONSOLE)
+        c.argument('all_replicas', help="Stream the logs of every replica of the revision at once, prefixed with the replica and container names and ordered by timestamp.", arg_type=get_three_state_flag())
+        c.argument('all_revisions', help="Stream the logs of every replica of every active revision at once. Implies --all-replicas.", arg_type=get_three_state_flag())
 
     with self.argument_context('containerapp env logs show') as c:
         c.argument('follow', help="Print logs in real time if present.", arg_type=get_three_state_flag())
@@ -4,7 +4,10 @@
 # --------------------------------------------------------------------------------------------
 # pylint: disable=logging-fstring-interpolation
 
+import logging
 import os
+import select
+import signal
 import sys
 import time
 import threading
@@ -48,6 +51,12 @@ SSH_BACKUP_ENCODING = "latin_1"
 
 SSH_CTRL_C_MSG = b"\x00\x00\x03"
 
+# seconds to wait for more input after a keystroke, so that pasted text is sent in a few frames
+SSH_STDIN_LATENCY_BUDGET = 0.005
+SSH_STDIN_MAX_FRAME_SIZE = 16 * 1024
+# seconds between checks that the connection is still open while there is no input
+SSH_STDIN_POLL_INTERVAL = 0.5
+
 
 class WebSocketConnection:
     def __init__(self, cmd, resource_group_name, name, revision, replica, container, startup_command):
@@ -125,7 +134,8 @@ def read_ssh(connection: WebSocketConnection, response_encodings):
         if not response:
             connection.disconnect()
         else:
-            logger.info("Received raw response %s", response.hex())
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received raw response %s", response.hex())
             proxy_status = response[0]
             if proxy_status == SSH_PROXY_INFO:
                 print(f"INFO: {response[1:].decode(SSH_DEFAULT_ENCODING)}")
@@ -140,31 +150,97 @@ def read_ssh(connection: WebSocketConnection, response_encodings):
                     raise CLIInternalError("Unexpected message received")
 
 
-def _send_stdin(connection: WebSocketConnection, getch_fn):
+def _send_stdin(connection: WebSocketConnection, read_fn, resizer=None, poll_resize=False):
+    """
+    Sends the input read by read_fn to the container. read_fn(timeout) returns the bytes available within the
+    timeout, b"" when there are none and None at the end of the input. The input that arrives within
+    SSH_STDIN_LATENCY_BUDGET of the first byte is coalesced into one frame.
+    """
+    if resizer:
+        resizer.update()
     while connection.is_connected:
-        _resize_terminal(connection)
-        ch = getch_fn()
-        _resize_terminal(connection)
-        if connection.is_connected:
-            connection.send(b"".join([SSH_INPUT_PREFIX, ch]))
+        data = read_fn(SSH_STDIN_POLL_INTERVAL)
+        if poll_resize and resizer:
+            # there is no signal for terminal resizes on Windows
+            resizer.update()
+        if data is None:
+            break
+        if not data:
+            continue
+
+        buffer = bytearray(data)
+        deadline = time.monotonic() + SSH_STDIN_LATENCY_BUDGET
+        while len(buffer) < SSH_STDIN_MAX_FRAME_SIZE:
+            remaining = deadline - time.monotonic()
+            data = read_fn(remaining) if remaining > 0 else b""
+            if not data:
+                break
+            buffer += data
+
+        for start in range(0, len(buffer), SSH_STDIN_MAX_FRAME_SIZE):
+            if connection.is_connected:
+                connection.send(b"".join([SSH_INPUT_PREFIX, buffer[start:start + SSH_STDIN_MAX_FRAME_SIZE]]))
+
+
+class TerminalResizer:
+    """Sends the size of the terminal to the container when it changes."""
+
+    def __init__(self, connection: WebSocketConnection):
+        self._connection = connection
+        self._size = None
+        self._installed = False
+        self._previous_handler = None
+
+    def install(self):
+        """Updates the size on SIGWINCH until uninstalled. Unix only, signal handlers are set on the main thread."""
+        self._previous_handler = signal.signal(signal.SIGWINCH, self.update)
+        self._installed = True
+
+    def uninstall(self):
+        """Restores the SIGWINCH handler replaced by install."""
+        if self._installed:
+            # None when the previous handler was not set from Python
+            signal.signal(signal.SIGWINCH, self._previous_handler or signal.SIG_DFL)
+            self._installed = False
+
+    def update(self, *_):
+        # also the SIGWINCH handler, hence the ignored arguments
+        try:
+            size = os.get_terminal_size()
+        except OSError:
+            return
+        if size != self._size and self._connection.is_connected:
+            self._size = size
+            _resize_terminal(self._connection, size)
 
 
-def _resize_terminal(connection: WebSocketConnection):
-    size = os.get_terminal_size()
+def _resize_terminal(connection: WebSocketConnection, size=None):
+    size = size or os.get_terminal_size()
     if connection.is_connected:
         connection.send(b"".join([SSH_TERM_RESIZE_PREFIX,
                                   f'{{"Width": {size.columns}, '
                                   f'"Height": {size.lines}}}'.encode(SSH_DEFAULT_ENCODING)]))
 
 
-def _getch_unix():
-    return sys.stdin.read(1).encode(SSH_DEFAULT_ENCODING)
+def _get_stdin_reader_unix(fd):
+    def _read(timeout):
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            return b""
+        return os.read(fd, SSH_STDIN_MAX_FRAME_SIZE) or None
+    return _read
 
 
-def _getch_windows():
+def _read_stdin_windows(timeout):
+    deadline = time.monotonic() + timeout
     while not msvcrt.kbhit():
+        if time.monotonic() >= deadline:
+            return b""
         time.sleep(0.01)
-    return msvcrt.getch()
+    data = bytearray()
+    while msvcrt.kbhit() and len(data) < SSH_STDIN_MAX_FRAME_SIZE:
+        data += msvcrt.getch()
+    return bytes(data)
 
 
 def ping_container_app(app):
@@ -181,12 +257,16 @@ def ping_container_app(app):
 
 
 def get_stdin_writer(connection: WebSocketConnection):
+    resizer = TerminalResizer(connection)
     if not is_platform_windows():
         import tty
         tty.setcbreak(sys.stdin.fileno())  # needed to prevent printing arrow key characters
-        writer = threading.Thread(target=_send_stdin, args=(connection, _getch_unix))
+        # signal handlers can only be set on the main thread, which creates the writer
+        resizer.install()
+        writer = threading.Thread(target=_send_stdin,
+                                  args=(connection, _get_stdin_reader_unix(sys.stdin.fileno()), resizer))
     else:
         enable_vt_mode()  # needed for interactive commands (ie vim)
-        writer = threading.Thread(target=_send_stdin, args=(connection, _getch_windows))
+        writer = threading.Thread(target=_send_stdin, args=(connection, _read_stdin_windows, resizer, True))
 
-    return writer
+    return writer, resizer
@@ -194,9 +194,29 @@ def _validate_container_exists(cmd, namespace):
         raise ResourceNotFoundError("Could not find container")
 
 
+def _validate_log_fan_in(cmd, namespace):
+    if namespace.kind and namespace.kind.lower() == LOG_TYPE_SYSTEM:
+        raise MutuallyExclusiveArgumentError("--all-replicas and --all-revisions are not supported for system logs")
+    if namespace.replica:
+        raise MutuallyExclusiveArgumentError("Cannot use --replica with --all-replicas or --all-revisions")
+    if namespace.all_revisions and namespace.revision:
+        raise MutuallyExclusiveArgumentError("Cannot use --revision with --all-revisions")
+    # the replicas and containers are discovered when the logs are streamed
+    if namespace.all_revisions:
+        return
+    if not namespace.revision:
+        app = ContainerAppClient.show(cmd, namespace.resource_group_name, namespace.name)
+        namespace.revision = safe_get(app, "properties", "latestRevisionName")
+        if not namespace.revision:
+            raise ResourceNotFoundError("Could not find a revision")
+    _validate_revision_exists(cmd, namespace)
+
+
 # also used to validate logstream
 def validate_ssh(cmd, namespace):
-    if not hasattr(namespace, "kind") or (namespace.kind and namespace.kind.lower() != LOG_TYPE_SYSTEM):
+    if getattr(namespace, "all_replicas", False) or getattr(namespace, "all_revisions", False):
+        _validate_log_fan_in(cmd, namespace)
+    elif not hasattr(namespace, "kind") or (namespace.kind and namespace.kind.lower() != LOG_TYPE_SYSTEM):
         _set_ssh_defaults(cmd, namespace)
         _validate_revision_exists(cmd, namespace)
         _validate_replica_exists(cmd, namespace)
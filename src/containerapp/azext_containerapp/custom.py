@@ -7,6 +7,8 @@
 import threading
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from urllib.parse import urlparse
 import requests
 
@@ -72,12 +74,14 @@ from ._utils import (_validate_subscription_registered, _ensure_location_allowed
                      set_ip_restrictions, certificate_location_matches, certificate_matches, generate_randomized_managed_cert_name,
                      check_managed_cert_name_availability, prepare_managed_certificate_envelop)
 from ._validators import validate_create, validate_revision_suffix
+from ._logstream_utils import LogFanIn, LogSource, clean_log_line
 from ._ssh_utils import (SSH_DEFAULT_ENCODING, WebSocketConnection, read_ssh, get_stdin_writer, SSH_CTRL_C_MSG,
                          SSH_BACKUP_ENCODING)
 from ._constants import (MAXIMUM_SECRET_LENGTH, MICROSOFT_SECRET_SETTING_NAME, FACEBOOK_SECRET_SETTING_NAME, GITHUB_SECRET_SETTING_NAME,
                          GOOGLE_SECRET_SETTING_NAME, TWITTER_SECRET_SETTING_NAME, APPLE_SECRET_SETTING_NAME, CONTAINER_APPS_RP,
                          NAME_INVALID, NAME_ALREADY_EXISTS, ACR_IMAGE_SUFFIX, HELLO_WORLD_IMAGE, LOG_TYPE_SYSTEM, LOG_TYPE_CONSOLE,
-                         MANAGED_CERTIFICATE_RT, PRIVATE_CERTIFICATE_RT, PENDING_STATUS, SUCCEEDED_STATUS)
+                         MANAGED_CERTIFICATE_RT, PRIVATE_CERTIFICATE_RT, PENDING_STATUS, SUCCEEDED_STATUS,
+                         LIST_RESOURCE_GROUP_WORKERS)
 
 logger = get_logger(__name__)
 
@@ -395,7 +399,7 @@ def create_containerapp(cmd,
 
     ingress_def = None
     if target_port is not None and ingress is not None:
-        ingress_def = IngressModel
+        ingress_def = deepcopy(IngressModel)
         ingress_def["external"] = external_ingress
         ingress_def["targetPort"] = target_port
         ingress_def["transport"] = transport
@@ -407,7 +411,7 @@ def create_containerapp(cmd,
 
     registries_def = None
     if registry_server is not None and not is_registry_msi_system(registry_identity):
-        registries_def = RegistryCredentialsModel
+        registries_def = deepcopy(RegistryCredentialsModel)
         registries_def["server"] = registry_server
 
         # Infer credentials if not supplied and its azurecr
@@ -425,7 +429,7 @@ def create_containerapp(cmd,
 
     dapr_def = None
     if dapr_enabled:
-        dapr_def = DaprModel
+        dapr_def = deepcopy(DaprModel)
         dapr_def["enabled"] = True
         dapr_def["appId"] = dapr_app_id
         dapr_def["appPort"] = dapr_app_port
@@ -435,7 +439,7 @@ def create_containerapp(cmd,
         dapr_def["logLevel"] = dapr_log_level
         dapr_def["enableApiLogging"] = dapr_enable_api_logging
 
-    config_def = ConfigurationModel
+    config_def = deepcopy(ConfigurationModel)
     config_def["secrets"] = secrets_def
     config_def["activeRevisionsMode"] = revisions_mode
     config_def["ingress"] = ingress_def
@@ -443,7 +447,7 @@ def create_containerapp(cmd,
     config_def["dapr"] = dapr_def
 
     # Identity actions
-    identity_def = ManagedServiceIdentityModel
+    identity_def = deepcopy(ManagedServiceIdentityModel)
     identity_def["type"] = "None"
 
     assign_system_identity = system_assigned
@@ -469,7 +473,7 @@ def create_containerapp(cmd,
 
     scale_def = None
     if min_replicas is not None or max_replicas is not None:
-        scale_def = ScaleModel
+        scale_def = deepcopy(ScaleModel)
         scale_def["minReplicas"] = min_replicas
         scale_def["maxReplicas"] = max_replicas
 
@@ -477,7 +481,7 @@ def create_containerapp(cmd,
         if not scale_rule_type:
             scale_rule_type = "http"
         scale_rule_type = scale_rule_type.lower()
-        scale_rule_def = ScaleRuleModel
+        scale_rule_def = deepcopy(ScaleRuleModel)
         curr_metadata = {}
         if scale_rule_http_concurrency:
             if scale_rule_type in ('http', 'tcp'):
@@ -498,16 +502,16 @@ def create_containerapp(cmd,
             scale_rule_def["custom"]["metadata"] = metadata_def
             scale_rule_def["custom"]["auth"] = auth_def
         if not scale_def:
-            scale_def = ScaleModel
+            scale_def = deepcopy(ScaleModel)
         scale_def["rules"] = [scale_rule_def]
 
     resources_def = None
     if cpu is not None or memory is not None:
-        resources_def = ContainerResourcesModel
+        resources_def = deepcopy(ContainerResourcesModel)
         resources_def["cpu"] = cpu
         resources_def["memory"] = memory
 
-    container_def = ContainerModel
+    container_def = deepcopy(ContainerModel)
     container_def["name"] = container_name if container_name else name
     container_def["image"] = image if not is_registry_msi_system(registry_identity) else HELLO_WORLD_IMAGE
     if env_vars is not None:
@@ -519,14 +523,14 @@ def create_containerapp(cmd,
     if resources_def is not None:
         container_def["resources"] = resources_def
 
-    template_def = TemplateModel
+    template_def = deepcopy(TemplateModel)
     template_def["containers"] = [container_def]
     template_def["scale"] = scale_def
 
     if revision_suffix is not None:
         template_def["revisionSuffix"] = revision_suffix
 
-    containerapp_def = ContainerAppModel
+    containerapp_def = deepcopy(ContainerAppModel)
     containerapp_def["location"] = location
     containerapp_def["identity"] = identity_def
     containerapp_def["properties"]["managedEnvironmentId"] = managed_env
@@ -552,7 +556,7 @@ def create_containerapp(cmd,
             create_acrpull_role_assignment(cmd, registry_server, registry_identity=None, service_principal=system_sp)
             container_def["image"] = image
 
-            registries_def = RegistryCredentialsModel
+            registries_def = deepcopy(RegistryCredentialsModel)
             registries_def["server"] = registry_server
             registries_def["identity"] = registry_identity
             config_def["registries"] = [registries_def]
@@ -964,25 +968,57 @@ def list_containerapp(cmd, resource_group_name=None, managed_env=None):
     _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
 
     try:
-        containerapps = []
-        if resource_group_name is None:
-            containerapps = ContainerAppClient.list_by_subscription(cmd=cmd)
+        if not managed_env:
+            if resource_group_name is None:
+                return ContainerAppClient.list_by_subscription(cmd=cmd)
+            return ContainerAppClient.list_by_resource_group(cmd=cmd, resource_group_name=resource_group_name)
+
+        parsed_env = parse_resource_id(managed_env)
+        if "resource_group" in parsed_env:
+            ManagedEnvironmentClient.show(cmd, parsed_env["resource_group"], parsed_env["name"])
+            env_id = managed_env.lower()
+
+            def _in_env(c):
+                return c["properties"]["managedEnvironmentId"].lower() == env_id
         else:
-            containerapps = ContainerAppClient.list_by_resource_group(cmd=cmd, resource_group_name=resource_group_name)
+            env_name = parsed_env["name"].lower()
 
-        if managed_env:
-            env_name = parse_resource_id(managed_env)["name"].lower()
-            if "resource_group" in parse_resource_id(managed_env):
-                ManagedEnvironmentClient.show(cmd, parse_resource_id(managed_env)["resource_group"], parse_resource_id(managed_env)["name"])
-                containerapps = [c for c in containerapps if c["properties"]["managedEnvironmentId"].lower() == managed_env.lower()]
-            else:
-                containerapps = [c for c in containerapps if parse_resource_id(c["properties"]["managedEnvironmentId"])["name"].lower() == env_name]
+            def _in_env(c):
+                return c["properties"]["managedEnvironmentId"].rsplit("/", 1)[-1].lower() == env_name
 
-        return containerapps
+        if resource_group_name is not None:
+            containerapps = ContainerAppClient.iter_by_resource_group(cmd=cmd, resource_group_name=resource_group_name)
+        else:
+            containerapps = _iter_containerapps_by_environment(cmd, managed_env)
+        return [c for c in containerapps if _in_env(c)]
     except CLIError as e:
         handle_raw_exception(e)
 
 
+def _iter_containerapps_by_environment(cmd, managed_env):
+    # only list the resource groups that Resource Graph knows to have apps in the environment,
+    # listing the whole subscription instead when Resource Graph can't be queried
+    try:
+        resource_groups = ContainerAppClient.list_resource_groups_by_environment(cmd, managed_env)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.debug("Failed to query Resource Graph for the apps in %s: %s", managed_env, e)
+        resource_groups = []
+
+    # Resource Graph indexes new apps with a delay: the whole subscription is listed when it knows of none, and the
+    # resource group of the environment, where the apps usually are, is always listed
+    if not resource_groups:
+        yield from ContainerAppClient.iter_by_subscription(cmd=cmd)
+        return
+    env_resource_group = parse_resource_id(managed_env).get("resource_group")
+    if env_resource_group and env_resource_group.lower() not in {rg.lower() for rg in resource_groups}:
+        resource_groups.append(env_resource_group)
+
+    with ThreadPoolExecutor(max_workers=LIST_RESOURCE_GROUP_WORKERS) as executor:
+        for apps in executor.map(lambda rg: ContainerAppClient.list_by_resource_group(cmd=cmd, resource_group_name=rg),
+                                 resource_groups):
+            yield from apps
+
+
 def delete_containerapp(cmd, name, resource_group_name, no_wait=False):
     _validate_subscription_registered(cmd, CONTAINER_APPS_RP)
 
@@ -2529,22 +2565,25 @@ def containerapp_ssh(cmd, resource_group_name, name, container=None, revision=No
     reader.daemon = True
     reader.start()
 
-    writer = get_stdin_writer(conn)
+    writer, resizer = get_stdin_writer(conn)
     writer.daemon = True
     writer.start()
 
     logger.warning("Use ctrl + D to exit.")
-    while conn.is_connected:
-        try:
-            time.sleep(0.1)
-        except KeyboardInterrupt:
-            if conn.is_connected:
-                logger.info("Caught KeyboardInterrupt. Sending ctrl+c to server")
-                conn.send(SSH_CTRL_C_MSG)
+    try:
+        while conn.is_connected:
+            try:
+                time.sleep(0.1)
+            except KeyboardInterrupt:
+                if conn.is_connected:
+                    logger.info("Caught KeyboardInterrupt. Sending ctrl+c to server")
+                    conn.send(SSH_CTRL_C_MSG)
+    finally:
+        resizer.uninstall()
 
 
 def stream_containerapp_logs(cmd, resource_group_name, name, container=None, revision=None, replica=None, follow=False,
-                             tail=None, output_format=None, kind=None):
+                             tail=None, output_format=None, kind=None, all_replicas=False, all_revisions=False):
     if tail:
         if tail < 0 or tail > 300:
             raise ValidationError("--tail must be between 0 and 300.")
@@ -2555,8 +2594,12 @@ def stream_containerapp_logs(cmd, resource_group_name, name, container=None, rev
             raise MutuallyExclusiveArgumentError("--type: only json logs supported for system logs")
 
     sub = get_subscription_id(cmd.cli_ctx)
-    token_response = ContainerAppClient.get_auth_token(cmd, resource_group_name, name)
-    token = token_response["properties"]["token"]
+
+    def _get_headers():
+        token_response = ContainerAppClient.get_auth_token(cmd, resource_group_name, name)
+        return {"Authorization": f"Bearer {token_response['properties']['token']}"}
+
+    headers = _get_headers()
 
     base_url = ContainerAppClient.show(cmd, resource_group_name, name)["properties"]["eventStreamEndpoint"]
     base_url = base_url[:base_url.index("/subscriptions/")]
@@ -2567,11 +2610,32 @@ def stream_containerapp_logs(cmd, resource_group_name, name, container=None, rev
     else:
         url = f"{base_url}/subscriptions/{sub}/resourceGroups/{resource_group_name}/containerApps/{name}/eventstream"
 
-    logger.info("connecting to : %s", url)
     request_params = {"follow": str(follow).lower(),
                       "output": output_format,
                       "tailLines": tail}
-    headers = {"Authorization": f"Bearer {token}"}
+
+    if all_replicas or all_revisions:
+        app_url = f"{base_url}/subscriptions/{sub}/resourceGroups/{resource_group_name}/containerApps/{name}"
+
+        def _discover_sources():
+            if all_revisions:
+                revisions = [r["name"] for r in ContainerAppClient.list_revisions(cmd, resource_group_name, name)
+                             if safe_get(r, "properties", "active")]
+            else:
+                revisions = [revision]
+            for revision_name in revisions:
+                for r in ContainerAppClient.list_replicas(cmd, resource_group_name, name, revision_name):
+                    for c in safe_get(r, "properties", "containers", default=[]):
+                        if container and c["name"].lower() != container.lower():
+                            continue
+                        yield LogSource(revision_name, r["name"], c["name"],
+                                        f"{app_url}/revisions/{revision_name}/replicas/{r['name']}"
+                                        f"/containers/{c['name']}/logstream")
+
+        LogFanIn(_discover_sources, headers, request_params, follow, refresh_headers=_get_headers).run()
+        return
+
+    logger.info("connecting to : %s", url)
     resp = requests.get(url,
                         timeout=None,
                         stream=True,
@@ -2584,9 +2648,7 @@ def stream_containerapp_logs(cmd, resource_group_name, name, container=None, rev
     for line in resp.iter_lines():
         if line:
             logger.info("received raw log line: %s", line)
-            # these .replaces are needed to display color/quotations properly
-            # for some reason the API returns garbled unicode special characters (may need to add more in the future)
-            print(line.decode("utf-8").replace("\\u0022", "\u0022").replace("\\u001B", "\u001B").replace("\\u002B", "\u002B").replace("\\u0027", "\u0027"))
+            print(clean_log_line(line))
 
 
 def stream_environment_logs(cmd, resource_group_name, name, follow=False, tail=None):
@@ -2619,9 +2681,7 @@ def stream_environment_logs(cmd, resource_group_name, name, follow=False, tail=N
     for line in resp.iter_lines():
         if line:
             logger.info("received raw log line: %s", line)
-            # these .replaces are needed to display color/quotations properly
-            # for some reason the API returns garbled unicode special characters (may need to add more in the future)
-            print(line.decode("utf-8").replace("\\u0022", "\u0022").replace("\\u001B", "\u001B").replace("\\u002B", "\u002B").replace("\\u0027", "\u0027"))
+            print(clean_log_line(line))
 
 
 def open_containerapp_in_browser(cmd, name, resource_group_name):
@@ -3904,7 +3964,9 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
                                  resolve_memory_configuration_from_service,
                                  resolve_replicas_from_service,
                                  resolve_environment_from_service,
-                                 resolve_secret_from_service)
+                                 resolve_secret_from_service,
+                                 resolve_service_dependencies,
+                                 ComposeDeploymentScheduler)
 
     # Validate managed environment
     parsed_managed_env = parse_resource_id(managed_env)
@@ -3926,7 +3988,8 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
     compose_yaml = load_yaml_file(compose_file_path)
     parsed_compose_file = ComposeFile(compose_yaml)
     logger.info(parsed_compose_file)
-    containerapps_from_compose = []
+    dependencies = resolve_service_dependencies(parsed_compose_file.services)
+    service_settings = {}
     # Using the key to iterate to get the service name
     # pylint: disable=C0201,C0206
     for service_name in parsed_compose_file.ordered_services.keys():
@@ -3937,8 +4000,6 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
             raise InvalidArgumentValueError(message)
         image = service.image
         warn_about_unsupported_elements(service)
-        logger.info(  # pylint: disable=W1203
-            f"Creating the Container Apps instance for {service_name} under {resource_group_name} in {location}.")
         ingress_type, target_port = resolve_ingress_and_target_port(service)
         registry, registry_username, registry_password = resolve_registry_from_cli_args(registry_server, registry_user, registry_pass)  # pylint: disable=C0301
         transport_setting = resolve_transport_from_cli_args(service_name, transport_mapping)
@@ -3954,48 +4015,63 @@ def create_containerapps_from_compose(cmd,  # pylint: disable=R0914
             environment.extend(secret_env_ref)
         elif secret_env_ref is not None:
             environment = secret_env_ref
+        service_settings[service_name] = dict(image=image,
+                                              container_name=service.container_name,
+                                              managed_env=managed_environment["id"],
+                                              ingress=ingress_type,
+                                              target_port=target_port,
+                                              registry_server=registry,
+                                              registry_user=registry_username,
+                                              registry_pass=registry_password,
+                                              transport=transport_setting,
+                                              startup_command=startup_command,
+                                              args=startup_args,
+                                              cpu=cpu,
+                                              memory=memory,
+                                              env_vars=environment,
+                                              secrets=secret_vars,
+                                              min_replicas=replicas,
+                                              max_replicas=replicas,)
+
+    # builds run one at a time so their logs don't interleave and they don't race to create the same registry
+    build_lock = threading.Lock()
+
+    def _deploy_service(service_name):
+        service = parsed_compose_file.services[service_name]
+        settings = service_settings[service_name]
+        logger.info(  # pylint: disable=W1203
+            f"Creating the Container Apps instance for {service_name} under {resource_group_name} in {location}.")
         if service.build is not None:
-            logger.warning("Build configuration defined for this service.")
-            logger.warning("The build will be performed by Azure Container Registry.")
-            context = service.build.context
-            dockerfile = "Dockerfile"
-            if service.build.dockerfile is not None:
-                dockerfile = service.build.dockerfile
-            image, registry, registry_username, registry_password = build_containerapp_from_compose_service(
-                cmd,
-                service_name,
-                context,
-                dockerfile,
-                resource_group_name,
-                managed_env,
-                location,
-                image,
-                target_port,
-                ingress_type,
-                registry,
-                registry_username,
-                registry_password,
-                environment)
-        containerapps_from_compose.append(
-            create_containerapp(cmd,
-                                service_name,
-                                resource_group_name,
-                                image=image,
-                                container_name=service.container_name,
-                                managed_env=managed_environment["id"],
-                                ingress=ingress_type,
-                                target_port=target_port,
-                                registry_server=registry,
-                                registry_user=registry_username,
-                                registry_pass=registry_password,
-                                transport=transport_setting,
-                                startup_command=startup_command,
-                                args=startup_args,
-                                cpu=cpu,
-                                memory=memory,
-                                env_vars=environment,
-                                secrets=secret_vars,
-                                min_replicas=replicas,
-                                max_replicas=replicas,)
-        )
-    return containerapps_from_compose
+            with build_lock:
+                logger.warning("Build configuration defined for service %s.", service_name)
+                logger.warning("The build will be performed by Azure Container Registry.")
+                context = service.build.context
+                dockerfile = "Dockerfile"
+                if service.build.dockerfile is not None:
+                    dockerfile = service.build.dockerfile
+                (settings["image"], settings["registry_server"], settings["registry_user"],
+                 settings["registry_pass"]) = build_containerapp_from_compose_service(
+                    cmd,
+                    service_name,
+                    context,
+                    dockerfile,
+                    resource_group_name,
+                    managed_env,
+                    location,
+                    settings["image"],
+                    settings["target_port"],
+                    settings["ingress"],
+                    settings["registry_server"],
+                    settings["registry_user"],
+                    settings["registry_pass"],
+                    settings["env_vars"])
+        return create_containerapp(cmd, service_name, resource_group_name, no_wait=True, **settings)
+
+    scheduler = ComposeDeploymentScheduler(
+        dependencies,
+        _deploy_service,
+        lambda service_name: ContainerAppClient.show(cmd, resource_group_name, service_name))
+    results = scheduler.run()
+    # services skipped because a service they depend on was not provisioned are reported by the scheduler
+    return [results[service_name] for service_name in parsed_compose_file.ordered_services.keys()
+            if service_name in results]
@@ -0,0 +1,144 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import io
+import os
+import shutil
+import stat
+import sys
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_containerapp._archive_utils import (_pack_source_code, IgnoreMatcher, IgnoreRule, ParallelGzipFile)
+
+
+def _write(root, path, content="content"):
+    path = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class ContainerappArchiveUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, "cache")
+        self.tar_file_path = os.path.join(self.work_dir, "source.tar.gz")
+        for path in ["app.py", "Dockerfile", "build/out.bin", "build/keep/important.txt", "node_modules/a/index.js",
+                     "docs/readme.md", "docs/notes.tmp", ".git/HEAD"]:
+            _write(self.source, path)
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.work_dir)
+
+    def _pack(self):
+        _pack_source_code(self.source, self.tar_file_path, os.path.join(self.source, "Dockerfile"), "Dockerfile",
+                          cache_dir=self.cache_dir)
+        with tarfile.open(self.tar_file_path, "r:gz") as tar:
+            return {member.name for member in tar.getmembers() if member.isfile()}
+
+    def test_pack_with_dockerignore(self):
+        _write(self.source, ".dockerignore", "# comment\nbuild\n!build/keep/important.txt\nnode_modules\n**/*.tmp\n")
+        self.assertEqual(self._pack(), {"app.py", "Dockerfile", ".dockerignore", "build/keep/important.txt",
+                                        "docs/readme.md"})
+
+    def test_pack_without_dockerignore(self):
+        self.assertEqual(self._pack(), {"app.py", "Dockerfile", "build/out.bin", "build/keep/important.txt",
+                                        "node_modules/a/index.js", "docs/readme.md", "docs/notes.tmp"})
+
+    def test_pack_reuses_cached_blocks(self):
+        first = self._pack()
+        with open(self.tar_file_path, "rb") as f:
+            first_archive = f.read()
+        self.assertEqual(self._pack(), first)
+        with open(self.tar_file_path, "rb") as f:
+            self.assertEqual(f.read(), first_archive)
+        cached_blocks = [name for _, _, names in os.walk(self.cache_dir) for name in names]
+        self.assertEqual(len(cached_blocks), 1)
+
+    def _cached_block_paths(self):
+        return [os.path.join(root, name) for root, _, names in os.walk(self.cache_dir) for name in names]
+
+    @unittest.skipIf(sys.platform == "win32", "POSIX permissions")
+    def test_cache_is_private(self):
+        self._pack()
+        for root, _, _ in os.walk(self.cache_dir):
+            if root != self.cache_dir:
+                self.assertEqual(stat.S_IMODE(os.stat(root).st_mode), 0o700)
+        for path in self._cached_block_paths():
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode) & 0o077, 0)
+
+    def test_corrupted_cached_block_is_not_reused(self):
+        first = self._pack()
+        with open(self.tar_file_path, "rb") as f:
+            first_archive = f.read()
+        block_path, = self._cached_block_paths()
+        with open(block_path, "wb") as f:
+            f.write(b"not the cached block")
+
+        self.assertEqual(self._pack(), first)
+        with open(self.tar_file_path, "rb") as f:
+            self.assertEqual(f.read(), first_archive)
+        with open(block_path, "rb") as f:
+            self.assertEqual(f.read(), first_archive)
+
+    def test_cache_is_trimmed(self):
+        other_source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_source)
+        _write(other_source, "app.py")
+        docker_file_path = os.path.join(self.source, "Dockerfile")
+        _pack_source_code(other_source, self.tar_file_path, docker_file_path, "Dockerfile", cache_dir=self.cache_dir)
+        self._pack()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        # only the archive of the most recently packed source folder fits
+        block_size = max(os.path.getsize(path) for path in self._cached_block_paths())
+        with mock.patch("azext_containerapp._archive_utils.ARCHIVE_CACHE_MAX_SIZE", block_size):
+            _pack_source_code(other_source, self.tar_file_path, docker_file_path, "Dockerfile",
+                              cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with tarfile.open(self.tar_file_path, "r:gz") as tar:
+            self.assertEqual({member.name for member in tar.getmembers() if member.isfile()}, {"app.py", "Dockerfile"})
+
+    def test_ignore_matcher(self):
+        rules = [IgnoreRule(rule) for rule in ["!build/keep", "build", "*.log"]]
+        matcher = IgnoreMatcher(rules)
+        self.assertEqual(matcher.check("build", False, 3), (True, 1))
+        self.assertEqual(matcher.check("build/keep", True, 1), (False, 0))
+        self.assertEqual(matcher.check("app.log", False, 3), (True, 2))
+        # rules with a lower priority than the parent's rule don't apply
+        self.assertEqual(matcher.check("build/out.log", True, 1), (True, 1))
+        self.assertEqual(matcher.check("app.py", False, 3), (False, 3))
+
+        # an ignored directory is only scanned when an exception may include its children
+        self.assertFalse(matcher.excludes_children(True, 1))
+        self.assertTrue(matcher.excludes_children(True, 0))
+        self.assertTrue(IgnoreMatcher([IgnoreRule("build")]).excludes_children(True, 0))
+        self.assertFalse(IgnoreMatcher(None).excludes_children(False, 0))
+
+    def test_parallel_gzip_file(self):
+        output = io.BytesIO()
+        gzip_file = ParallelGzipFile(output, block_size=16, workers=4)
+        with tarfile.open(fileobj=gzip_file, mode="w") as tar:
+            for index in range(20):
+                data = "file {}".format(index).encode() * 100
+                info = tarfile.TarInfo("file{}.txt".format(index))
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+                gzip_file.end_entry(info.name)
+        gzip_file.close()
+        self.assertGreater(gzip_file.blocks, 1)
+
+        output.seek(0)
+        with tarfile.open(fileobj=output, mode="r:gz") as tar:
+            self.assertEqual(len(tar.getmembers()), 20)
+            self.assertEqual(tar.extractfile("file7.txt").read(), b"file 7" * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from pycomposefile import ComposeFile
+
+from azext_containerapp._compose_utils import ComposeDeploymentScheduler, resolve_service_dependencies
+from azext_containerapp.custom import create_containerapp
+
+ENV_ID = "/subscriptions/sub/resourceGroups/rg/providers/Microsoft.App/managedEnvironments/env"
+
+
+class FakeDeployment:
+    """Container apps that take `polls` checks of their state to be provisioned."""
+
+    def __init__(self, polls=2, fail=(), provisioning_failed=()):
+        self.polls = polls
+        self.fail = fail
+        self.provisioning_failed = provisioning_failed
+        self.remaining = {}
+        self.started = []
+        self.state_requests = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._lock = threading.Lock()
+
+    def deploy(self, service_name):
+        with self._lock:
+            self.started.append(service_name)
+            self.concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        time.sleep(0.05)
+        with self._lock:
+            self.concurrent -= 1
+        if service_name in self.fail:
+            raise ValueError(service_name)
+        self.remaining[service_name] = self.polls
+        return self._state(service_name)
+
+    def get_state(self, service_name):
+        self.state_requests.append(service_name)
+        self.remaining[service_name] -= 1
+        return self._state(service_name)
+
+    def _state(self, service_name):
+        state = "Succeeded" if self.remaining[service_name] <= 0 else "InProgress"
+        if state == "Succeeded" and service_name in self.provisioning_failed:
+            state = "Failed"
+        return {"name": service_name, "properties": {"provisioningState": state}}
+
+
+class ContainerappComposeSchedulerTest(unittest.TestCase):
+    def _run(self, dependencies, deployment, max_workers=5):
+        scheduler = ComposeDeploymentScheduler(dependencies, deployment.deploy, deployment.get_state,
+                                               max_workers=max_workers, polling_seconds=0.01)
+        return scheduler, scheduler.run()
+
+    def test_independent_services_deploy_concurrently(self):
+        deployment = FakeDeployment()
+        dependencies = {"db": [], "cache": [], "queue": [], "web": ["db", "cache"], "worker": ["queue"]}
+        scheduler, results = self._run(dependencies, deployment)
+        self.assertEqual(set(results), set(dependencies))
+        self.assertTrue(all(r["properties"]["provisioningState"] == "Succeeded" for r in results.values()))
+        self.assertEqual(set(deployment.started[:3]), {"db", "cache", "queue"})
+        self.assertGreater(deployment.max_concurrent, 1)
+        # dependents only start once their dependencies are provisioned
+        self.assertGreaterEqual(scheduler.timeline["web"][0], max(scheduler.timeline["db"][3],
+                                                                  scheduler.timeline["cache"][3]))
+        self.assertGreaterEqual(scheduler.timeline["worker"][0], scheduler.timeline["queue"][3])
+
+    def test_bounded_workers(self):
+        deployment = FakeDeployment(polls=0)
+        self._run({str(i): [] for i in range(6)}, deployment, max_workers=2)
+        self.assertEqual(deployment.max_concurrent, 2)
+        self.assertEqual(deployment.state_requests, [])
+
+    def test_failed_deployment_skips_dependents(self):
+        deployment = FakeDeployment(fail=("db",))
+        with self.assertRaises(ValueError):
+            self._run({"db": [], "cache": [], "web": ["db"]}, deployment)
+        self.assertNotIn("web", deployment.started)
+        self.assertIn("cache", deployment.started)
+
+    def test_failed_provisioning_skips_dependents(self):
+        deployment = FakeDeployment(provisioning_failed=("db",))
+        dependencies = {"db": [], "cache": [], "web": ["db", "cache"], "api": ["web"], "worker": ["cache"]}
+        scheduler, results = self._run(dependencies, deployment)
+        self.assertEqual(results["db"]["properties"]["provisioningState"], "Failed")
+        self.assertEqual(set(results), {"db", "cache", "worker"})
+        self.assertEqual(scheduler.skipped, {"web": "db", "api": "web"})
+        self.assertNotIn("web", deployment.started)
+
+    def test_resolve_service_dependencies(self):
+        db_depends_on = {"cache": {"condition": "service_started"}}
+        compose = ComposeFile({"services": {"web": {"image": "web", "depends_on": ["db"]},
+                                            "db": {"image": "db", "depends_on": db_depends_on},
+                                            "cache": {"image": "cache"}}})
+        self.assertEqual(resolve_service_dependencies(compose.services), {"web": ["db"], "db": ["cache"], "cache": []})
+
+        services = ComposeFile({"services": {"web": {"image": "web", "depends_on": ["db"]},
+                                             "db": {"image": "db"}}}).services
+        services["db"].depends_on = ["web"]
+        with self.assertRaisesRegex(InvalidArgumentValueError, "Circular dependency"):
+            resolve_service_dependencies(services)
+        services["db"].depends_on = ["missing"]
+        with self.assertRaisesRegex(InvalidArgumentValueError, "undefined"):
+            resolve_service_dependencies(services)
+
+    @mock.patch("azext_containerapp.custom._ensure_location_allowed")
+    @mock.patch("azext_containerapp.custom.ManagedEnvironmentClient.show", return_value={"location": "eastus"})
+    @mock.patch("azext_containerapp.custom.register_provider_if_needed")
+    def test_concurrent_deployments_do_not_share_definitions(self, *_):
+        services = {"web": ("nginx", "web-secret=web-value"), "db": ("postgres", "db-secret=db-value")}
+        both_creating = threading.Barrier(len(services))
+        envelopes = {}
+
+        def _create_or_update(cmd, resource_group_name, name, container_app_envelope, no_wait):
+            # both definitions are built before either of them is sent
+            both_creating.wait(5)
+            envelopes[name] = json.loads(json.dumps(container_app_envelope))
+            return {"name": name, "properties": {"provisioningState": "Succeeded"}}
+
+        def _deploy(service_name):
+            image, secret = services[service_name]
+            return create_containerapp(mock.MagicMock(), service_name, "rg", image=image, managed_env=ENV_ID,
+                                       secrets=[secret], no_wait=True, disable_warnings=True)
+
+        with mock.patch("azext_containerapp.custom.ContainerAppClient.create_or_update", side_effect=_create_or_update):
+            scheduler = ComposeDeploymentScheduler({"web": [], "db": []}, _deploy, None, polling_seconds=0.01)
+            scheduler.run()
+
+        for service_name, (image, secret) in services.items():
+            properties = envelopes[service_name]["properties"]
+            self.assertEqual(properties["template"]["containers"][0]["image"], image)
+            self.assertEqual(properties["template"]["containers"][0]["name"], service_name)
+            self.assertEqual([s["name"] for s in properties["configuration"]["secrets"]], [secret.split("=")[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+import threading
+import unittest
+from unittest import mock
+
+from azext_containerapp._clients import ContainerAppClient, list_pages
+from azext_containerapp.custom import list_containerapp
+
+ENV_ID = "/subscriptions/sub/resourceGroups/env-rg/providers/Microsoft.App/managedEnvironments/env1"
+
+
+def _app(name, env_id=ENV_ID):
+    return {"name": name, "properties": {"managedEnvironmentId": env_id}}
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class ContainerappListTest(unittest.TestCase):
+    def setUp(self):
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com/"
+
+    def test_list_pages_prefetches_next_page(self):
+        pages = {"page1": {"value": [1, 2], "nextLink": "page2"},
+                 "page2": {"value": [3], "nextLink": "page3"},
+                 "page3": {"value": [4]}}
+        requested = []
+        prefetched = threading.Event()
+
+        def _send(cli_ctx, method, url):
+            requested.append(url)
+            if url == "page2":
+                prefetched.set()
+            return FakeResponse(pages[url])
+
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=_send):
+            items = list_pages(self.cmd, "page1", formatter=lambda x: x * 10)
+            self.assertEqual(next(items), 10)
+            # the second page is requested while the first one is consumed
+            self.assertTrue(prefetched.wait(5))
+            self.assertEqual(list(items), [20, 30, 40])
+        self.assertEqual(requested, ["page1", "page2", "page3"])
+
+    def test_list_resource_groups_by_environment(self):
+        responses = [FakeResponse({"data": [{"resourceGroup": "rg1"}], "$skipToken": "token"}),
+                     FakeResponse({"data": [{"resourceGroup": "rg2"}]})]
+        bodies = []
+
+        def _send(cli_ctx, method, url, body):
+            bodies.append(json.loads(body))
+            return responses.pop(0)
+
+        with mock.patch("azext_containerapp._clients.send_raw_request", side_effect=_send), \
+                mock.patch("azext_containerapp._clients.get_subscription_id", return_value="sub"):
+            self.assertEqual(ContainerAppClient.list_resource_groups_by_environment(self.cmd, "Env1"), ["rg1", "rg2"])
+        self.assertIn("endswith '/managedenvironments/env1'", bodies[0]["query"])
+        self.assertEqual(bodies[1]["options"]["$skipToken"], "token")
+
+    @mock.patch("azext_containerapp.custom._validate_subscription_registered")
+    @mock.patch("azext_containerapp.custom.ManagedEnvironmentClient.show")
+    def test_list_by_environment(self, _show, _validate):
+        other_env = ENV_ID.replace("env1", "env2")
+        by_rg = {"rg1": [_app("a"), _app("b", other_env)], "rg2": [_app("c")], "env-rg": []}
+        with mock.patch.object(ContainerAppClient, "list_resource_groups_by_environment", return_value=["rg1", "rg2"]), \
+                mock.patch.object(ContainerAppClient, "list_by_resource_group",
+                                  side_effect=lambda cmd, resource_group_name: by_rg[resource_group_name]), \
+                mock.patch.object(ContainerAppClient, "iter_by_subscription", side_effect=AssertionError()):
+            apps = list_containerapp(self.cmd, managed_env="env1")
+            self.assertEqual([a["name"] for a in apps], ["a", "c"])
+            apps = list_containerapp(self.cmd, managed_env=ENV_ID)
+            self.assertEqual([a["name"] for a in apps], ["a", "c"])
+
+    @mock.patch("azext_containerapp.custom._validate_subscription_registered")
+    @mock.patch("azext_containerapp.custom.ManagedEnvironmentClient.show")
+    def test_list_by_environment_includes_environment_resource_group(self, _show, _validate):
+        # Resource Graph hasn't indexed the app just created in the resource group of the environment yet
+        by_rg = {"rg1": [_app("a")], "env-rg": [_app("new")]}
+        with mock.patch.object(ContainerAppClient, "list_resource_groups_by_environment", return_value=["rg1"]), \
+                mock.patch.object(ContainerAppClient, "list_by_resource_group",
+                                  side_effect=lambda cmd, resource_group_name: by_rg[resource_group_name]), \
+                mock.patch.object(ContainerAppClient, "iter_by_subscription", side_effect=AssertionError()):
+            apps = list_containerapp(self.cmd, managed_env=ENV_ID)
+            self.assertEqual([a["name"] for a in apps], ["a", "new"])
+
+    @mock.patch("azext_containerapp.custom._validate_subscription_registered")
+    def test_list_by_environment_without_resource_graph(self, _validate):
+        apps = [_app("a"), _app("b", ENV_ID.replace("env1", "env2"))]
+        with mock.patch.object(ContainerAppClient, "list_resource_groups_by_environment", side_effect=ValueError()), \
+                mock.patch.object(ContainerAppClient, "iter_by_subscription", return_value=iter(apps)):
+            self.assertEqual([a["name"] for a in list_containerapp(self.cmd, managed_env="env1")], ["a"])
+        # nothing indexed yet
+        with mock.patch.object(ContainerAppClient, "list_resource_groups_by_environment", return_value=[]), \
+                mock.patch.object(ContainerAppClient, "iter_by_subscription", return_value=iter(apps)):
+            self.assertEqual([a["name"] for a in list_containerapp(self.cmd, managed_env="env1")], ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from azext_containerapp._logstream_utils import LogFanIn, LogSource, clean_log_line, get_log_timestamp
+
+
+class FakeResponse:
+    def __init__(self, lines, status_code=200, error=None):
+        self.lines = lines
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.error = error
+
+    def iter_lines(self):
+        for line in self.lines:
+            yield line
+        if self.error:
+            raise self.error
+
+
+def _source(replica, container="app"):
+    return LogSource("rev1", replica, container, f"https://logs/{replica}/{container}")
+
+
+def _line(second, message):
+    return '{{"TimeStamp":"2023-01-01T00:00:{:02d}.0000000+00:00","Log":"{}"}}'.format(second, message).encode()
+
+
+class ContainerappLogStreamUtilsTest(unittest.TestCase):
+    def _run(self, sources, responses, follow=False, **kwargs):
+        lock = threading.Lock()
+        params_seen = []
+        self.headers_seen = []
+
+        def _get(url, **request_kwargs):
+            with lock:
+                params_seen.append((url, dict(request_kwargs["params"])))
+                self.headers_seen.append(request_kwargs["headers"])
+                pending = responses[url]
+                return pending.pop(0) if len(pending) > 1 else pending[0]
+
+        output = []
+        with mock.patch("azext_containerapp._logstream_utils.requests.get", side_effect=_get), \
+                mock.patch("azext_containerapp._logstream_utils.LOG_STREAM_RECONNECT_MAX_DELAY", 0):
+            LogFanIn(lambda: sources, {"Authorization": "Bearer token"},
+                     {"follow": str(follow).lower(), "tailLines": 20}, follow, **kwargs).run(output.append)
+        return output, params_seen
+
+    def test_merge_in_timestamp_order(self):
+        sources = [_source("replica-a"), _source("replica-b")]
+        responses = {
+            sources[0].url: [FakeResponse([_line(1, "a1"), _line(4, "a4")])],
+            sources[1].url: [FakeResponse([_line(2, "b2"), b"", _line(3, "b3")])],
+        }
+        output, _ = self._run(sources, responses)
+        self.assertEqual([line.split('"Log":')[1] for line in output], ['"a1"}', '"b2"}', '"b3"}', '"a4"}'])
+        self.assertTrue(output[0].startswith("[replica-a/app] {"))
+        self.assertTrue(output[1].startswith("[replica-b/app] {"))
+
+    def test_merge_lines_without_timestamp(self):
+        sources = [_source("replica-a"), _source("replica-b")]
+        future = b'{"TimeStamp":"2100-01-01T00:00:00.0000000+00:00","Log":"future"}'
+        responses = {
+            sources[0].url: [FakeResponse([_line(1, "a1"), b"no timestamp", future])],
+            sources[1].url: [FakeResponse([_line(2, "b2")])],
+        }
+        output, _ = self._run(sources, responses)
+        # the line without a timestamp is ordered by the time it was received
+        self.assertEqual([line.split("] ", 1)[1] for line in output],
+                         [_line(1, "a1").decode(), _line(2, "b2").decode(), "no timestamp", future.decode()])
+
+    def test_bounded_buffer(self):
+        sources = [_source("replica-a"), _source("replica-b")]
+        responses = {
+            sources[0].url: [FakeResponse([_line(s % 60, "a") for s in range(50)])],
+            sources[1].url: [FakeResponse([_line(s % 60, "b") for s in range(50)])],
+        }
+        output, _ = self._run(sources, responses, buffer_size=4)
+        self.assertEqual(len(output), 100)
+
+    def test_reconnect_dropped_stream(self):
+        source = _source("replica-a")
+        dropped = FakeResponse([_line(1, "before")], error=requests.exceptions.ChunkedEncodingError())
+        responses = {source.url: [dropped, FakeResponse([_line(2, "after")]), FakeResponse([], status_code=404)]}
+        output, params_seen = self._run([source], responses, follow=True)
+        self.assertEqual(len(output), 2)
+        self.assertIn("after", output[1])
+        # past lines are only requested on the first connection
+        self.assertEqual([params["tailLines"] for _, params in params_seen], [20, 0, 0])
+
+    def test_refresh_token_on_reconnect(self):
+        sources = [_source("replica-a"), _source("replica-b")]
+        responses = {source.url: [FakeResponse([], status_code=401), FakeResponse([], status_code=404)]
+                     for source in sources}
+        refresh_headers = mock.Mock(return_value={"Authorization": "Bearer refreshed"})
+        self._run(sources, responses, follow=True, refresh_headers=refresh_headers)
+        self.assertEqual(len(self.headers_seen), 4)
+        self.assertEqual([headers["Authorization"] for headers in self.headers_seen[:2]], ["Bearer token"] * 2)
+        self.assertEqual({headers["Authorization"] for headers in self.headers_seen[2:]}, {"Bearer refreshed"})
+        # the streams share the refreshed token
+        refresh_headers.assert_called_once_with()
+
+    def test_give_up_without_follow(self):
+        source = _source("replica-a")
+        responses = {source.url: [FakeResponse([], status_code=500)]}
+        output, params_seen = self._run([source], responses)
+        self.assertEqual(output, [])
+        self.assertEqual(len(params_seen), 3)
+
+    def test_get_log_timestamp(self):
+        self.assertEqual(get_log_timestamp('{"TimeStamp":"1970-01-01T00:00:01.5+00:00","Log":"x"}'), 1.5)
+        self.assertEqual(get_log_timestamp("1970-01-01T00:01:00Z starting"), 60)
+        self.assertEqual(get_log_timestamp("1970-01-01 01:00:00+01:00 starting"), 0)
+        self.assertIsNone(get_log_timestamp("starting"))
+        self.assertIsNone(get_log_timestamp('{"Log":"x"}'))
+
+    def test_clean_log_line(self):
+        self.assertEqual(clean_log_line(b'\\u0022a\\u002Bb\\u0027'), "\"a+b'")
+
+
+class ContainerappEnvLogsTest(unittest.TestCase):
+    @mock.patch("azext_containerapp.custom.get_subscription_id", return_value="sub")
+    @mock.patch("azext_containerapp.custom.show_managed_environment", return_value={"location": "westus"})
+    @mock.patch("azext_containerapp.custom.ManagedEnvironmentClient.get_auth_token",
+                return_value={"properties": {"token": "token"}})
+    def test_stream_environment_logs(self, _get_auth_token, _show, _get_subscription_id):
+        from azext_containerapp.custom import stream_environment_logs
+
+        with mock.patch("azext_containerapp.custom.requests.get",
+                        return_value=FakeResponse([b"line1", b"", b"line2"])) as get, \
+                mock.patch("builtins.print") as print_fn:
+            stream_environment_logs(mock.MagicMock(), "rg", "env1", follow=True, tail=10)
+
+        self.assertEqual(get.call_args[0][0], "https://westus.azurecontainerapps.dev/subscriptions/sub/resourceGroups/rg"
+                                              "/managedEnvironments/env1/eventstream")
+        self.assertEqual(get.call_args[1]["headers"], {"Authorization": "Bearer token"})
+        self.assertEqual(get.call_args[1]["params"], {"follow": "true", "tailLines": 10})
+        self.assertEqual([c[0][0] for c in print_fn.call_args_list], ["line1", "line2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -379,7 +379,7 @@ class ContainerappScenarioTest(ScenarioTest):
         expected_output = ["root", "/usr/src/app", "-rw-r--r--    1 root     root           267 Oct 15 00:21 index.js"]
 
         idx = [0]
-        def mock_getch():
+        def mock_read(timeout):
             ch = commands[idx[0]].encode("utf-8")
             idx[0] = (idx[0] + 1) % len(commands)
             return ch
@@ -404,7 +404,7 @@ class ContainerappScenarioTest(ScenarioTest):
             mock_lib = "azext_containerapp._ssh_utils.enable_vt_mode"
 
         with mock.patch("builtins.print", side_effect=mock_print), mock.patch(mock_lib):
-            with mock.patch("azext_containerapp._ssh_utils._getch_unix", side_effect=mock_getch), mock.patch("azext_containerapp._ssh_utils._getch_windows", side_effect=mock_getch):
+            with mock.patch("azext_containerapp._ssh_utils._get_stdin_reader_unix", return_value=mock_read), mock.patch("azext_containerapp._ssh_utils._read_stdin_windows", side_effect=mock_read):
                 containerapp_ssh(cmd=cmd, resource_group_name=namespace.resource_group_name, name=namespace.name,
                                     container=namespace.container, revision=namespace.revision, replica=namespace.replica, startup_command="sh")
         for line in expected_output:
@@ -0,0 +1,137 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import platform
+import signal
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_containerapp._ssh_utils import (_send_stdin, _get_stdin_reader_unix, read_ssh, TerminalResizer,
+                                           SSH_INPUT_PREFIX, SSH_TERM_RESIZE_PREFIX, SSH_STDIN_MAX_FRAME_SIZE)
+
+
+class EchoConnection:
+    """A local stand-in for the exec WebSocket: stdin frames are echoed back as stdout frames."""
+
+    def __init__(self, expected_bytes=None):
+        self.is_connected = True
+        self.frames = []
+        self.echoed = bytearray()
+        self.expected_bytes = expected_bytes
+        self.done = threading.Event()
+        self._responses = []
+        self._lock = threading.Condition()
+
+    def send(self, frame):
+        self.frames.append(frame)
+        if frame.startswith(SSH_INPUT_PREFIX):
+            with self._lock:
+                self._responses.append(b"\x00\x01" + frame[len(SSH_INPUT_PREFIX):])
+                self._lock.notify()
+
+    def recv(self):
+        with self._lock:
+            while not self._responses and self.is_connected:
+                self._lock.wait(0.1)
+            response = self._responses.pop(0) if self._responses else b""
+        self.echoed += response[2:]
+        if self.expected_bytes is not None and len(self.echoed) >= self.expected_bytes:
+            self.done.set()
+        return response
+
+    def disconnect(self):
+        self.is_connected = False
+
+
+def _input_frames(connection):
+    return [frame for frame in connection.frames if frame.startswith(SSH_INPUT_PREFIX)]
+
+
+@unittest.skipIf(platform.system() == "Windows", "reads stdin from a pipe")
+class ContainerappSshUtilsTest(unittest.TestCase):
+    def setUp(self):
+        self.read_fd, self.write_fd = os.pipe()
+
+    def tearDown(self):
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _start_writer(self, connection):
+        writer = threading.Thread(target=_send_stdin, args=(connection, _get_stdin_reader_unix(self.read_fd)))
+        writer.daemon = True
+        writer.start()
+        return writer
+
+    def test_keystrokes_are_sent(self):
+        connection = EchoConnection()
+        writer = self._start_writer(connection)
+        os.write(self.write_fd, b"l")
+        time.sleep(0.1)
+        os.write(self.write_fd, b"s")
+        os.close(self.write_fd)
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(_input_frames(connection), [SSH_INPUT_PREFIX + b"l", SSH_INPUT_PREFIX + b"s"])
+
+    def test_paste_is_coalesced(self):
+        script = b"echo hello world\n" * 2048  # ~34 KB
+        connection = EchoConnection(expected_bytes=len(script))
+        reader = threading.Thread(target=read_ssh, args=(connection, ["utf-8"]))
+        reader.daemon = True
+        with mock.patch("builtins.print"):
+            reader.start()
+            # the whole paste is in the pipe when the writer first reads it
+            os.write(self.write_fd, script)
+            writer = self._start_writer(connection)
+            self.assertTrue(connection.done.wait(10))
+            connection.disconnect()
+            os.close(self.write_fd)
+            writer.join(5)
+
+        frames = _input_frames(connection)
+        self.assertEqual(b"".join(frame[len(SSH_INPUT_PREFIX):] for frame in frames), script)
+        self.assertTrue(all(len(frame) <= len(SSH_INPUT_PREFIX) + SSH_STDIN_MAX_FRAME_SIZE for frame in frames))
+        # one frame per keystroke would be more than 30000 frames, the paste fills whole frames but the last
+        self.assertEqual(len(frames), -(-len(script) // SSH_STDIN_MAX_FRAME_SIZE))
+
+    def test_resize_only_when_changed(self):
+        connection = EchoConnection()
+        resizer = TerminalResizer(connection)
+        size = os.terminal_size((80, 24))
+        with mock.patch("os.get_terminal_size", return_value=size):
+            resizer.update()
+            resizer.update()
+        with mock.patch("os.get_terminal_size", return_value=os.terminal_size((120, 40))):
+            resizer.update()
+        resizes = [frame for frame in connection.frames if frame.startswith(SSH_TERM_RESIZE_PREFIX)]
+        self.assertEqual(resizes, [SSH_TERM_RESIZE_PREFIX + b'{"Width": 80, "Height": 24}',
+                                   SSH_TERM_RESIZE_PREFIX + b'{"Width": 120, "Height": 40}'])
+
+    def test_resize_handler_is_restored(self):
+        previous_handler = mock.Mock()
+        signal.signal(signal.SIGWINCH, previous_handler)
+        try:
+            resizer = TerminalResizer(EchoConnection())
+            resizer.install()
+            self.assertEqual(signal.getsignal(signal.SIGWINCH), resizer.update)
+            resizer.uninstall()
+            self.assertIs(signal.getsignal(signal.SIGWINCH), previous_handler)
+        finally:
+            signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+
+    def test_resize_without_terminal(self):
+        connection = EchoConnection()
+        with mock.patch("os.get_terminal_size", side_effect=OSError()):
+            TerminalResizer(connection).update()
+        self.assertEqual(connection.frames, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
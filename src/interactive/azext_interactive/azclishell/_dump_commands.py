@@ -3,7 +3,6 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import json
 import os
 import yaml  # pylint: disable=import-error
 
@@ -13,6 +12,8 @@ from knack.help import REQUIRED_TAG
 from knack.help_files import helps
 from knack.log import get_logger
 
+from .command_index import get_index_path, get_versions_key, read_versions_key, write_command_index
+
 
 logger = get_logger(__name__)
 
@@ -90,6 +91,14 @@ class FreshTable(object):
         register_ids_argument(shell_ctx.cli_ctx)
         shell_ctx.cli_ctx.raise_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, commands_loader=main_loader)
         cmd_table = main_loader.command_table
+        FreshTable.loader = main_loader
+
+        # the descriptions and help files only change when the CLI or an extension is updated
+        index_path = os.path.join(get_cache_dir(shell_ctx), shell_ctx.config.get_command_index())
+        versions_key = get_versions_key()
+        if read_versions_key(get_index_path(index_path, versions_key)) == versions_key:
+            logger.debug('Command index is up to date: %s sec', timeit.default_timer() - start_time)
+            return
 
         cmd_table_data = {}
         for command_name, cmd in cmd_table.items():
@@ -120,14 +129,11 @@ class FreshTable(object):
                 pass
 
         load_help_files(cmd_table_data)
-        elapsed = timeit.default_timer() - start_time
-        logger.debug('Command table dumped: %s sec', elapsed)
-        FreshTable.loader = main_loader
 
         # dump into the cache file
-        command_file = shell_ctx.config.get_help_files()
-        with open(os.path.join(get_cache_dir(shell_ctx), command_file), 'w') as help_file:
-            json.dump(cmd_table_data, help_file, default=lambda x: x.target or '', skipkeys=True)
+        write_command_index(index_path, cmd_table_data, versions_key)
+        elapsed = timeit.default_timer() - start_time
+        logger.debug('Command table dumped: %s sec', elapsed)
 
 
 def load_help_files(data):
@@ -201,10 +201,18 @@ class AzInteractiveShell(object):
         if not self.completer:
             self.completer.start(command_info)
         self.completer.initialize_command_table_attributes()
+        self.completer.completion_cache.on_update = self.on_completions_fetched
+        self.completer.prewarm_completions()
         if not self.lexer:
             self.lexer = get_az_lexer(command_info)
         self._cli = None
 
+    def on_completions_fetched(self, _):
+        """ shows the completions fetched in the background if the user is still waiting for them """
+        cli = self._cli
+        if cli and cli.current_buffer_name == DEFAULT_BUFFER:
+            cli.eventloop.call_from_executor(cli.start_completion)
+
     def _space_examples(self, list_examples, rows, section_value):
         """ makes the example text """
         examples_with_index = []
@@ -737,5 +745,6 @@ class AzInteractiveShell(object):
                         telemetry.set_failure()
                     else:
                         telemetry.set_success()
+                        self.completer.record_command(parse_quotes(cmd))
                     telemetry.flush()
         telemetry.conclude()
@@ -5,6 +5,7 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import heapq
 import os
 
 from azure.cli.core.parser import AzCliCommandParser
@@ -17,9 +18,17 @@ from prompt_toolkit.completion import Completer, Completion  # pylint: disable=i
 
 from . import configuration
 from .argfinder import ArgsFinder
+from .command_tree import PrefixIndex
+from .completion_cache import CompletionCache, FIRST_FETCH_WAIT
+from .frequency_heuristic import load_command_frequency, update_command_frequency
 from .util import parse_quotes
 
 SELECT_SYMBOL = configuration.SELECT_SYMBOL
+# the most command and parameter completions shown for a keystroke
+MAX_COMPLETIONS = 50
+# the arguments whose completions are fetched at startup for the most used commands
+PREWARM_ARGUMENTS = ('resource_group_name',)
+PREWARM_COMMANDS = 5
 
 
 def error_pass(_, message):  # pylint: disable=unused-argument
@@ -34,6 +43,22 @@ def _check_value_muted(_, action, value):
         raise argparse.ArgumentError(action, msg)
 
 
+def run_completer(completer, prefix, parsed_args):
+    """ runs a completer of the command table """
+    # there are 3 formats for completers the cli uses
+    # this try catches which format it is
+    try:
+        return completer(prefix=prefix, action=None, parsed_args=parsed_args)
+    except TypeError:
+        try:
+            return completer(prefix=prefix)
+        except TypeError:
+            try:
+                return completer()
+            except TypeError:
+                return []  # other completion method used
+
+
 def sort_completions(completions_gen):
     """ sorts the completions """
     from knack.help import REQUIRED_TAG
@@ -48,6 +73,17 @@ def sort_completions(completions_gen):
     return sorted(completions_gen, key=_get_weight)
 
 
+def rank_completions(completions_gen, get_frequency, limit=MAX_COMPLETIONS):
+    """ the top completions, with required things first, then the most used, then lexicographically """
+    from knack.help import REQUIRED_TAG
+
+    def _get_rank(val):
+        required = bool(val.display_meta and val.display_meta.startswith(REQUIRED_TAG))
+        return not required, -get_frequency(val.text), val.text
+
+    return heapq.nsmallest(limit, completions_gen, key=_get_rank)
+
+
 # pylint: disable=too-many-instance-attributes
 class AzCompleter(Completer):
     """ Completes Azure CLI commands """
@@ -58,7 +94,7 @@ class AzCompleter(Completer):
 
         # dictionary of command to descriptions
         self.command_description = {}
-        # a list of all the possible parameters
+        # a set of all the possible parameters
         self.completable_param = None
         # the command tree
         self.command_tree = None
@@ -69,6 +105,10 @@ class AzCompleter(Completer):
         self.command_examples = None
         # a dictionary of commands with parameters with multiple names (e.g. {'vm create':{-n: --name}})
         self.command_param_info = {}
+        # from a command to a prefix index of its parameters, built when the command is first completed
+        self.command_param_index = {}
+        # how many times each command, group and parameter has been used
+        self.command_frequency = {}
 
         # information about what completions to generate
         self.current_command = ''
@@ -76,6 +116,15 @@ class AzCompleter(Completer):
         self.subtree = None
         self.leftover_args = None
         self.complete_command = False
+        # the text and the command or parameter names matching the unfinished word at the last keystroke
+        self.last_text = None
+        self.candidates = []
+        # the text before the unfinished word and its parsed arguments at the last dynamic completion
+        self.last_parsed_args = None
+        # the results of the argument completers, such as the names of resource groups
+        self.completion_cache = CompletionCache()
+        # the modification time of the profile file and the default subscription read from it
+        self.default_subscription = None
 
         self.global_param = []
         self.output_choices = []
@@ -102,6 +151,9 @@ class AzCompleter(Completer):
         self.param_description = commands.param_descript
         self.command_examples = commands.command_example
         self.command_param_info = commands.command_param_info or self.command_param_info
+        self.command_param_index = {}
+        self.command_frequency = load_command_frequency(self.shell_ctx)
+        self.last_text = None
 
         if global_params:
             self.global_param = commands.global_param
@@ -116,6 +168,7 @@ class AzCompleter(Completer):
             self.cmdtab = loader.command_table
             self.parser.load_command_table(loader)
             self.argsfinder = ArgsFinder(self.parser)
+            self.last_parsed_args = None
 
     def validate_param_completion(self, param, leftover_args):
         """ validates that a param should be completed """
@@ -160,6 +213,31 @@ class AzCompleter(Completer):
         self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_PRE_COMPLETER_TEXT_PARSING, event_payload=event_payload)
         # Reload various attributes from event_payload
         text = event_payload.get('text', text)
+        self.update_state(text)
+        self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_POST_SUB_TREE_CREATE, subtree=self.subtree)
+
+        for comp in rank_completions(self.gen_cmd_and_param_completions(), self.get_frequency):
+            yield comp
+
+        for comp in sort_completions(self.gen_global_params_and_arg_completions()):
+            yield comp
+
+        if self.complete_command and self.cmdtab and self.leftover_args and self.leftover_args[-1].startswith('-'):
+            for comp in sort_completions(self.gen_dynamic_completions(text)):
+                yield comp
+
+    def update_state(self, text):
+        """ finds the command and the unfinished word, reusing the last keystroke when characters were appended """
+        appended = text[len(self.last_text):] if self.last_text is not None and text.startswith(self.last_text) \
+            else None
+        self.last_text = text
+        if appended is not None and not any(char.isspace() for char in appended):
+            # still the same word, so only the previous matches can match the longer prefix
+            self.unfinished_word += appended
+            prefix = self.unfinished_word.lower()
+            self.candidates = [name for name in self.candidates if name.lower().startswith(prefix)]
+            return
+
         text_split = text.split()
         self.unfinished_word = ''
         new_word = text and text[-1].isspace()
@@ -168,18 +246,26 @@ class AzCompleter(Completer):
             text_split = text_split[:-1]
 
         self.subtree, self.current_command, self.leftover_args = self.command_tree.get_sub_tree(text_split)
-        self.shell_ctx.cli_ctx.raise_event(EVENT_INTERACTIVE_POST_SUB_TREE_CREATE, subtree=self.subtree)
         self.complete_command = not self.subtree.children
+        if self.complete_command:
+            self.candidates = list(self.get_param_index(self.current_command).starting_with(self.unfinished_word))
+        elif not self.leftover_args:
+            self.candidates = list(self.subtree.children_starting_with(self.unfinished_word))
+        else:
+            self.candidates = []
 
-        for comp in sort_completions(self.gen_cmd_and_param_completions()):
-            yield comp
-
-        for comp in sort_completions(self.gen_global_params_and_arg_completions()):
-            yield comp
+    def get_frequency(self, name):
+        """ how many times a child command or parameter of the current command has been used """
+        return self.command_frequency.get((self.current_command + ' ' + name).strip(), 0)
 
-        if self.complete_command and self.cmdtab and self.leftover_args and self.leftover_args[-1].startswith('-'):
-            for comp in sort_completions(self.gen_dynamic_completions(text)):
-                yield comp
+    def record_command(self, args):
+        """ counts a use of the command in the arguments and the parameters it was given """
+        if not self.started:
+            return
+        _, command, leftover_args = self.command_tree.get_sub_tree(args)
+        if command:
+            params = [arg for arg in leftover_args if arg in self.command_param_info.get(command, {})]
+            update_command_frequency(self.shell_ctx, command, params, self.command_frequency)
 
     def gen_enum_completions(self, arg_name):
         """ generates dynamic enumeration completions """
@@ -220,10 +306,44 @@ class AzCompleter(Completer):
         AzCliCommandParser._check_value = _check_value
         return parse_args
 
-    # pylint: disable=too-many-branches
+    def get_parsed_args(self, text):
+        """ the parsed arguments of the text, reused while the same word is being typed """
+        before_word = text[:len(text) - len(self.unfinished_word)]
+        if self.last_parsed_args is None or self.last_parsed_args[0] != before_word:
+            self.last_parsed_args = (before_word, self.mute_parse_args(text))
+        return self.last_parsed_args[1]
+
+    def get_completion_key(self, command, arg_name, parsed_args, prefix=''):
+        """ identifies the dynamic completions of an argument given the other arguments and the subscription """
+        context = []
+        for name, argument in self.cmdtab[command].arguments.items():
+            value = getattr(parsed_args, name, None)
+            if name != arg_name and value is not None and value != argument.type.settings.get('default'):
+                context.append((name, str(value)))
+
+        subscription = getattr(parsed_args, 'subscription', None) or getattr(parsed_args, '_subscription', None)
+        return command, arg_name, tuple(context), subscription or self.get_default_subscription(), prefix
+
+    def get_default_subscription(self):
+        """ the default subscription, looked up again only when the profile file changes """
+        try:
+            profile_path = os.path.join(self.shell_ctx.cli_ctx.config.config_dir, 'azureProfile.json')
+            profile_mtime = os.stat(profile_path).st_mtime_ns
+        except (AttributeError, OSError):
+            profile_mtime = None
+
+        if self.default_subscription is None or self.default_subscription[0] != profile_mtime:
+            try:
+                from azure.cli.core._profile import Profile
+                subscription = Profile(cli_ctx=self.shell_ctx.cli_ctx).get_subscription_id()
+            except Exception:  # pylint: disable=broad-except
+                subscription = None
+            self.default_subscription = (profile_mtime, subscription)
+        return self.default_subscription[1]
+
     def gen_dynamic_completions(self, text):
         """ generates the dynamic values, like the names of resource groups """
-        try:  # pylint: disable=too-many-nested-blocks
+        try:
             param = self.leftover_args[-1]
 
             # command table specific name
@@ -232,26 +352,17 @@ class AzCompleter(Completer):
             for comp in self.gen_enum_completions(arg_name):
                 yield comp
 
-            parsed_args = self.mute_parse_args(text)
-
-            # there are 3 formats for completers the cli uses
-            # this try catches which format it is
-            if self.cmdtab[self.current_command].arguments[arg_name].completer:
-                completions = []
-                try:
-                    completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                        prefix=self.unfinished_word, action=None, parsed_args=parsed_args)
-                except TypeError:
-                    try:
-                        completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                            prefix=self.unfinished_word)
-                    except TypeError:
-                        try:
-                            completions = self.cmdtab[self.current_command].arguments[arg_name].completer()
-                        except TypeError:
-                            pass  # other completion method used
-
-                for comp in completions:
+            completer = self.cmdtab[self.current_command].arguments[arg_name].completer
+            if completer:
+                parsed_args = self.get_parsed_args(text)
+                # completers of paths list the directory being typed, the others are given no prefix
+                separator = max(self.unfinished_word.rfind('/'), self.unfinished_word.rfind(os.sep))
+                prefix = self.unfinished_word[:separator + 1]
+                key = self.get_completion_key(self.current_command, arg_name, parsed_args, prefix)
+                completions = self.completion_cache.get(
+                    key, lambda: run_completer(completer, prefix, parsed_args), wait=FIRST_FETCH_WAIT)
+
+                for comp in completions or []:
                     for completion in self.process_dynamic_completion(comp):
                         yield completion
 
@@ -259,6 +370,20 @@ class AzCompleter(Completer):
         except Exception:  # pylint: disable=broad-except
             pass
 
+    def prewarm_completions(self, max_commands=PREWARM_COMMANDS):
+        """ fetches the dynamic completions of common arguments of the most used commands in the background """
+        if not self.cmdtab:
+            return
+        commands = [command for command in self.cmdtab if command in self.command_frequency]
+        for command in heapq.nlargest(max_commands, commands, key=self.command_frequency.get):
+            for arg_name in PREWARM_ARGUMENTS:
+                argument = self.cmdtab[command].arguments.get(arg_name)
+                if argument and argument.completer:
+                    parsed_args = self.mute_parse_args(command)
+                    key = self.get_completion_key(command, arg_name, parsed_args)
+                    self.completion_cache.prewarm(
+                        key, lambda completer=argument.completer, args=parsed_args: run_completer(completer, '', args))
+
     def yield_param_completion(self, param, last_word):
         """ yields a parameter """
         return Completion(param, -len(last_word), display_meta=self.param_description.get(
@@ -267,13 +392,19 @@ class AzCompleter(Completer):
     def gen_cmd_and_param_completions(self):
         """ generates command and parameter completions """
         if self.complete_command:
-            for param in self.command_param_info.get(self.current_command, []):
+            for param in self.candidates:
                 if self.validate_param_completion(param, self.leftover_args):
                     yield self.yield_param_completion(param, self.unfinished_word)
-        elif not self.leftover_args:
-            for child_command in self.subtree.children:
-                if self.validate_completion(child_command):
-                    yield Completion(child_command, -len(self.unfinished_word))
+        else:
+            for child_command in self.candidates:
+                yield Completion(child_command, -len(self.unfinished_word))
+
+    def get_param_index(self, command):
+        """ the prefix index of the parameters of a command """
+        param_index = self.command_param_index.get(command)
+        if param_index is None:
+            param_index = self.command_param_index[command] = PrefixIndex(self.command_param_info.get(command, []))
+        return param_index
 
     def gen_global_params_and_arg_completions(self):
         # global parameters
@@ -24,7 +24,7 @@ def get_az_lexer(commands):
                            prefix=r'\b',
                            suffix=r'\b'),
                      Keyword.Declaration),  # all other commands
-                    (words(tuple(param for param in commands.completable_param + commands.global_param),
+                    (words(tuple(commands.completable_param.union(commands.global_param)),
                            prefix=r'\B',
                            suffix=r'\b'),
                      Name.Class),  # parameters
@@ -0,0 +1,195 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from knack.log import get_logger
+
+
+logger = get_logger(__name__)
+
+INDEX_MAGIC = b'AZSHIDX1'
+# magic, versions key, header length
+HEADER_PREFIX = struct.Struct('<8s64sI')
+SUPPRESSED = '==SUPPRESS=='
+
+
+def get_versions_key():
+    """ identifies the installed CLI and extensions the command table was generated for """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core.extension import get_extensions
+
+    versions = ['azure-cli-core=' + core_version]
+    try:
+        versions.extend(sorted('{}={}'.format(ext.name, ext.version) for ext in get_extensions()))
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.debug('Unable to list the installed extensions: %s', ex)
+    return hashlib.sha256(';'.join(versions).encode('utf-8')).hexdigest()
+
+
+def get_index_path(index_path, versions_key):
+    """
+    the file of the index of a versions key
+
+    Each version of the index has its own file, as running shells keep the file they loaded mapped into memory,
+    which prevents replacing it on Windows.
+    """
+    root, ext = os.path.splitext(index_path)
+    return '{}-{}{}'.format(root, versions_key[:16], ext)
+
+
+def find_command_index(index_path):
+    """ the most recently written version of the index, None if there is none """
+    root, ext = os.path.splitext(index_path)
+    newest, newest_mtime = None, None
+    for path in glob.glob(glob.escape(root) + '-*' + ext):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if newest_mtime is None or mtime > newest_mtime:
+            newest, newest_mtime = path, mtime
+    return newest
+
+
+def write_command_index(index_path, data, versions_key):
+    """
+    writes the command table data into a binary index, returns the file it is written to
+
+    After a fixed size prefix with the versions key, a JSON header holds the skeleton of every command and group:
+    whether it is a command, the aliases of its visible parameters, and the offset and length of its details.
+    The details (descriptions, parameter help and examples) follow as one JSON document per command and are only
+    read when the shell needs them.
+    """
+    skeleton = {}
+    blobs = []
+    offset = 0
+    for command, entry in data.items():
+        is_command = 'parameters' in entry
+        parameters = _visible_parameters(entry)
+        blob = json.dumps(_get_details(entry, parameters), default=lambda x: x.target or '',
+                          separators=(',', ':')).encode('utf-8')
+        skeleton[command] = [is_command, [param['name'] for param in parameters], offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps(skeleton, separators=(',', ':')).encode('utf-8')
+    path = get_index_path(index_path, versions_key)
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as index_file:
+            index_file.write(HEADER_PREFIX.pack(INDEX_MAGIC, versions_key.encode('ascii'), len(header)))
+            index_file.write(header)
+            for blob in blobs:
+                index_file.write(blob)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    _remove_stale_indexes(index_path, path)
+    return path
+
+
+def _remove_stale_indexes(index_path, current_path):
+    # also the index written before the files were versioned and the files left by interrupted dumps
+    pattern = glob.escape(os.path.splitext(index_path)[0]) + '*' + os.path.splitext(index_path)[1]
+    for path in glob.glob(pattern) + glob.glob(pattern + '.tmp'):
+        if path == current_path:
+            continue
+        try:
+            os.remove(path)
+        except OSError as ex:
+            # still mapped by a running shell on Windows, removed by the next dump
+            logger.debug('Unable to remove the previous command index: %s', ex)
+
+
+def read_versions_key(path):
+    """ reads the versions key of an index without loading it, None if there is no valid index """
+    try:
+        with open(path, 'rb') as index_file:
+            magic, versions_key, _ = HEADER_PREFIX.unpack(index_file.read(HEADER_PREFIX.size))
+    except (IOError, struct.error):
+        return None
+    return versions_key.decode('ascii') if magic == INDEX_MAGIC else None
+
+
+def _visible_parameters(entry):
+    return [param for param in entry.get('parameters', {}).values() if SUPPRESSED not in (param.get('help') or '')]
+
+
+def _get_details(entry, parameters):
+    return {
+        'help': entry.get('help'),
+        'examples': entry.get('examples') or [],
+        'parameters': [[param['required'], param['help']] for param in parameters]
+    }
+
+
+class CommandIndex(object):
+    """ the skeleton of the cached command table, with details loaded on demand """
+
+    def __init__(self, commands, versions_key=None, read_details=None):
+        # command or group name to [is_command, parameter aliases, offset, length]
+        self.commands = commands
+        self.versions_key = versions_key
+        self._read_details = read_details
+        self._details = {}
+
+    @classmethod
+    def load(cls, path):
+        """ maps the index file into memory and reads only its header """
+        with open(path, 'rb') as index_file:
+            try:
+                data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError('Empty command index: {}'.format(path))
+        if len(data) < HEADER_PREFIX.size:
+            raise ValueError('Truncated command index: {}'.format(path))
+        magic, versions_key, header_length = HEADER_PREFIX.unpack_from(data)
+        if magic != INDEX_MAGIC:
+            raise ValueError('Unrecognized command index: {}'.format(path))
+        start = HEADER_PREFIX.size + header_length
+        commands = json.loads(data[HEADER_PREFIX.size:start].decode('utf-8'))
+
+        def _read_details(offset, length):
+            return json.loads(data[start + offset:start + offset + length].decode('utf-8'))
+
+        return cls(commands, versions_key.decode('ascii'), _read_details)
+
+    @classmethod
+    def from_data(cls, data):
+        """ wraps command table data already in memory, such as a help dump from an older version """
+        index = cls({})
+        for command, entry in data.items():
+            parameters = _visible_parameters(entry)
+            index.commands[command] = ['parameters' in entry, [param['name'] for param in parameters], None, None]
+            index._details[command] = _get_details(entry, parameters)  # pylint: disable=protected-access
+        return index
+
+    def is_command(self, command):
+        """ whether the name is a command rather than a group """
+        entry = self.commands.get(command)
+        return bool(entry and entry[0])
+
+    def get_parameters(self, command):
+        """ the alias lists of the visible parameters of a command """
+        entry = self.commands.get(command)
+        return entry[1] if entry else []
+
+    def get_details(self, command):
+        """
+        the description, examples and parameter help of a command or group, with the [required tag, help] of each
+        parameter in the same order as get_parameters
+        """
+        details = self._details.get(command)
+        if details is None and command in self.commands and self._read_details:
+            _, _, offset, length = self.commands[command]
+            details = self._details[command] = self._read_details(offset, length)
+        return details or {}
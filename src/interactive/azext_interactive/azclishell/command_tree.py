@@ -3,6 +3,26 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from bisect import bisect_left
+
+
+class PrefixIndex(object):
+    """ a sorted, case insensitive index of words for prefix lookups """
+    def __init__(self, words=()):
+        self._keys = sorted((word.lower(), word) for word in set(words))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def starting_with(self, prefix):
+        """ yields the words that start with the prefix, ignoring case, in lexicographical order """
+        prefix = prefix.lower()
+        for position in range(bisect_left(self._keys, (prefix,)), len(self._keys)):
+            key, word = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            yield word
+
 
 class CommandTree(object):
     """ a command tree """
@@ -12,6 +32,7 @@ class CommandTree(object):
             self.children = {}
         else:
             self.children = children
+        self._children_index = None
 
     def get_child(self, child_name):  # pylint: disable=no-self-use
         """ returns the object with the name supplied """
@@ -24,11 +45,18 @@ class CommandTree(object):
         """ adds a child to this branch """
         # TODO allow adding child_name
         self.children[child.data] = child
+        self._children_index = None
 
     def has_child(self, name):
         """ whether this has a child """
         return self.children.get(name, None) is not None
 
+    def children_starting_with(self, prefix):
+        """ the names of the children that start with the prefix, ignoring case """
+        if self._children_index is None or len(self._children_index) != len(self.children):
+            self._children_index = PrefixIndex(self.children)
+        return self._children_index.starting_with(prefix)
+
     def in_tree(self, cmd_args):
         """ if a command is in the tree """
         if not cmd_args:
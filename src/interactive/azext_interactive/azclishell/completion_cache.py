@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from knack.log import get_logger
+
+
+logger = get_logger(__name__)
+
+# seconds before cached completions are refreshed
+COMPLETION_TTL = 120
+# seconds to wait for completions that have never been fetched before showing nothing
+FIRST_FETCH_WAIT = 0.5
+FETCH_WORKERS = 2
+
+
+class CompletionCache(object):
+    """
+    runs dynamic completers on background threads and keeps their results
+
+    Expired results are still returned while they are refreshed, so only the first lookup of a key waits on the
+    completer. on_update is called with the key from the fetching thread whenever new results are stored.
+    """
+
+    def __init__(self, ttl=COMPLETION_TTL, on_update=None, max_workers=FETCH_WORKERS):
+        self.ttl = ttl
+        self.on_update = on_update
+        self.max_workers = max_workers
+        # key to (time fetched, completions)
+        self._entries = {}
+        # key to the future of the fetch in progress
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def get(self, key, fetch, wait=0):
+        """
+        the completions for a key, None if they have not been fetched yet
+
+        fetch is called on a background thread when the key is missing or expired, waiting up to `wait`
+        seconds for it when there is nothing cached to show in the meantime.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            future = None
+            if entry is None or time.time() - entry[0] > self.ttl:
+                future = self._refresh(key, fetch)
+
+        if entry is None and future is not None and wait:
+            try:
+                future.result(timeout=wait)
+            except FutureTimeoutError:
+                pass
+            with self._lock:
+                entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def prewarm(self, key, fetch):
+        """ fetches the completions for a key in the background unless they are already cached """
+        self.get(key, fetch)
+
+    def clear(self):
+        """ forgets every cached completion """
+        with self._lock:
+            self._entries.clear()
+
+    def _refresh(self, key, fetch):
+        future = self._pending.get(key)
+        if future is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='az-interactive-completion')
+            future = self._pending[key] = self._executor.submit(self._fetch, key, fetch)
+        return future
+
+    def _fetch(self, key, fetch):
+        try:
+            completions = list(fetch() or [])
+        except Exception as ex:  # pylint: disable=broad-except
+            # e.g. the user is not logged in, try again on the next lookup
+            logger.debug('Unable to fetch completions for %s: %s', key, ex)
+            completions = None
+
+        with self._lock:
+            self._pending.pop(key, None)
+            if completions is not None:
+                self._entries[key] = (time.time(), completions)
+        if completions is not None and self.on_update:
+            self.on_update(key)
@@ -65,8 +65,10 @@ class Configuration(object):
         self.config.add_section('Help Files')
         self.config.add_section('Layout')
         self.config.set('Help Files', 'command', 'help_dump.json')
+        self.config.set('Help Files', 'index', 'command_index.bin')
         self.config.set('Help Files', 'history', 'history.txt')
         self.config.set('Help Files', 'frequency', 'frequency.json')
+        self.config.set('Help Files', 'command_frequency', 'command_frequency.json')
         self.config.set('Layout', 'command_description', 'yes')
         self.config.set('Layout', 'param_description', 'yes')
         self.config.set('Layout', 'examples', 'yes')
@@ -85,6 +87,10 @@ class Configuration(object):
     def get_config_dir(self):
         return self.config_dir
 
+    def get_command_index(self):
+        """ returns where the command index is cached """
+        return self.config.get('Help Files', 'index')
+
     def get_history(self):
         """ returns the history """
         return self.config.get('Help Files', 'history')
@@ -97,6 +103,10 @@ class Configuration(object):
         """ returns the name of the frequency file """
         return self.config.get('Help Files', 'frequency')
 
+    def get_command_frequency(self):
+        """ returns the name of the file counting how often commands and parameters are used """
+        return self.config.get('Help Files', 'command_frequency')
+
     def load(self, path):
         """ loads the configuration settings """
         self.config.read(path)
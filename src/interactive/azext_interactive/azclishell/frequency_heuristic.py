@@ -53,3 +53,31 @@ def frequency_measurement(shell_ctx):
 def frequency_heuristic(shell_ctx):
     """ decides whether user meets requirements for frequency """
     return frequency_measurement(shell_ctx) >= ACTIVE_STATUS
+
+
+def load_command_frequency(shell_ctx):
+    """ loads how many times each command, command group and parameter has been used """
+    frequency_path = os.path.join(shell_ctx.config.get_config_dir(), shell_ctx.config.get_command_frequency())
+    try:
+        with open(frequency_path, 'r') as freq:
+            frequency = json.load(freq)
+    except (IOError, ValueError):
+        frequency = {}
+    return frequency if isinstance(frequency, dict) else {}
+
+
+def update_command_frequency(shell_ctx, command, params, frequency):
+    """ counts a use of a command, the groups it belongs to and its parameters, then saves the counts """
+    words = command.split()
+    keys = [' '.join(words[:position]) for position in range(1, len(words) + 1)]
+    keys.extend(command + ' ' + param for param in set(params))
+    for key in keys:
+        frequency[key] = frequency.get(key, 0) + 1
+
+    frequency_path = os.path.join(shell_ctx.config.get_config_dir(), shell_ctx.config.get_command_frequency())
+    try:
+        with open(frequency_path, 'w') as freq:
+            json.dump(frequency, freq)
+    except IOError:
+        pass
+    return frequency
@@ -6,8 +6,10 @@
 import math
 import os
 import json
+from collections.abc import MutableMapping
 from knack.log import get_logger
 
+from .command_index import CommandIndex, find_command_index
 from .command_tree import CommandBranch, CommandHead
 from .util import get_window_dim
 
@@ -68,23 +70,90 @@ def add_new_lines(long_phrase, line_min=None, tolerance=TOLERANCE):
     return long_phrase + "\n"
 
 
+def load_command_index(config):
+    """ loads the cached command index, or the help dump written by an older version of the shell """
+    cache_path = os.path.join(config.get_config_dir(), 'cache')
+    index_path = find_command_index(os.path.join(cache_path, config.get_command_index()))
+    if index_path:
+        return CommandIndex.load(index_path)
+
+    with open(os.path.join(cache_path, config.get_help_files()), 'r') as help_file:
+        return CommandIndex.from_data(json.load(help_file))
+
+
+class LazyHelpMapping(MutableMapping):
+    """ a mapping of the known keys to help text that is only loaded and formatted the first time it is used """
+
+    def __init__(self, keys, load):
+        self._keys = keys
+        self._load = load
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self._keys:
+                raise KeyError(key)
+            self._values[key] = self._load(key)
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        raise TypeError('help entries cannot be removed')
+
+    def __contains__(self, key):
+        return key in self._values or key in self._keys
+
+    def __iter__(self):
+        for key in self._keys:
+            yield key
+        for key in self._values:
+            if key not in self._keys:
+                yield key
+
+    def __len__(self):
+        return len(self._keys) + sum(1 for key in self._values if key not in self._keys)
+
+
+class _CommandParamKeys(object):  # pylint: disable=too-few-public-methods
+    """ the 'command parameter' keys of the parameter descriptions in a command index """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __contains__(self, key):
+        command, _, param = key.rpartition(' ')
+        return any(param in aliases for aliases in self.index.get_parameters(command))
+
+    def __iter__(self):
+        for command in self.index.commands:
+            for aliases in self.index.get_parameters(command):
+                for alias in aliases:
+                    yield command + " " + alias
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
 # pylint: disable=too-many-instance-attributes
 class GatherCommands(object):
     """ grabs all the cached commands from files """
     def __init__(self, config):
         # everything that is completable
-        self.completable = []
+        self.completable = set()
         # a completable to the description of what is does
         self.descrip = {}
         # from a command to a list of parameters
         self.command_param = {}
 
-        self.completable_param = []
+        self.completable_param = set()
         self.command_example = {}
         self.command_tree = CommandHead()
         self.param_descript = {}
         self.completer = None
         self.command_param_info = {}
+        self.command_index = None
 
         self.global_param_descriptions = GLOBAL_PARAM_DESCRIPTIONS
         self.output_choices = OUTPUT_CHOICES
@@ -98,8 +167,8 @@ class GatherCommands(object):
 
     def add_exit(self):
         """ adds the exits from the application """
-        self.completable.append("quit")
-        self.completable.append("exit")
+        self.completable.add("quit")
+        self.completable.add("exit")
 
         self.descrip["quit"] = "Exits the program"
         self.descrip["exit"] = "Exits the program"
@@ -112,62 +181,55 @@ class GatherCommands(object):
 
     def _gather_from_files(self, config):
         """ gathers from the files in a way that is convienent to use """
-        command_file = config.get_help_files()
-        cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
-
-        with open(os.path.join(cache_path, command_file), 'r') as help_file:
-            data = json.load(help_file)
+        index = self.command_index = load_command_index(config)
+        line_min = int(_get_window_columns()) - 2 * TOLERANCE
+
+        def _description(command):
+            return add_new_lines(index.get_details(command).get('help'), line_min=line_min)
+
+        def _examples(command):
+            return [[add_new_lines(example[0], line_min=line_min), add_new_lines(example[1], line_min=line_min)]
+                    for example in index.get_details(command).get('examples', [])]
+
+        def _param_description(command_param):
+            command, param = command_param.rsplit(' ', 1)
+            for aliases, (required, help_text) in zip(index.get_parameters(command),
+                                                      index.get_details(command).get('parameters', [])):
+                if param in aliases:
+                    return add_new_lines(required + " " + help_text, line_min=line_min)
+            raise KeyError(command_param)
+
+        # the descriptions and examples are only read from the index and formatted when they are displayed
+        self.descrip = LazyHelpMapping(index.commands, _description)
+        self.command_example = LazyHelpMapping(
+            set(command for command in index.commands if index.is_command(command)), _examples)
+        self.param_descript = LazyHelpMapping(_CommandParamKeys(index), _param_description)
         self.add_exit()
-        commands = data.keys()
 
-        for command in commands:
+        for command in index.commands:
             branch = self.command_tree
             for word in command.split():
-                if word not in self.completable:
-                    self.completable.append(word)
+                self.completable.add(word)
                 if not branch.has_child(word):
                     branch.add_child(CommandBranch(word))
                 branch = branch.get_child(word)
 
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
-
-            if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
-
-            command_params = data[command].get('parameters', {})
-            for param in command_params:
-                if '==SUPPRESS==' not in command_params[param]['help']:
-                    param_aliases = set()
-
-                    for par in command_params[param]['name']:
-                        param_aliases.add(par)
-
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
-                            self.completable_param.append(par)
-
-                    param_doubles = self.command_param_info.get(command, {})
-                    for alias in param_aliases:
-                        param_doubles[alias] = param_aliases
-                    self.command_param_info[command] = param_doubles
+            for aliases in index.get_parameters(command):
+                param_aliases = set(aliases)
+                self.completable_param.update(param_aliases)
+
+                param_doubles = self.command_param_info.get(command, {})
+                for alias in param_aliases:
+                    param_doubles[alias] = param_aliases
+                self.command_param_info[command] = param_doubles
 
     def get_all_subcommands(self):
         """ returns all the subcommands """
-        subcommands = []
+        kids = self.command_tree.children
+        subcommands = {}
         for command in self.descrip:
             for word in command.split():
-                for kid in self.command_tree.children:
-                    if word != kid and word not in subcommands:
-                        subcommands.append(word)
-        return subcommands
+                # a word is kept unless it is the only top level command
+                if len(kids) > 1 or (kids and word not in kids):
+                    subcommands[word] = None
+        return list(subcommands)
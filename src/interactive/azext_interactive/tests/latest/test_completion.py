@@ -10,6 +10,7 @@ from unittest import mock
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.az_completer import rank_completions
 
 from prompt_toolkit.document import Document
 
@@ -142,6 +143,83 @@ class CompletionTest(unittest.TestCase):
         self.assertEqual(completion.text, '-g')
         self.assertIn('Name of resource group', completion._display_meta)
 
+    def test_incremental_completion(self):
+        # typing one character at a time narrows the previous matches
+        for text, expected in [(u'v', ['vm', 'vmss']), (u'vm', ['vm', 'vmss']), (u'vms', ['vmss']),
+                               (u'vmss ', ['create']), (u'vmss c', ['create']), (u'vmss x', [])]:
+            completions = self.completer.get_completions(Document(text), None)
+            self.assertEqual([completion.text for completion in completions], expected)
+
+        # the last keystroke is not reused when the text is not an extension of it
+        completions = self.completer.get_completions(Document(u'stor'), None)
+        self.assertEqual([completion.text for completion in completions], ['storage'])
+        self.assertEqual(self.completer.current_command, '')
+
+    def test_ranked_completion(self):
+        frequency = self.completer.command_frequency
+        try:
+            self.completer.command_frequency = {'vmss': 3, 'vm': 1, 'vmss create --name': 2}
+            completions = self.completer.get_completions(Document(u' '), None)
+            self.assertEqual([completion.text for completion in completions][:3], ['vmss', 'vm', 'exit'])
+
+            completions = self.completer.get_completions(Document(u'vmss create --n'), None)
+            self.assertEqual([completion.text for completion in completions][0], '--name')
+
+            completions = rank_completions(self.completer.get_completions(Document(u' '), None),
+                                           self.completer.get_frequency, limit=2)
+            self.assertEqual([completion.text for completion in completions], ['vmss', 'vm'])
+        finally:
+            self.completer.command_frequency = frequency
+
+    def test_dynamic_completion(self):
+        calls = []
+
+        def _completer(prefix, action, parsed_args):  # pylint: disable=unused-argument
+            calls.append(prefix)
+            return ['rg1', 'rg2', 'other']
+
+        argument = mock.Mock(options_list=['--resource-group', '-g'], completer=_completer, choices=None)
+        argument.type.settings = {}
+        cmdtab = self.completer.cmdtab
+        try:
+            self.completer.cmdtab = {'vm create': mock.Mock(arguments={'resource_group_name': argument})}
+            with mock.patch('azure.cli.core._profile.Profile') as profile:
+                profile.return_value.get_subscription_id.return_value = 'sub'
+                completions = self.completer.get_completions(Document(u'vm create -g '), None)
+                self.assertEqual([completion.text for completion in completions], ['other', 'rg1', 'rg2'])
+                completions = self.completer.get_completions(Document(u'vm create -g r'), None)
+                self.assertEqual([completion.text for completion in completions], ['rg1', 'rg2'])
+            # the completer only ran once for both keystrokes
+            self.assertEqual(calls, [''])
+        finally:
+            self.completer.cmdtab = cmdtab
+            self.completer.completion_cache.clear()
+            self.completer.default_subscription = None
+
+    def test_default_subscription(self):
+        profile_path = os.path.join(TEST_DIR, 'azureProfile.json')
+        try:
+            with mock.patch.object(self.shell_ctx.cli_ctx.config, 'config_dir', TEST_DIR), \
+                    mock.patch('azure.cli.core._profile.Profile') as profile:
+                with open(profile_path, 'w') as profile_file:
+                    profile_file.write('{}')
+                os.utime(profile_path, ns=(0, 0))
+                profile.return_value.get_subscription_id.return_value = 'sub1'
+                self.assertEqual(self.completer.get_default_subscription(), 'sub1')
+                self.assertEqual(self.completer.get_default_subscription(), 'sub1')
+                # the profile is not read again while it is unchanged
+                self.assertEqual(profile.call_count, 1)
+
+                # az account set changes the profile file
+                profile.return_value.get_subscription_id.return_value = 'sub2'
+                os.utime(profile_path, ns=(10 ** 9, 10 ** 9))
+                self.assertEqual(self.completer.get_default_subscription(), 'sub2')
+                self.assertEqual(profile.call_count, 2)
+        finally:
+            self.completer.default_subscription = None
+            if os.path.exists(profile_path):
+                os.remove(profile_path)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell.az_completer import run_completer
+from azext_interactive.azclishell.completion_cache import CompletionCache
+
+
+class CompletionCacheTest(unittest.TestCase):
+    """ tests the cache of dynamic completions """
+
+    def test_first_fetch(self):
+        updated = threading.Event()
+        cache = CompletionCache(on_update=lambda key: updated.set())
+        self.assertEqual(cache.get('key', lambda: ['rg1', 'rg2'], wait=5), ['rg1', 'rg2'])
+        self.assertTrue(updated.wait(5))
+
+        # cached results are returned without fetching again
+        self.assertEqual(cache.get('key', lambda: self.fail('fetched again')), ['rg1', 'rg2'])
+
+    def test_slow_fetch_does_not_block(self):
+        release = threading.Event()
+        fetched = threading.Event()
+
+        def _fetch():
+            release.wait(5)
+            return ['rg1']
+
+        cache = CompletionCache(on_update=lambda key: fetched.set())
+        self.assertIsNone(cache.get('key', _fetch, wait=0.01))
+        # a second lookup while fetching does not start another fetch
+        self.assertIsNone(cache.get('key', lambda: self.fail('fetched twice')))
+        release.set()
+        self.assertTrue(fetched.wait(5))
+        self.assertEqual(cache.get('key', _fetch), ['rg1'])
+
+    def test_stale_while_refresh(self):
+        fetched = threading.Event()
+        cache = CompletionCache(ttl=60, on_update=lambda key: fetched.set())
+        with mock.patch('azext_interactive.azclishell.completion_cache.time.time', return_value=0):
+            cache.get('key', lambda: ['old'], wait=5)
+        fetched.clear()
+
+        with mock.patch('azext_interactive.azclishell.completion_cache.time.time', return_value=100):
+            # the expired results are shown while they are refreshed
+            self.assertEqual(cache.get('key', lambda: ['new']), ['old'])
+            self.assertTrue(fetched.wait(5))
+            self.assertEqual(cache.get('key', lambda: ['newer']), ['new'])
+
+    def test_failed_fetch(self):
+        def _fetch():
+            raise ValueError('not logged in')
+
+        cache = CompletionCache()
+        self.assertIsNone(cache.get('key', _fetch, wait=5))
+        self.assertEqual(cache.get('key', lambda: ['rg1'], wait=5), ['rg1'])
+
+    def test_prewarm_and_clear(self):
+        fetched = threading.Event()
+        cache = CompletionCache(on_update=lambda key: fetched.set())
+        cache.prewarm('key', lambda: ['rg1'])
+        self.assertTrue(fetched.wait(5))
+        self.assertEqual(cache.get('key', lambda: []), ['rg1'])
+
+        cache.clear()
+        self.assertEqual(cache.get('key', lambda: ['rg2'], wait=5), ['rg2'])
+
+    def test_run_completer(self):
+        self.assertEqual(run_completer(lambda prefix, action, parsed_args: [prefix, parsed_args], 'a', 'args'),
+                         ['a', 'args'])
+        self.assertEqual(run_completer(lambda prefix: [prefix], 'a', None), ['a'])
+        self.assertEqual(run_completer(lambda: ['b'], 'a', None), ['b'])
+        self.assertEqual(run_completer(lambda value: ['c'], 'a', None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -100,6 +100,21 @@ class FeedbackTest(unittest.TestCase):
         if os.path.exists(freq_path):
             os.remove(freq_path)
 
+    def test_update_command_freq(self):
+        # tests counting the commands, groups and parameters used
+        freq_dir = tempfile.mkdtemp()
+        self.shell_ctx.config.config_dir = freq_dir
+        self.assertEqual(fh.load_command_frequency(self.shell_ctx), {})
+
+        frequency = fh.update_command_frequency(self.shell_ctx, 'vm create', ['--name', '-g', '--name'], {})
+        frequency = fh.update_command_frequency(self.shell_ctx, 'vm list', [], frequency)
+        expected = {'vm': 2, 'vm create': 1, 'vm list': 1, 'vm create --name': 1, 'vm create -g': 1}
+        self.assertEqual(frequency, expected)
+        self.assertEqual(fh.load_command_frequency(self.shell_ctx), expected)
+
+        os.remove(os.path.join(freq_dir, self.shell_ctx.config.get_command_frequency()))
+        os.rmdir(freq_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
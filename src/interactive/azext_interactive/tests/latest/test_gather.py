@@ -3,8 +3,19 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import json
+import os
+import shutil
+import tempfile
 import unittest
-from azext_interactive.azclishell.gather_commands import add_new_lines as nl
+from unittest import mock
+
+from azext_interactive.azclishell.command_index import (CommandIndex, find_command_index, read_versions_key,
+                                                        write_command_index)
+from azext_interactive.azclishell.gather_commands import GatherCommands, add_new_lines as nl
+
+
+TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
 
 
 class GatherTest(unittest.TestCase):
@@ -56,5 +67,94 @@ class GatherTest(unittest.TestCase):
         )
 
 
+class CommandIndexTest(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(TEST_DIR, 'cache', 'help_dump_test.json'), 'r') as help_file:
+            self.data = json.load(help_file)
+        self.config_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.config_dir, 'cache'))
+        self.config = mock.Mock(get_config_dir=lambda: self.config_dir,
+                                get_command_index=lambda: 'command_index.bin',
+                                get_help_files=lambda: 'help_dump.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def _gather(self):
+        with mock.patch('azext_interactive.azclishell.gather_commands._get_window_columns', lambda: 120):
+            return GatherCommands(self.config)
+
+    def test_index_round_trip(self):
+        index_path = os.path.join(self.config_dir, 'cache', 'command_index.bin')
+        index_path = write_command_index(index_path, self.data, 'a' * 64)
+        self.assertEqual(read_versions_key(index_path), 'a' * 64)
+
+        index = CommandIndex.load(index_path)
+        expected = CommandIndex.from_data(self.data)
+        self.assertEqual(index.commands.keys(), expected.commands.keys())
+        for command in self.data:
+            self.assertEqual(index.get_parameters(command), expected.get_parameters(command))
+            self.assertEqual(index.get_details(command), expected.get_details(command))
+
+    def test_new_index_while_previous_one_is_loaded(self):
+        index_path = os.path.join(self.config_dir, 'cache', 'command_index.bin')
+        previous_path = write_command_index(index_path, self.data, 'a' * 64)
+        previous = CommandIndex.load(previous_path)
+        os.utime(previous_path, (0, 0))
+
+        # the loaded index can't be removed on Windows
+        with mock.patch('azext_interactive.azclishell.command_index.os.remove', side_effect=PermissionError()):
+            path = write_command_index(index_path, self.data, 'b' * 64)
+        self.assertNotEqual(path, previous_path)
+        self.assertEqual(find_command_index(index_path), path)
+        self.assertEqual(read_versions_key(path), 'b' * 64)
+        self.assertEqual(previous.get_details('vm create'), CommandIndex.from_data(self.data).get_details('vm create'))
+
+        # the next dump removes the stale index
+        write_command_index(index_path, self.data, 'c' * 64)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.config_dir, 'cache'))),
+                         [os.path.basename(find_command_index(index_path))])
+
+    def test_missing_or_invalid_index(self):
+        index_path = os.path.join(self.config_dir, 'cache', 'command_index.bin')
+        self.assertIsNone(read_versions_key(index_path))
+        with open(index_path, 'wb') as index_file:
+            index_file.write(b'{"not": "an index"}')
+        self.assertIsNone(read_versions_key(index_path))
+
+    def test_gather_from_index_matches_help_dump(self):
+        with open(os.path.join(self.config_dir, 'cache', 'help_dump.json'), 'w') as help_file:
+            json.dump(self.data, help_file)
+        from_dump = self._gather()
+
+        write_command_index(os.path.join(self.config_dir, 'cache', 'command_index.bin'), self.data, 'a' * 64)
+        from_index = self._gather()
+        self.assertIsNotNone(from_index.command_index.versions_key)
+
+        self.assertEqual(from_index.completable, from_dump.completable)
+        self.assertEqual(from_index.completable_param, from_dump.completable_param)
+        self.assertEqual(from_index.command_param_info, from_dump.command_param_info)
+        self.assertEqual(dict(from_index.descrip), dict(from_dump.descrip))
+        self.assertEqual(dict(from_index.command_example), dict(from_dump.command_example))
+        self.assertEqual(dict(from_index.param_descript), dict(from_dump.param_descript))
+        self.assertIn('vm create --name', from_index.param_descript)
+        self.assertNotIn('vm create --cmd', from_index.param_descript)
+        self.assertIn('quit', from_index.descrip)
+
+    def test_vocabulary(self):
+        with open(os.path.join(self.config_dir, 'cache', 'help_dump.json'), 'w') as help_file:
+            json.dump(self.data, help_file)
+        commands = self._gather()
+
+        words = set(word for command in self.data for word in command.split())
+        self.assertEqual(commands.completable, words | {'quit', 'exit'})
+        self.assertIn('--name', commands.completable_param)
+        self.assertIn('-n', commands.completable_param)
+
+        subcommands = commands.get_all_subcommands()
+        self.assertEqual(len(subcommands), len(set(subcommands)))
+        self.assertEqual(set(subcommands), words | {'quit', 'exit'})
+
+
 if __name__ == '__main__':
     unittest.main()
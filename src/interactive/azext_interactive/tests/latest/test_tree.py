@@ -11,6 +11,7 @@ from unittest import mock
 from azure.cli.core.mock import DummyCli
 from azext_interactive.azclishell.configuration import Configuration
 from azext_interactive.azclishell.app import AzInteractiveShell
+from azext_interactive.azclishell.command_tree import CommandBranch, CommandHead, PrefixIndex
 
 
 TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
@@ -71,6 +72,24 @@ class CommandTreeTest(unittest.TestCase):
         self.assertEqual(current_command, 'storage account create')
         self.assertEqual(leftover_args, ['--name', 'MyStorageAccount'])
 
+    def test_prefix_index(self):
+        index = PrefixIndex(['create', 'delete', 'Copy', 'cancel', 'create'])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(list(index.starting_with('c')), ['cancel', 'Copy', 'create'])
+        self.assertEqual(list(index.starting_with('CR')), ['create'])
+        self.assertEqual(list(index.starting_with('')), ['cancel', 'Copy', 'create', 'delete'])
+        self.assertEqual(list(index.starting_with('x')), [])
+
+    def test_children_starting_with(self):
+        tree = CommandHead()
+        tree.add_child(CommandBranch('vm'))
+        tree.add_child(CommandBranch('vmss'))
+        self.assertEqual(list(tree.children_starting_with('vm')), ['vm', 'vmss'])
+
+        tree.add_child(CommandBranch('storage'))
+        self.assertEqual(list(tree.children_starting_with('s')), ['storage'])
+        self.assertEqual(list(tree.children_starting_with('')), ['storage', 'vm', 'vmss'])
+
 
 if __name__ == '__main__':
     unittest.main()
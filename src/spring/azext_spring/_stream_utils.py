@@ -7,7 +7,6 @@
 
 import time
 import colorama   # pylint: disable=import-error
-from io import BytesIO
 from random import uniform
 from knack.util import CLIError
 from knack.log import get_logger
@@ -19,6 +18,7 @@ from ._utils import get_blob_info
 logger = get_logger(__name__)
 
 DEFAULT_CHUNK_SIZE = 1024 * 4
+MAX_CHUNK_SIZE = 1024 * 1024 * 4
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -75,10 +75,8 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    tailer = LogTailer(blob_service, container_name, blob_name, min_chunk_size=byte_size)
     metadata = {}
-    start = 0
-    end = byte_size - 1
     available = 0
     sleep_time = 1
     max_sleep_time = 15
@@ -104,6 +102,11 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
                 container_name=container_name, blob_name=blob_name)
         return None
 
+    def flush_remaining():
+        remaining = tailer.flush()
+        if remaining:
+            logger_level_func(remaining)
+
     # Try to get the initial properties so there's no waiting.
     # If the storage call fails, we'll just sleep and try again after.
     try:
@@ -114,51 +117,22 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     except (AttributeError, AzureHttpError):
         pass
 
-    while (_blob_is_not_complete(metadata) or start < available):
-        while start < available:
+    while (_blob_is_not_complete(metadata) or tailer.offset < available):
+        while tailer.offset < available:
             # Success! Reset our polling backoff.
             sleep_time = 1
             num_fails = 0
             consecutive_sleep_in_sec = 0
 
             try:
-                old_byte_size = len(stream.getvalue())
-                blob_service.get_blob_to_stream(
-                    container_name=container_name,
-                    blob_name=blob_name,
-                    start_range=start,
-                    end_range=end,
-                    stream=stream)
-
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-                    if curr_bytes[i:i + 1] == b'\n':
-                        flush = curr_bytes[:i + 1]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-
+                lines = tailer.read(available)
+                if lines:
+                    logger_level_func(lines)
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
             except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+                flush_remaining()
                 return
 
         try:
@@ -170,8 +144,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             if ae.status_code != 404:
                 raise CLIError(ae)
         except KeyboardInterrupt:
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            flush_remaining()
             return
         except Exception as err:
             raise CLIError(err)
@@ -179,14 +152,11 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
         if consecutive_sleep_in_sec > timeout_in_seconds:
             # Flush anything remaining in the buffer - this would be the case
             # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
-
+            flush_remaining()
             return
 
         # If no new data available but not complete, sleep before trying to process additional data.
-        if (_blob_is_not_complete(metadata) and start >= available):
+        if (_blob_is_not_complete(metadata) and tailer.offset >= available):
             num_fails += 1
 
             if num_fails >= num_fails_for_backoff:
@@ -201,10 +171,9 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-
-    if curr_bytes:
-        logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+    flush_remaining()
+    logger.debug("Read %d bytes of logs in %d requests (%.1f KiB/s)",
+                 tailer.bytes_read, tailer.requests, tailer.throughput / 1024)
 
     build_status = _get_run_status(metadata).lower()
     logger_level_func("Log status was: {}".format(build_status))
@@ -218,6 +187,67 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             raise CLIError("Run was canceled")
 
 
+class LogTailer:
+    '''
+    Reads the lines appended to a log blob. Each request asks for the bytes known to be available, between
+    min_chunk_size and max_chunk_size, and only the complete lines are returned; a trailing partial line is
+    kept in a buffer until the rest of it is read.
+    '''
+
+    def __init__(self, blob_service, container_name, blob_name,
+                 min_chunk_size=DEFAULT_CHUNK_SIZE, max_chunk_size=MAX_CHUNK_SIZE):
+        self.blob_service = blob_service
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max(max_chunk_size, min_chunk_size)
+        self.offset = 0
+        self.requests = 0
+        self.bytes_read = 0
+        self.started = time.time()
+        self._pending = bytearray()
+
+    @property
+    def throughput(self):
+        '''Bytes read per second since the tailer was created.'''
+        elapsed = time.time() - self.started
+        return self.bytes_read / elapsed if elapsed > 0 else 0.0
+
+    def read(self, available):
+        '''
+        Reads the next range of the blob given the number of bytes available, returns the complete lines read
+        or None when there are none yet.
+        '''
+        size = min(max(available - self.offset, self.min_chunk_size), self.max_chunk_size)
+        content = self.blob_service.get_blob_to_bytes(
+            container_name=self.container_name,
+            blob_name=self.blob_name,
+            start_range=self.offset,
+            end_range=self.offset + size - 1).content
+        self.requests += 1
+        self.bytes_read += len(content)
+        self.offset += len(content)
+
+        # Only scan what's newly read, what was kept from the previous reads has no line break.
+        scan_from = len(self._pending)
+        self._pending += content
+        newline = self._pending.rfind(b'\n', scan_from)
+        if newline < 0:
+            return None
+        # won't log the \n of a final \r\n
+        end = newline if newline > 0 and self._pending[newline - 1] == ord('\r') else newline + 1
+        with memoryview(self._pending) as view:
+            lines = str(view[:end], 'utf-8', errors='ignore')
+        del self._pending[:newline + 1]
+        return lines
+
+    def flush(self):
+        '''Returns what is left of a partial line and empties the buffer.'''
+        remaining = self._pending.decode('utf-8', errors='ignore')
+        self._pending = bytearray()
+        return remaining
+
+
 def _blob_is_not_complete(metadata):
     if not metadata:
         return True
@@ -7,20 +7,38 @@ from enum import Enum
 import os
 from time import sleep
 import codecs
+import hashlib
+import shutil
 import tarfile
 import tempfile
 import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import open
-from re import (search, match, compile)
+from re import (search, compile)
 from json import dumps
 from knack.util import CLIError, todict
 from knack.log import get_logger
+from azure.cli.core.api import get_config_dir
 from .vendored_sdks.appplatform.v2022_11_01_preview.models._app_platform_management_client_enums import SupportedRuntimeValue
 from ._client_factory import cf_resource_groups
 
 
 logger = get_logger(__name__)
 
+# the tar stream is compressed in blocks of whole entries on worker threads, one gzip member per block
+ARCHIVE_BLOCK_SIZE = 1024 * 1024
+ARCHIVE_MAX_BLOCK_SIZE = 8 * 1024 * 1024
+# a block ends after an entry whose path hashes to a multiple of this, so that a changed file only changes its block
+ARCHIVE_BLOCK_BOUNDARY_MODULUS = 4
+ARCHIVE_COMPRESSION_LEVEL = 6
+ARCHIVE_COMPRESSION_WORKERS = min(8, os.cpu_count() or 1)
+# compressed blocks of the previous archive of each source folder, reused when their content is unchanged
+ARCHIVE_CACHE_DIR = os.path.join(get_config_dir(), 'spring-source-cache')
+# the cached archives of the least recently packed source folders are removed beyond this size
+ARCHIVE_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
 
 def _get_upload_local_file(runtime_version, artifact_path=None, source_path=None, container_image=None):
     file_type = None
@@ -46,18 +64,19 @@ def _get_file_type(runtime_version, artifact_path=None):
     return file_type
 
 
-def _pack_source_code(source_location, tar_file_path):
+def _pack_source_code(source_location, tar_file_path, cache_dir=ARCHIVE_CACHE_DIR):
     logger.info("Packing source code into tar to upload...")
 
-    ignore_list, ignore_list_size = _load_gitignore_file(source_location)
+    ignore_list, _ = _load_gitignore_file(source_location)
     common_vcs_ignore_list = {'.git', '.gitignore', 'bzrignore', '.hg',
                               '.hgignore', '.svn', '.circleci', 'target', 'docker', 'mvnw', 'mvnw.cmd'}
+    matcher = IgnoreMatcher(ignore_list)
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
+        if name in common_vcs_ignore_list:
             logger.info(
-                "Excluding '%s' based on default ignore rules", tarinfo.name)
+                "Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
         if ignore_list is None:
@@ -65,29 +84,200 @@ def _pack_source_code(source_location, tar_file_path):
             # eg, it will ignore the files under .git folder.
             return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if match(item.pattern, tarinfo.name):
-                logger.debug(".gitignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
-
-        logger.debug(".gitignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+        return matcher.check(name, parent_ignored, parent_matching_rule_index)
+
+    cache_root = cache_dir
+    if cache_root:
+        cache_dir = os.path.join(cache_root, hashlib.sha256(
+            os.path.abspath(source_location).encode('utf-8')).hexdigest()[:16])
+
+    with open(tar_file_path, "wb") as tar_file:
+        gzip_file = ParallelGzipFile(tar_file, cache_dir=cache_dir)
+        try:
+            with tarfile.open(fileobj=gzip_file, mode="w") as tar:
+                # need to set arcname to empty string as the archive root path
+                ignored, matching_rule_index = _ignore_check("", False, len(matcher.rules))
+                _archive_file_recursively(tar, gzip_file, source_location, "", os.path.isdir(source_location),
+                                          ignored, matching_rule_index, _ignore_check, matcher)
+        finally:
+            gzip_file.close()
+    logger.info("Packed source code: %d of %d compressed blocks reused from the previous archive.",
+                gzip_file.reused_blocks, gzip_file.blocks)
+    if gzip_file.cache_dir:
+        _trim_archive_cache(cache_root, gzip_file.cache_dir, ARCHIVE_CACHE_MAX_SIZE)
+
+
+def _trim_archive_cache(cache_root, current_dir, max_size):
+    """Remove the cached archives of the least recently packed source folders beyond max_size."""
+    try:
+        # the order of the folders is the order they were last packed in
+        os.utime(current_dir)
+        folders = []
+        for entry in os.scandir(cache_root):
+            if entry.is_dir(follow_symlinks=False):
+                size = sum(block.stat().st_size for block in os.scandir(entry.path))
+                folders.append((entry.stat().st_mtime_ns, size, entry.path))
+    except OSError as ex:
+        logger.debug("Unable to trim the cache of the compressed source code: %s", ex)
+        return
+
+    total_size = 0
+    for _, size, path in sorted(folders, reverse=True):
+        total_size += size
+        if total_size > max_size:
+            logger.debug("Removing the cached archive '%s'", path)
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class IgnoreMatcher(object):
+    """All the ignore rules compiled into one regular expression, the first rule has the highest priority."""
+
+    def __init__(self, ignore_list):
+        self.rules = ignore_list or []
+        self._regex = None
+        if self.rules:
+            # alternatives are tried in order, so the match is the matching rule with the highest priority
+            self._regex = compile("|".join("(?P<r{}>{})".format(index, rule.pattern)
+                                           for index, rule in enumerate(self.rules)))
+        negations = [index for index, rule in enumerate(self.rules) if not rule.ignore]
+        self._first_negation = negations[0] if negations else len(self.rules)
+
+    def check(self, name, parent_ignored, parent_matching_rule_index):
+        if self._regex:
+            matched = self._regex.match(name)
+            # the rules whose priorities are lower than the parent matching rule don't apply,
+            # the item just inherits from parent
+            if matched:
+                index = int(matched.lastgroup[1:])
+                if index < parent_matching_rule_index:
+                    logger.debug(".gitignore: rule '%s' matches '%s'.", self.rules[index].rule, name)
+                    return self.rules[index].ignore, index
+
+        logger.debug(".gitignore: no rule for '%s'. parent ignore '%s'", name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+    def excludes_children(self, ignored, matching_rule_index):
+        """Whether everything under an ignored directory is ignored, as no rule that applies to it is an exception."""
+        return ignored and matching_rule_index <= self._first_negation
+
+
+class ParallelGzipFile(object):
+    """
+    A write only file object for tarfile that compresses the tar stream on worker threads. The stream is cut into
+    blocks of whole entries which are compressed into consecutive gzip members, a valid gzip file. With a cache
+    directory, the members are stored by the digest of their content and reused by the next archive once their
+    content is verified against the digest.
+    """
+
+    def __init__(self, fileobj, cache_dir=None, block_size=ARCHIVE_BLOCK_SIZE, workers=ARCHIVE_COMPRESSION_WORKERS):
+        self.fileobj = fileobj
+        self.cache_dir = cache_dir
+        self.block_size = block_size
+        self.blocks = 0
+        self.reused_blocks = 0
+        self._offset = 0
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._workers = max(workers, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._used = set()
+        if cache_dir:
+            try:
+                # the cache is only readable by the current user, as its blocks are copied into the archive
+                os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+                os.chmod(cache_dir, 0o700)
+            except OSError as ex:
+                logger.debug("Not caching the compressed source code: %s", ex)
+                self.cache_dir = None
+
+    def tell(self):
+        return self._offset
+
+    def write(self, data):
+        self._buffer += data
+        self._offset += len(data)
+        if len(self._buffer) >= ARCHIVE_MAX_BLOCK_SIZE:
+            self._cut()
+        return len(data)
+
+    def end_entry(self, name):
+        """Called after each archive entry, the block may end here."""
+        if len(self._buffer) >= self.block_size and \
+                zlib.crc32(name.encode('utf-8')) % ARCHIVE_BLOCK_BOUNDARY_MODULUS == 0:
+            self._cut()
+
+    def close(self):
+        if self._executor is None:
+            return
+        if self._buffer:
+            self._cut()
+        while self._pending:
+            self._write_block(self._pending.popleft().result())
+        self._executor.shutdown()
+        self._executor = None
+        self._remove_unused_blocks()
+
+    def _cut(self):
+        block = bytes(self._buffer)
+        self._buffer = bytearray()
+        self._pending.append(self._executor.submit(self._compress, block))
+        while len(self._pending) > 2 * self._workers:
+            self._write_block(self._pending.popleft().result())
+
+    def _write_block(self, result):
+        digest, data, reused = result
+        self.fileobj.write(data)
+        self.blocks += 1
+        self.reused_blocks += 1 if reused else 0
+        self._used.add(digest)
+
+    def _compress(self, block):
+        # hashlib and zlib release the GIL on large buffers, so the blocks are processed in parallel
+        digest = hashlib.sha256(block).hexdigest()
+        path = os.path.join(self.cache_dir, digest + ".gz") if self.cache_dir else None
+        if path and os.path.exists(path):
+            data = self._read_cached_block(path, digest)
+            if data is not None:
+                return digest, data, True
+
+        compressor = zlib.compressobj(ARCHIVE_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        data = compressor.compress(block) + compressor.flush()
+        if path:
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as ex:
+                logger.debug("Unable to cache a compressed block: %s", ex)
+        return digest, data, False
+
+    @staticmethod
+    def _read_cached_block(path, digest):
+        """The cached gzip member, None if it is not a single member whose content matches the digest."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # decompressing is several times faster than compressing the block again
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            content = decompressor.decompress(data)
+            if decompressor.eof and not decompressor.unused_data and hashlib.sha256(content).hexdigest() == digest:
+                return data
+        except (OSError, zlib.error):
+            pass
+        logger.debug("Ignoring the corrupted cached block '%s'", path)
+        return None
+
+    def _remove_unused_blocks(self):
+        if not self.cache_dir:
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".tmp") or entry.name[:-len(".gz")] not in self._used:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
 
 
 class IgnoreRule(object):  # pylint: disable=too-few-public-methods
@@ -144,31 +334,33 @@ def _load_gitignore_file(source_location):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
-
-    if tarinfo is None:
-        raise CLIError("tarfile: unsupported type {}".format(name))
+def _archive_file_recursively(tar, gzip_file, name, arcname, is_dir,  # pylint: disable=too-many-arguments
+                              ignored, matching_rule_index, ignore_check, matcher):
+    if not ignored:
+        # create a TarInfo object from the file
+        tarinfo = tar.gettarinfo(name, arcname)
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        if tarinfo is None:
+            raise CLIError("tarfile: unsupported type {}".format(name))
 
-    if not ignored:
         # append the tar header and data to the archive
         if tarinfo.isreg():
             with open(name, "rb") as f:
                 tar.addfile(tarinfo, f)
         else:
             tar.addfile(tarinfo)
+        gzip_file.end_entry(arcname)
 
     # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    # unless no rule can include them
+    if is_dir and not matcher.excludes_children(ignored, matching_rule_index):
+        with os.scandir(name) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            child_arcname = arcname + "/" + entry.name if arcname else entry.name
+            child_ignored, child_matching_rule_index = ignore_check(child_arcname, ignored, matching_rule_index)
+            _archive_file_recursively(tar, gzip_file, entry.path, child_arcname, entry.is_dir(follow_symlinks=False),
+                                      child_ignored, child_matching_rule_index, ignore_check, matcher)
 
 
 def get_blob_info(blob_sas_url):
@@ -0,0 +1,96 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import stat
+import sys
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+from ..._utils import _pack_source_code, IgnoreMatcher, IgnoreRule
+
+
+def _write(root, path, content="content"):
+    path = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestPackSourceCode(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.work_dir, "cache")
+        self.tar_file_path = os.path.join(self.work_dir, "source.tar.gz")
+        for path in ["pom.xml", "src/main/App.java", "target/app.jar", "logs/run.log", "logs/keep.log", ".git/HEAD"]:
+            _write(self.source, path)
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+        shutil.rmtree(self.work_dir)
+
+    def _pack(self):
+        _pack_source_code(self.source, self.tar_file_path, cache_dir=self.cache_dir)
+        with tarfile.open(self.tar_file_path, "r:gz") as tar:
+            return {member.name for member in tar.getmembers() if member.isfile()}
+
+    def test_pack_with_gitignore(self):
+        _write(self.source, ".gitignore", "# comment\nlogs\n!logs/keep.log\n")
+        self.assertEqual(self._pack(), {"pom.xml", "src/main/App.java", "logs/keep.log"})
+
+    def test_pack_reuses_cached_blocks(self):
+        first = self._pack()
+        self.assertEqual(first, {"pom.xml", "src/main/App.java", "logs/run.log", "logs/keep.log"})
+        self.assertEqual(self._pack(), first)
+        cached_blocks = [name for _, _, names in os.walk(self.cache_dir) for name in names]
+        self.assertEqual(len(cached_blocks), 1)
+
+    def _cached_block_paths(self):
+        return [os.path.join(root, name) for root, _, names in os.walk(self.cache_dir) for name in names]
+
+    @unittest.skipIf(sys.platform == "win32", "POSIX permissions")
+    def test_cache_is_private(self):
+        self._pack()
+        for root, _, _ in os.walk(self.cache_dir):
+            if root != self.cache_dir:
+                self.assertEqual(stat.S_IMODE(os.stat(root).st_mode), 0o700)
+        for path in self._cached_block_paths():
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode) & 0o077, 0)
+
+    def test_corrupted_cached_block_is_not_reused(self):
+        first = self._pack()
+        with open(self.tar_file_path, "rb") as f:
+            first_archive = f.read()
+        block_path, = self._cached_block_paths()
+        with open(block_path, "wb") as f:
+            f.write(b"not the cached block")
+
+        self.assertEqual(self._pack(), first)
+        with open(self.tar_file_path, "rb") as f:
+            self.assertEqual(f.read(), first_archive)
+
+    def test_cache_is_trimmed(self):
+        other_source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_source)
+        _write(other_source, "pom.xml")
+        _pack_source_code(other_source, self.tar_file_path, cache_dir=self.cache_dir)
+        self._pack()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        # only the archive of the most recently packed source folder fits
+        block_size = max(os.path.getsize(path) for path in self._cached_block_paths())
+        with mock.patch("azext_spring._utils.ARCHIVE_CACHE_MAX_SIZE", block_size):
+            _pack_source_code(other_source, self.tar_file_path, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_ignore_matcher(self):
+        matcher = IgnoreMatcher([IgnoreRule(rule) for rule in ["!logs/keep.log", "logs"]])
+        self.assertEqual(matcher.check("logs", False, 2), (True, 1))
+        self.assertEqual(matcher.check("logs/keep.log", True, 1), (False, 0))
+        self.assertEqual(matcher.check("logs/run.log", True, 1), (True, 1))
+        self.assertFalse(matcher.excludes_children(True, 1))
+        self.assertTrue(IgnoreMatcher([IgnoreRule("logs")]).excludes_children(True, 0))
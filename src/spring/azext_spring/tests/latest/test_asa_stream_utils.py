@@ -0,0 +1,71 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import unittest
+from types import SimpleNamespace
+from ..._stream_utils import LogTailer, _stream_logs
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+
+class FakeAppendBlobService:
+    def __init__(self, content, metadata=None):
+        self.content = content
+        self.metadata = metadata if metadata is not None else {'__complete_status': 'succeeded'}
+        self.ranges = []
+
+    def exists(self, **_):
+        return True
+
+    def get_blob_properties(self, **_):
+        return SimpleNamespace(metadata=self.metadata,
+                               properties=SimpleNamespace(content_length=len(self.content)))
+
+    def get_blob_to_bytes(self, start_range, end_range, **_):
+        self.ranges.append((start_range, end_range))
+        return SimpleNamespace(content=self.content[start_range:end_range + 1])
+
+
+class TestLogTailer(unittest.TestCase):
+    def test_read_complete_lines(self):
+        service = FakeAppendBlobService(b'first\r\nsecond\nthi')
+        tailer = LogTailer(service, 'logs', 'build.log', min_chunk_size=8)
+        self.assertEqual(tailer.read(8), 'first\r')
+        self.assertEqual(tailer.read(17), 'second\n')
+        self.assertIsNone(tailer.read(17))
+        self.assertEqual(tailer.flush(), 'thi')
+        self.assertEqual(tailer.flush(), '')
+        self.assertEqual(tailer.offset, 17)
+        self.assertEqual(tailer.bytes_read, 17)
+        self.assertEqual(tailer.requests, 3)
+
+    def test_range_follows_available_bytes(self):
+        service = FakeAppendBlobService(b'x' * 100 + b'\n')
+        tailer = LogTailer(service, 'logs', 'build.log', min_chunk_size=4, max_chunk_size=64)
+        tailer.read(101)
+        tailer.read(101)
+        self.assertEqual(service.ranges, [(0, 63), (64, 100)])
+
+    def test_line_split_across_reads(self):
+        service = FakeAppendBlobService('café au lait\n'.encode('utf-8'))
+        tailer = LogTailer(service, 'logs', 'build.log', min_chunk_size=4, max_chunk_size=4)
+        lines = [tailer.read(len(service.content)) for _ in range(4)]
+        self.assertEqual([line for line in lines if line], ['café au lait\n'])
+
+
+class TestStreamLogs(unittest.TestCase):
+    def test_stream_logs(self):
+        service = FakeAppendBlobService(b'building\nbuilt\r\ndone')
+        logged = []
+        _stream_logs(True, 4, 60, service, 'logs', 'build.log', True, logged.append)
+        self.assertEqual(logged, ['building\nbuilt\r', 'done', 'Log status was: succeeded'])
+        self.assertEqual(len(service.ranges), 1)
+
+    def test_stream_logs_failed_run(self):
+        service = FakeAppendBlobService(b'error\n', metadata={'__complete_status': 'Failed'})
+        with self.assertRaisesRegex(Exception, 'Run failed'):
+            _stream_logs(True, 4, 60, service, 'logs', 'build.log', True, mock.Mock())
@@ -48,6 +48,14 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
                                       completer=get_storage_name_completion_list(t_table_service, 'list_tables'))
     progress_type = CLIArgumentType(help='Include this flag to disable progress reporting for the command.',
                                     action='store_true')
+    concurrency_type = CLIArgumentType(
+        type=int, default=1, is_preview=True,
+        help='The number of blobs to transfer in parallel. Progress is reported per batch instead of per blob '
+        'when greater than 1.')
+    max_retries_type = CLIArgumentType(
+        type=int, default=3, is_preview=True,
+        help='The number of times a single blob is retried, with exponential backoff, after a connection failure '
+        'or a transient service error.')
     sas_help = 'The permissions the SAS grants. Allowed values: {}. Do not use if a stored access policy is ' \
                'referenced with --policy-name that specifies this value. Can be combined.'
 
@@ -178,6 +186,17 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.extra('tier', tier_type)
         c.extra('tags', tags_type)
 
+    with self.argument_context('storage blob copy start-batch') as c:
+        c.argument('concurrency', concurrency_type,
+                   help='The number of copy operations to start in parallel.')
+        c.argument('max_pending_copies', type=int, is_preview=True,
+                   help='Wait for the copies to complete, keeping at most this many copies pending on the service '
+                   'at a time. The status of the pending copies is polled in batches and the total bytes copied '
+                   'are reported at the end.')
+        c.argument('results_file', type=file_type, is_preview=True, completer=FilesCompleter(),
+                   help='Write the result of each copy to this file as a JSON document per line as the batch '
+                   'progresses, instead of returning the list of copied blob URLs when the batch ends.')
+
     with self.argument_context('storage blob copy start-batch', arg_group='Copy Source') as c:
         from ._validators import get_source_file_or_blob_service_client
 
@@ -244,6 +263,12 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.extra('max_concurrency', options_list='--max-connections', type=int, default=2,
                 help='The number of parallel connections with which to download.')
         c.extra('no_progress', progress_type)
+        c.argument('concurrency', concurrency_type)
+        c.argument('max_retries', max_retries_type)
+        c.argument('resume', action='store_true', is_preview=True,
+                   help='Record downloaded blobs in a journal file in the destination folder and skip blobs whose '
+                   'ETag and size already match the journal and the local file, so an interrupted batch can be '
+                   'resumed by running the same command again.')
 
     with self.argument_context('storage blob exists') as c:
         c.register_blob_arguments()
@@ -467,6 +492,12 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.extra('no_progress', progress_type)
         c.extra('tier', tier_type, is_preview=True)
         c.extra('overwrite', overwrite_type, is_preview=True)
+        c.argument('concurrency', concurrency_type)
+        c.argument('max_retries', max_retries_type)
+        c.argument('if_changed', action='store_true', is_preview=True,
+                   help='Only upload the files that differ from the blobs in the destination. A file is uploaded '
+                   'when its blob does not exist, has a different size, or was written before the file was last '
+                   'modified and has a different Content-MD5. Requires --overwrite to replace the changed blobs.')
 
     with self.argument_context('storage blob query') as c:
         from ._validators import validate_text_configuration
@@ -1114,6 +1114,11 @@ def process_blob_upload_batch_parameters(cmd, namespace):
     # 1. quick check
     if not os.path.exists(namespace.source) or not os.path.isdir(namespace.source):
         raise ValueError('incorrect usage: source must be an existing directory')
+    if getattr(namespace, 'if_changed', False) and not getattr(namespace, 'overwrite', None):
+        from azure.cli.core.azclierror import RequiredArgumentMissingError
+        # the changed files are uploaded over their blobs, which fails with a conflict without --overwrite
+        raise RequiredArgumentMissingError('usage error: --if-changed requires --overwrite to replace the changed '
+                                           'blobs.')
 
     # 2. try to extract account name and container name from destination string
     _process_blob_batch_container_parameters(cmd, namespace, source=False)
@@ -5,7 +5,9 @@
 
 from __future__ import print_function
 
+import json
 import os
+import time
 from datetime import datetime
 
 from azure.cli.core.util import sdk_no_wait
@@ -17,11 +19,20 @@ from ..util import (create_file_share_from_storage_client,
                     create_short_lived_share_sas,
                     filter_none, collect_blobs, collect_blob_objects, collect_files,
                     mkdir_p, guess_content_type, normalize_blob_file_path,
-                    check_precondition_success)
+                    check_precondition_success, retry_on_transient_error, run_in_parallel)
 from ..profiles import CUSTOM_DATA_STORAGE_BLOB
 
 logger = get_logger(__name__)
 
+# written to the destination folder by download-batch --resume to record the blobs downloaded so far
+DOWNLOAD_JOURNAL_NAME = '.az-download-batch-journal'
+
+# cached in the CLI config folder by upload-batch --if-changed to avoid hashing files that have not changed
+UPLOAD_MD5_INDEX_NAME = 'storage_blob_upload_md5_index.json'
+
+# seconds to wait between status polls when copy start-batch has a full window of pending copies
+COPY_POLL_INTERVAL = 5
+
 
 def delete_container(client, container_name, fail_not_exist=False, lease_id=None, if_modified_since=None,
                      if_unmodified_since=None, timeout=None, bypass_immutability_policy=False,
@@ -105,10 +116,10 @@ def set_blob_immutability_policy(cmd, client, expiry_time=None, policy_mode=None
     return client.set_immutability_policy(immutability_policy=immutability_policy, **kwargs)
 
 
-def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
+def storage_blob_copy_batch(cmd, client, source_client, container_name=None,  # pylint: disable=too-many-locals
                             destination_path=None, source_container=None, source_share=None,
                             source_sas=None, pattern=None, dryrun=False, source_account_name=None,
-                            source_account_key=None):
+                            source_account_key=None, concurrency=1, max_pending_copies=None, results_file=None):
     """Copy a group of blob or files to a blob container."""
     if dryrun:
         logger.warning('copy files or blobs to blob container')
@@ -142,11 +153,10 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                                                     source_blob_name=blob_name,
                                                     source_sas=source_sas)
 
-        return list(filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
-                                                                                 source_container,
-                                                                                 pattern)))
+        copy_action = action_blob_copy
+        sources = collect_blobs(source_client, source_container, pattern)
 
-    if source_share:
+    elif source_share:
         # copy blob from file share
 
         # if the source client is None, recreate one from the destination client.
@@ -167,31 +177,109 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                 return _copy_file_to_blob_container(client, source_client, container_name, destination_path,
                                                     source_share, source_sas, dir_name, file_name)
 
-        return list(filter_none(action_file_copy(file) for file in collect_files(cmd,
-                                                                                 source_client,
-                                                                                 source_share,
-                                                                                 pattern)))
-    raise ValueError('Fail to find source. Neither blob container or file share is specified')
+        copy_action = action_file_copy
+        sources = collect_files(cmd, source_client, source_share, pattern)
 
+    else:
+        raise ValueError('Fail to find source. Neither blob container or file share is specified')
 
-# pylint: disable=unused-argument, too-many-locals
-def storage_blob_download_batch(client, source, destination, container_name, pattern=None, dryrun=False,
-                                progress_callback=None, socket_timeout=None, **kwargs):
-    source_blobs = collect_blobs(client, container_name, pattern)
-    blobs_to_download = {}
-    for blob_name in source_blobs:
-        # remove starting path seperator and normalize
-        normalized_blob_name = normalize_blob_file_path(None, blob_name)
-        if normalized_blob_name in blobs_to_download:
-            raise CLIError('Multiple blobs with download path: `{}`. As a solution, use the `--pattern` parameter '
-                           'to select for a subset of blobs to download OR utilize the `storage blob download` '
-                           'command instead to download individual blobs.'.format(normalized_blob_name))
-        blobs_to_download[normalized_blob_name] = blob_name
+    started_copies = filter_none(result for _, result in run_in_parallel(copy_action, sources, concurrency))
+    return _report_copies(started_copies, max_pending_copies, concurrency, results_file, dryrun)
 
-    results = []
+
+def _report_copies(started_copies, max_pending_copies, concurrency, results_file, dryrun):
+    """
+    Wait for the started copies when max_pending_copies is set, then write their results to results_file or return
+    the copied urls, and log a summary of the batch.
+    """
+    if max_pending_copies:
+        copies = _wait_for_copies(started_copies, max_pending_copies, concurrency)
+    else:
+        copies = ({'url': blob_client.url, 'copyId': copy['copy_id'], 'copyStatus': copy['copy_status']}
+                  for blob_client, copy in started_copies)
+
+    start_time = time.time()
+    stats = {'copies': 0, 'bytes': 0}
+
+    def _counted(copies):
+        for copy in copies:
+            stats['copies'] += 1
+            stats['bytes'] += copy.get('bytesCopied') or 0
+            yield copy
+
+    if results_file:
+        # stream one JSON document per copy so the results of a large batch are never held in memory
+        with open(results_file, 'w') as f:
+            for copy in _counted(copies):
+                f.write(json.dumps(copy) + '\n')
+                f.flush()
+        results = None
+    else:
+        results = [copy['url'] for copy in _counted(copies)]
+
+    if not dryrun:
+        elapsed = max(time.time() - start_time, 0.001)
+        if max_pending_copies:
+            logger.warning('Copied %d blobs, %d bytes in %.1fs (%.1f copies/s, %.1f bytes/s)', stats['copies'],
+                           stats['bytes'], elapsed, stats['copies'] / elapsed, stats['bytes'] / elapsed)
+        else:
+            logger.warning('Started %d copies in %.1fs (%.1f copies/s)', stats['copies'], elapsed,
+                           stats['copies'] / elapsed)
+    return results
+
+
+def _wait_for_copies(started_copies, max_pending_copies, concurrency=1):
+    """
+    Keep at most max_pending_copies server-side copies pending. Whenever the window is full, the status of all the
+    pending copies is polled in one parallel batch, and the finished copies are yielded as result dictionaries.
+    """
+    from collections import OrderedDict
+    pending = OrderedDict()
+
+    def _copy_result(blob_client, copy_id, status, progress=None):
+        # progress is reported by the service as "<bytes copied>/<total bytes>"
+        return {'url': blob_client.url, 'copyId': copy_id, 'copyStatus': status,
+                'bytesCopied': int(progress.split('/')[0]) if progress else None}
+
+    def _poll():
+        finished = []
+        for blob_client, properties in run_in_parallel(lambda bc: bc.get_blob_properties(), list(pending),
+                                                       concurrency):
+            copy = properties.copy
+            if copy.id != pending[blob_client] or copy.status != 'pending':
+                if copy.status in ('failed', 'aborted'):
+                    logger.warning('Copy to %s %s: %s', blob_client.url, copy.status, copy.status_description)
+                finished.append(_copy_result(blob_client, pending.pop(blob_client), copy.status, copy.progress))
+        return finished
+
+    def _drain(limit):
+        while len(pending) > limit:
+            finished = _poll()
+            if not finished:
+                time.sleep(COPY_POLL_INTERVAL)
+            for result in finished:
+                yield result
+
+    for blob_client, copy in started_copies:
+        if copy['copy_status'] == 'pending':
+            pending[blob_client] = copy['copy_id']
+            for result in _drain(max_pending_copies - 1):
+                yield result
+        else:
+            # small copies usually complete synchronously and need no polling
+            yield _copy_result(blob_client, copy['copy_id'], copy['copy_status'])
+    for result in _drain(0):
+        yield result
+
+
+# pylint: disable=unused-argument, too-many-locals, too-many-statements
+def storage_blob_download_batch(client, source, destination, container_name, pattern=None, dryrun=False,
+                                progress_callback=None, socket_timeout=None, concurrency=1, max_retries=3,
+                                resume=False, **kwargs):
     if dryrun:
         # download_blobs = _blob_precondition_check(source_blobs, if_modified_since=if_modified_since,
         #                                           if_unmodified_since=if_unmodified_since)
+        source_blobs = list(collect_blobs(client, container_name, pattern))
         logger.warning('download action: from %s to %s', source, destination)
         logger.warning('    pattern %s', pattern)
         logger.warning('  container %s', container_name)
@@ -199,55 +287,131 @@ def storage_blob_download_batch(client, source, destination, container_name, pat
         logger.warning(' operations')
         for b in source_blobs:
             logger.warning('  - %s', b)
+        return []
 
-    else:
-        @check_precondition_success
-        def _download_blob(*args, **kwargs):
-            blob = download_blob(*args, **kwargs)
-            return blob.name
+    from azure.cli.core.azclierror import FileOperationError
 
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
+    @check_precondition_success
+    @retry_on_transient_error(max_retries=max_retries)
+    def _download_blob(*args, **kwargs):
+        blob = download_blob(*args, **kwargs)
+        return blob.name
+
+    # With several workers the per-request progress hook cannot tell the blobs apart, so progress is
+    # aggregated over the blobs listed so far and reported as each download completes instead.
+    aggregate_progress = progress_callback and concurrency > 1
+    blob_progress_callback = None if aggregate_progress else progress_callback
+
+    # Tell progress reporter to reuse the same hook
+    if progress_callback:
+        progress_callback.reuse = True
+
+    journal_path = os.path.join(destination, DOWNLOAD_JOURNAL_NAME)
+    journal = _load_download_journal(journal_path) if resume else {}
+    stats = {'listed': 0, 'listed_bytes': 0, 'skipped': 0}
+
+    def _blobs_to_download():
+        """Stream the listing, skipping blobs already downloaded and creating each local folder only once."""
+        downloaded_names = set()
+        created_folders = set()
+        for blob_name, blob in collect_blob_objects(client, container_name, pattern):
+            # remove starting path seperator and normalize
+            normalized_blob_name = normalize_blob_file_path(None, blob_name)
+            if normalized_blob_name in downloaded_names:
+                raise CLIError('Multiple blobs with download path: `{}`. As a solution, use the `--pattern` '
+                               'parameter to select for a subset of blobs to download OR utilize the `storage blob '
+                               'download` command instead to download individual blobs.'.format(normalized_blob_name))
+            downloaded_names.add(normalized_blob_name)
+            stats['listed'] += 1
+
+            destination_path = os.path.join(destination, os.path.normpath(normalized_blob_name))
+            if resume and _is_downloaded(journal.get(blob_name), blob, destination_path):
+                stats['skipped'] += 1
+                continue
 
-        for index, blob_normed in enumerate(blobs_to_download):
-            from azure.cli.core.azclierror import FileOperationError
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(blobs_to_download), blobs_to_download[blob_normed])
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=blobs_to_download[blob_normed])
-            destination_path = os.path.join(destination, os.path.normpath(blob_normed))
             destination_folder = os.path.dirname(destination_path)
-            # Failed when there is same name for file and folder
-            if os.path.isfile(destination_path) and os.path.exists(destination_folder):
+            # Failed when there is same name for file and folder. When resuming, an existing file is a partial or
+            # outdated download of this blob and gets overwritten.
+            if not resume and os.path.isfile(destination_path) and os.path.exists(destination_folder):
                 raise FileOperationError("%s already exists in %s. Please rename existing file or choose another "
                                          "destination folder. ")
-            if not os.path.exists(destination_folder):
+            if destination_folder not in created_folders:
                 mkdir_p(destination_folder)
-            include, result = _download_blob(client=blob_client, file_path=destination_path,
-                                             progress_callback=progress_callback, **kwargs)
+                created_folders.add(destination_folder)
+            stats['listed_bytes'] += blob.size or 0
+            yield stats['listed'], blob_name, blob, destination_path
+
+    def _download_action(blob_to_download):
+        index, blob_name, _, destination_path = blob_to_download
+        # add blob name and number to progress message
+        if blob_progress_callback:
+            blob_progress_callback.message = '{}: "{}"'.format(index, blob_name)
+        blob_client = client.get_blob_client(container=container_name, blob=blob_name)
+        return _download_blob(client=blob_client, file_path=destination_path,
+                              progress_callback=blob_progress_callback, **kwargs)
+
+    results = []
+    completed_bytes = 0
+    journal_file = open(journal_path, 'a') if resume else None  # pylint: disable=consider-using-with
+    try:
+        for (_, blob_name, blob, _), (include, result) in run_in_parallel(_download_action, _blobs_to_download(),
+                                                                          concurrency):
             if include:
                 results.append(result)
-
-        # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
-        num_failures = len(blobs_to_download) - len(results)
-        if num_failures:
-            logger.warning('%s of %s files not downloaded due to "Failed Precondition"',
-                           num_failures, len(blobs_to_download))
+                if journal_file:
+                    journal_file.write(json.dumps({'name': blob_name, 'etag': blob.etag, 'size': blob.size}) + '\n')
+                    journal_file.flush()
+            if aggregate_progress:
+                completed_bytes += blob.size or 0
+                progress_callback.hook.add(message='{} blobs downloaded'.format(len(results)),
+                                           value=completed_bytes if stats['listed_bytes'] else len(results),
+                                           total_val=stats['listed_bytes'] or stats['listed'])
+    finally:
+        if journal_file:
+            journal_file.close()
+
+    # end progress hook
+    if progress_callback:
+        progress_callback.hook.end()
+    if stats['skipped']:
+        logger.warning('%s of %s blobs skipped as they were already downloaded', stats['skipped'], stats['listed'])
+    num_failures = stats['listed'] - stats['skipped'] - len(results)
+    if num_failures:
+        logger.warning('%s of %s files not downloaded due to "Failed Precondition"',
+                       num_failures, stats['listed'] - stats['skipped'])
     return results
 
 
+def _load_download_journal(journal_path):
+    """Read the blob name -> (etag, size) entries recorded by previous runs of download-batch --resume."""
+    journal = {}
+    if not os.path.isfile(journal_path):
+        return journal
+    with open(journal_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line may be torn if the previous run was interrupted while writing it
+                continue
+            journal[entry['name']] = (entry['etag'], entry['size'])
+    return journal
+
+
+def _is_downloaded(journal_entry, blob, destination_path):
+    if not journal_entry or journal_entry != (blob.etag, blob.size):
+        return False
+    return os.path.isfile(destination_path) and os.path.getsize(destination_path) == blob.size
+
+
 def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  # pylint: disable=too-many-locals
                               source_files=None, destination_path=None,
                               container_name=None, blob_type=None,
                               content_settings=None, metadata=None, validate_content=False,
                               maxsize_condition=None, max_connections=2, lease_id=None, progress_callback=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None, **kwargs):
+                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None,
+                              concurrency=1, max_retries=3, if_changed=False, **kwargs):
     def _create_return_result(blob_content_settings, upload_result=None):
         return {
             'Blob': client.url,
@@ -258,6 +422,14 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
     source_files = source_files or []
     t_content_settings = cmd.get_models('_models#ContentSettings', resource_type=cmd.command_kwargs['resource_type'])
 
+    if if_changed:
+        md5_index_path = os.path.join(cmd.cli_ctx.config.config_dir, UPLOAD_MD5_INDEX_NAME)
+        changed_files = _filter_changed_files(client, container_name, destination_path, source_files,
+                                              md5_index_path)
+        logger.warning('%s of %s files unchanged since the last upload', len(source_files) - len(changed_files),
+                       len(source_files))
+        source_files = changed_files
+
     results = []
     if dryrun:
         logger.info('upload action: from %s to %s', source, destination)
@@ -271,35 +443,54 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
                                                                                           t_content_settings)))
     else:
         @check_precondition_success
+        @retry_on_transient_error(max_retries=max_retries)
         def _upload_blob(*args, **kwargs):
             return upload_blob(*args, **kwargs)
 
+        # With several workers the per-request progress hook cannot tell the files apart, so progress is
+        # aggregated over the whole batch and reported as each file completes instead.
+        aggregate_progress = progress_callback and concurrency > 1
+        file_progress_callback = None if aggregate_progress else progress_callback
+        total_bytes = sum(os.path.getsize(src) for src, _ in source_files) if aggregate_progress else 0
+
         # Tell progress reporter to reuse the same hook
         if progress_callback:
             progress_callback.reuse = True
 
-        for index, source_file in enumerate(source_files):
-            src, dst = source_file
-            # logger.warning('uploading %s', src)
+        def _upload_action(indexed_source_file):
+            index, (src, dst) = indexed_source_file
             guessed_content_settings = guess_content_type(src, content_settings, t_content_settings)
+            blob_name = normalize_blob_file_path(destination_path, dst)
 
             # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(source_files), normalize_blob_file_path(destination_path, dst))
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=normalize_blob_file_path(destination_path, dst))
+            if file_progress_callback:
+                file_progress_callback.message = '{}/{}: "{}"'.format(index + 1, len(source_files), blob_name)
+            blob_client = client.get_blob_client(container=container_name, blob=blob_name)
             include, result = _upload_blob(cmd, blob_client, file_path=src,
                                            blob_type=blob_type, content_settings=guessed_content_settings,
                                            metadata=metadata, validate_content=validate_content,
                                            maxsize_condition=maxsize_condition, max_connections=max_connections,
-                                           lease_id=lease_id, progress_callback=progress_callback,
+                                           lease_id=lease_id, progress_callback=file_progress_callback,
                                            if_modified_since=if_modified_since,
                                            if_unmodified_since=if_unmodified_since, if_match=if_match,
                                            if_none_match=if_none_match, timeout=timeout, **kwargs)
             if include:
-                results.append(_create_return_result(blob_content_settings=guessed_content_settings,
-                                                     upload_result=result))
+                return _create_return_result(blob_content_settings=guessed_content_settings, upload_result=result)
+            return None
+
+        # keep the results in the order of the source files regardless of which worker finished first
+        uploaded = [None] * len(source_files)
+        completed_files, completed_bytes = 0, 0
+        for (index, (src, _)), result in run_in_parallel(_upload_action, enumerate(source_files), concurrency):
+            uploaded[index] = result
+            if aggregate_progress:
+                completed_files += 1
+                completed_bytes += os.path.getsize(src)
+                progress_callback.hook.add(message='{}/{} files'.format(completed_files, len(source_files)),
+                                           value=completed_bytes if total_bytes else completed_files,
+                                           total_val=total_bytes or len(source_files))
+        results = list(filter_none(uploaded))
+
         # end progress hook
         if progress_callback:
             progress_callback.hook.end()
@@ -309,6 +500,77 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
     return results
 
 
+def _filter_changed_files(client, container_name, destination_path, source_files, md5_index_path):
+    """
+    Return the source files that differ from their blob in a single listing of the destination. A file is unchanged
+    when the blob has the same size and was written after the file was last modified. When only the modification
+    time differs, the MD5 of the file is compared with the Content-MD5 of the blob, reusing the hashes cached in
+    md5_index_path for files whose size and modification time have not changed.
+    """
+    from datetime import timezone
+    pending = {normalize_blob_file_path(destination_path, dst): (src, dst) for src, dst in source_files}
+    md5_index = _load_md5_index(md5_index_path)
+    md5_index_updated = False
+
+    container_client = client.get_container_client(container=container_name)
+    for blob in container_client.list_blobs(name_starts_with=destination_path or None):
+        source_file = pending.get(blob.name)
+        if not source_file:
+            continue
+        src = source_file[0]
+        stat = os.stat(src)
+        if stat.st_size != blob.size:
+            continue
+        if datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc) <= blob.last_modified:
+            del pending[blob.name]
+            continue
+
+        blob_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+        if not blob_md5:
+            continue
+        path = os.path.realpath(src)
+        cached = md5_index.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            file_md5 = cached[2]
+        else:
+            file_md5 = _file_md5(src)
+            md5_index[path] = [stat.st_size, stat.st_mtime, file_md5]
+            md5_index_updated = True
+        if file_md5 == bytes(blob_md5).hex():
+            del pending[blob.name]
+
+    if md5_index_updated:
+        _save_md5_index(md5_index_path, md5_index)
+    return [source_file for source_file in source_files
+            if normalize_blob_file_path(destination_path, source_file[1]) in pending]
+
+
+def _file_md5(file_path):
+    import hashlib
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _load_md5_index(md5_index_path):
+    """Read the path -> [size, mtime, md5] entries cached by upload-batch --if-changed."""
+    try:
+        with open(md5_index_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_md5_index(md5_index_path, md5_index):
+    # write to a temporary file first so an interrupted run cannot leave a truncated index behind
+    temp_path = md5_index_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(md5_index, f)
+    os.replace(temp_path, md5_index_path)
+
+
 def transform_blob_type(cmd, blob_type):
     """
     get_blob_types() will get ['block', 'page', 'append']
@@ -425,8 +687,7 @@ def _copy_blob_to_blob_container(cmd, blob_service, source_blob_service, destina
     destination_blob_name = normalize_blob_file_path(destination_path, source_blob_name)
     try:
         blob_client = blob_service.get_blob_client(container=destination_container, blob=destination_blob_name)
-        blob_client.start_copy_from_url(source_url=source_blob_url, incremental_copy=False)
-        return blob_client.url
+        return blob_client, blob_client.start_copy_from_url(source_url=source_blob_url, incremental_copy=False)
     except HttpResponseError as ex:
         error_template = 'Failed to copy blob {} to container {}. {}'
         raise CLIError(error_template.format(source_blob_name, destination_container, ex))
@@ -444,8 +705,7 @@ def _copy_file_to_blob_container(blob_service, source_file_service, destination_
 
     try:
         blob_client = blob_service.get_blob_client(container=destination_container, blob=destination_blob_name)
-        blob_client.start_copy_from_url(source_url=file_url, incremental_copy=False)
-        return blob_client.url
+        return blob_client, blob_client.start_copy_from_url(source_url=file_url, incremental_copy=False)
     except HttpResponseError as ex:
         error_template = 'Failed to copy file {} to container {}. {}'
         raise CLIError(error_template.format(source_file_name, destination_container, ex))
@@ -0,0 +1,353 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+
+from ...util import (collect_blobs, glob_files_remotely, retry_on_transient_error, run_in_parallel,
+                     _pattern_prefix)
+
+
+def _http_error(status_code):
+    error = HttpResponseError(message='error {}'.format(status_code))
+    error.status_code = status_code
+    return error
+
+
+class TestRunInParallel(unittest.TestCase):
+    def test_sequential_when_concurrency_is_one(self):
+        calls = []
+
+        def _action(item):
+            calls.append(item)
+            return item * 2
+
+        self.assertEqual(list(run_in_parallel(_action, range(5), 1)), [(i, i * 2) for i in range(5)])
+        self.assertEqual(calls, list(range(5)))
+
+    def test_all_items_processed_with_bounded_workers(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0, 'timed_out': False}
+        # the calls are held until as many run at once as there are workers
+        all_workers_busy = threading.Event()
+
+        def _action(item):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+                if state['running'] == 4:
+                    all_workers_busy.set()
+            if not all_workers_busy.wait(5):
+                with lock:
+                    state['timed_out'] = True
+                all_workers_busy.set()
+            with lock:
+                state['running'] -= 1
+            return item + 1
+
+        results = dict(run_in_parallel(_action, range(100), 4))
+        self.assertEqual(results, {i: i + 1 for i in range(100)})
+        self.assertFalse(state['timed_out'])
+        self.assertEqual(state['peak'], 4)
+
+    def test_items_are_consumed_lazily(self):
+        consumed = []
+
+        def _items():
+            for i in range(1000):
+                consumed.append(i)
+                yield i
+
+        results = run_in_parallel(lambda item: item, _items(), 2)
+        next(results)
+        self.assertLessEqual(len(consumed), 5)
+        results.close()
+
+    def test_first_error_is_raised(self):
+        def _action(item):
+            if item == 3:
+                raise ValueError('boom')
+            return item
+
+        with self.assertRaises(ValueError):
+            list(run_in_parallel(_action, range(10), 3))
+
+
+class TestRetryOnTransientError(unittest.TestCase):
+    @mock.patch('time.sleep')
+    def test_retries_transient_errors_with_backoff(self, sleep):
+        attempts = iter([ServiceRequestError('connection reset'), _http_error(503)])
+
+        @retry_on_transient_error(max_retries=3, backoff=0.5)
+        def _action():
+            error = next(attempts, None)
+            if error:
+                raise error
+            return 'done'
+
+        self.assertEqual(_action(), 'done')
+        self.assertEqual([c[0][0] for c in sleep.call_args_list], [0.5, 1.0])
+
+    @mock.patch('time.sleep')
+    def test_precondition_failure_is_not_retried(self, sleep):
+        @retry_on_transient_error(max_retries=3)
+        def _action():
+            raise _http_error(412)
+
+        with self.assertRaises(HttpResponseError):
+            _action()
+        sleep.assert_not_called()
+
+    @mock.patch('time.sleep')
+    def test_gives_up_after_max_retries(self, sleep):
+        action = mock.Mock(side_effect=_http_error(500))
+
+        with self.assertRaises(HttpResponseError):
+            retry_on_transient_error(max_retries=2)(action)()
+        self.assertEqual(action.call_count, 3)
+
+
+class TestCollectBlobs(unittest.TestCase):
+    def test_pattern_prefix(self):
+        self.assertEqual(_pattern_prefix('logs/2026/10/*'), 'logs/2026/10/')
+        self.assertEqual(_pattern_prefix('logs/2026/1?/*.txt'), 'logs/2026/1')
+        self.assertEqual(_pattern_prefix('logs/[ab]*'), 'logs/')
+        self.assertEqual(_pattern_prefix('*/file_0'), '')
+        self.assertEqual(_pattern_prefix(None), '')
+
+    def test_prefix_is_pushed_to_the_service(self):
+        service = _FakeBlobService({'logs/2026/10/a': (b'', ''), 'logs/2026/10/b.txt': (b'', ''),
+                                    'logs/2026/09/c': (b'', ''), 'data/d': (b'', '')})
+        blobs = collect_blobs(service, 'container', 'logs/2026/10/*')
+        self.assertFalse(isinstance(blobs, list))
+        self.assertEqual(list(blobs), ['logs/2026/10/a', 'logs/2026/10/b.txt'])
+        service.container_client.list_blobs.assert_called_once_with(name_starts_with='logs/2026/10/')
+
+        self.assertEqual(list(collect_blobs(service, 'container', '*.txt')), ['logs/2026/10/b.txt'])
+        service.container_client.list_blobs.assert_called_with(name_starts_with=None)
+
+
+class _Directory(SimpleNamespace):
+    pass
+
+
+class _File(SimpleNamespace):
+    pass
+
+
+class TestGlobFilesRemotely(unittest.TestCase):
+    def setUp(self):
+        import os
+        tree = {'': ['apple', 'banana', 'readme'],
+                'apple': ['file_0', 'file_1', 'seed'],
+                os.path.join('apple', 'seed'): ['file_0'],
+                'banana': ['file_0']}
+        self.listed = []
+
+        def _list_directories_and_files(share_name, directory):
+            self.listed.append(directory)
+            return [_Directory(name=n) if os.path.join(directory, n) in tree else _File(name=n)
+                    for n in tree[directory]]
+
+        self.client = mock.Mock()
+        self.client.list_directories_and_files.side_effect = _list_directories_and_files
+        self.cmd = mock.Mock()
+        self.cmd.get_models.return_value = (_Directory, _File)
+        # the models are resolved through the mocked cmd, so the resource type does not matter here
+        patcher = mock.patch('azext_storage_blob_preview.util.ResourceType')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_walks_the_whole_share(self):
+        import os
+        files = set(glob_files_remotely(self.cmd, self.client, 'share', '*/file_0'))
+        self.assertEqual(files, {('apple', 'file_0'), ('banana', 'file_0'), (os.path.join('apple', 'seed'), 'file_0')})
+        self.assertEqual(len(self.listed), 4)
+
+    def test_prunes_directories_outside_the_pattern_prefix(self):
+        files = set(glob_files_remotely(self.cmd, self.client, 'share', 'apple/file_*'))
+        self.assertEqual(files, {('apple', 'file_0'), ('apple', 'file_1')})
+        self.assertEqual(sorted(self.listed), ['', 'apple'])
+
+
+class _FakeBlobService:
+    """In-memory stand-in for a BlobServiceClient holding a single container."""
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.downloads = []
+
+    def get_container_client(self, container):
+        self.container_client = container_client = mock.Mock()
+        container_client.list_blobs.side_effect = lambda name_starts_with=None: [
+            SimpleNamespace(name=name, size=len(data), etag=etag) for name, (data, etag) in self.blobs.items()
+            if name.startswith(name_starts_with or '')]
+        return container_client
+
+    def get_blob_client(self, container, blob):
+        data, _ = self.blobs[blob]
+
+        def _download_blob(**_):
+            self.downloads.append(blob)
+            return mock.Mock(readinto=lambda stream: stream.write(data))
+
+        blob_client = mock.Mock()
+        blob_client.download_blob.side_effect = _download_blob
+        blob_client.get_blob_properties.return_value = SimpleNamespace(name=blob)
+        return blob_client
+
+
+class TestDownloadBatch(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.destination = tempfile.mkdtemp()
+        self.service = _FakeBlobService({'a/1.txt': (b'one', '"1"'), 'a/2.txt': (b'two', '"2"'),
+                                         'b/c/3.txt': (b'three', '"3"')})
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.destination)
+
+    def _download(self, **kwargs):
+        from ...operations.blob import storage_blob_download_batch
+        return storage_blob_download_batch(self.service, 'src', self.destination, 'container', pattern='*',
+                                           **kwargs)
+
+    def test_parallel_download(self):
+        import os
+        results = self._download(concurrency=3)
+        self.assertEqual(sorted(results), ['a/1.txt', 'a/2.txt', 'b/c/3.txt'])
+        with open(os.path.join(self.destination, 'b', 'c', '3.txt'), 'rb') as f:
+            self.assertEqual(f.read(), b'three')
+
+    def test_resume_skips_unchanged_blobs(self):
+        import os
+        from ...operations.blob import DOWNLOAD_JOURNAL_NAME
+        self._download(resume=True)
+        self.assertTrue(os.path.isfile(os.path.join(self.destination, DOWNLOAD_JOURNAL_NAME)))
+
+        # a changed ETag and a deleted local file both cause the blob to be downloaded again
+        self.service.blobs['a/2.txt'] = (b'TWO', '"22"')
+        os.remove(os.path.join(self.destination, 'b', 'c', '3.txt'))
+        self.service.downloads = []
+        self._download(resume=True, concurrency=2)
+        self.assertEqual(sorted(self.service.downloads), ['a/2.txt', 'b/c/3.txt'])
+
+        self.service.downloads = []
+        self._download(resume=True)
+        self.assertEqual(self.service.downloads, [])
+
+
+class _FakeCopyDestination:
+    """Destination blob whose server-side copy finishes after a number of status polls."""
+    def __init__(self, name, polls_to_finish, size=10):
+        self.url = 'https://account.blob.core.windows.net/container/' + name
+        self.polls_to_finish = polls_to_finish
+        self.size = size
+
+    def get_blob_properties(self):
+        self.polls_to_finish -= 1
+        done = self.polls_to_finish <= 0
+        return SimpleNamespace(copy=SimpleNamespace(
+            id='copy-' + self.url, status='success' if done else 'pending', status_description=None,
+            progress='{0}/{1}'.format(self.size if done else 0, self.size)))
+
+
+class TestWaitForCopies(unittest.TestCase):
+    @mock.patch('time.sleep')
+    def test_window_of_pending_copies(self, sleep):
+        from ...operations.blob import _wait_for_copies
+        destinations = [_FakeCopyDestination(str(i), polls_to_finish=2) for i in range(5)]
+        started = []
+
+        def _start_copies():
+            for destination in destinations:
+                started.append(destination)
+                yield destination, {'copy_id': 'copy-' + destination.url, 'copy_status': 'pending'}
+
+        results = []
+        for result in _wait_for_copies(_start_copies(), max_pending_copies=2):
+            # never more than the window of copies pending before a result is reported
+            self.assertLessEqual(len(started) - len(results), 2)
+            results.append(result)
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r['copyStatus'] == 'success' and r['bytesCopied'] == 10 for r in results))
+        self.assertTrue(sleep.called)
+
+    def test_completed_copies_are_not_polled(self):
+        from ...operations.blob import _wait_for_copies
+        destination = mock.Mock(url='https://account.blob.core.windows.net/container/a')
+        results = list(_wait_for_copies(iter([(destination, {'copy_id': '1', 'copy_status': 'success'})]), 10))
+        self.assertEqual(results, [{'url': destination.url, 'copyId': '1', 'copyStatus': 'success',
+                                    'bytesCopied': None}])
+        destination.get_blob_properties.assert_not_called()
+
+
+class TestUploadBatchValidator(unittest.TestCase):
+    def test_if_changed_requires_overwrite(self):
+        import os
+        import tempfile
+        from azure.cli.core.azclierror import RequiredArgumentMissingError
+        from ..._validators import process_blob_upload_batch_parameters
+        source = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, source)
+
+        namespace = SimpleNamespace(source=source, if_changed=True, overwrite=None)
+        with self.assertRaises(RequiredArgumentMissingError):
+            process_blob_upload_batch_parameters(mock.Mock(), namespace)
+
+
+class TestFilterChangedFiles(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        self.source = tempfile.mkdtemp()
+        self.md5_index = os.path.join(tempfile.mkdtemp(), 'md5_index.json')
+        self.source_files = []
+        for name, data in (('same', b'same'), ('touched', b'touched'), ('edited', b'edited'), ('new', b'new')):
+            path = os.path.join(self.source, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.source_files.append((path, name))
+
+    def tearDown(self):
+        import os
+        import shutil
+        shutil.rmtree(self.source)
+        shutil.rmtree(os.path.dirname(self.md5_index))
+
+    def _blob(self, name, data, uploaded_after_modification):
+        import hashlib
+        import os
+        from datetime import datetime, timedelta, timezone
+        mtime = datetime.fromtimestamp(os.path.getmtime(os.path.join(self.source, name)), tz=timezone.utc)
+        last_modified = mtime + timedelta(minutes=1 if uploaded_after_modification else -1)
+        return SimpleNamespace(name='dir/' + name, size=len(data), last_modified=last_modified,
+                               content_settings=SimpleNamespace(content_md5=bytearray(hashlib.md5(data).digest())))
+
+    def test_only_changed_files_are_returned(self):
+        from ...operations.blob import _filter_changed_files
+        client = mock.Mock()
+        client.get_container_client.return_value.list_blobs.return_value = [
+            self._blob('same', b'same', uploaded_after_modification=True),
+            # modified after the upload, but with the same content
+            self._blob('touched', b'touched', uploaded_after_modification=False),
+            # modified after the upload with the same size and different content
+            self._blob('edited', b'EDITED', uploaded_after_modification=False),
+        ]
+
+        changed = _filter_changed_files(client, 'container', 'dir', self.source_files, self.md5_index)
+        self.assertEqual([dst for _, dst in changed], ['edited', 'new'])
+        client.get_container_client.return_value.list_blobs.assert_called_once_with(name_starts_with='dir')
+
+        # the hashes computed for the files are cached for the next run
+        with mock.patch('azext_storage_blob_preview.operations.blob._file_md5') as file_md5:
+            changed = _filter_changed_files(client, 'container', 'dir', self.source_files, self.md5_index)
+            self.assertEqual([dst for _, dst in changed], ['edited', 'new'])
+            file_md5.assert_not_called()
@@ -5,20 +5,32 @@
 
 
 import os
+import re
+from functools import lru_cache
 from azure.cli.core.profiles import ResourceType
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# HTTP status codes worth retrying a whole batch item for once the SDK's own retry policy has given up
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# number of file share directories listed at once when globbing a share
+REMOTE_LISTING_WORKERS = 8
 
 
 def collect_blobs(blob_service, container, pattern=None):
     """
     List the blobs in the given blob container, filter the blob by comparing their path to the given pattern.
     """
-    return [name for (name, _) in collect_blob_objects(blob_service, container, pattern)]
+    return (name for (name, _) in collect_blob_objects(blob_service, container, pattern))
 
 
 def collect_blob_objects(blob_service, container, pattern=None):
     """
     List the blob name and blob in the given blob container, filter the blob by comparing their path to
-     the given pattern.
+     the given pattern. The literal prefix of the pattern is sent to the service as name_starts_with so only
+     the blobs that can match are listed.
     """
     if not blob_service:
         raise ValueError('missing parameter blob_service')
@@ -31,7 +43,7 @@ def collect_blob_objects(blob_service, container, pattern=None):
             yield pattern, blob_service.get_blob_properties(container, pattern)
     else:
         container_client = blob_service.get_container_client(container=container)
-        for blob in container_client.list_blobs():
+        for blob in container_client.list_blobs(name_starts_with=_pattern_prefix(pattern) or None):
             try:
                 blob_name = blob.name.encode('utf-8') if isinstance(blob.name, unicode) else blob.name
             except NameError:
@@ -53,7 +65,7 @@ def collect_files(cmd, file_service, share, pattern=None):
         raise ValueError('missing parameter share')
 
     if not _pattern_has_wildcards(pattern):
-        return [pattern]
+        return [os.path.split(pattern)]
 
     return glob_files_remotely(cmd, file_service, share, pattern)
 
@@ -89,20 +101,58 @@ def glob_files_locally(folder_path, pattern):
                 yield (full_path, full_path[len_folder_path:])
 
 
-def glob_files_remotely(cmd, client, share_name, pattern):
-    """glob the files in remote file share based on the given pattern"""
+def glob_files_remotely(cmd, client, share_name, pattern, max_workers=REMOTE_LISTING_WORKERS):
+    """
+    glob the files in remote file share based on the given pattern
+
+    The share is walked breadth first with up to max_workers directories listed at once, and subtrees that cannot
+    contain a match for the literal prefix of the pattern are not listed. Files are yielded as soon as their
+    directory has been listed, so callers can start processing them while the walk continues in the background.
+    """
     from collections import deque
     t_dir, t_file = cmd.get_models('file.models#Directory', 'file.models#File', resource_type=ResourceType.DATA_STORAGE)
 
+    prefix = os.path.normcase(_pattern_prefix(pattern))
+
+    def _may_contain_match(directory):
+        directory = os.path.normcase(os.path.join(directory, ''))
+        return directory.startswith(prefix) or prefix.startswith(directory)
+
+    def _list_directory(directory):
+        return list(client.list_directories_and_files(share_name, directory))
+
     queue = deque([""])
-    while queue:
-        current_dir = queue.pop()
-        for f in client.list_directories_and_files(share_name, current_dir):
+    for current_dir, entries in _list_directories(_list_directory, queue, max_workers):
+        for f in entries:
             if isinstance(f, t_file):
                 if not pattern or _match_path(os.path.join(current_dir, f.name), pattern):
                     yield current_dir, f.name
             elif isinstance(f, t_dir):
-                queue.appendleft(os.path.join(current_dir, f.name))
+                sub_dir = os.path.join(current_dir, f.name)
+                if _may_contain_match(sub_dir):
+                    queue.append(sub_dir)
+
+
+def _list_directories(list_directory, queue, max_workers):
+    """
+    List the directories in queue with up to max_workers at once, and yield each directory with its entries as soon
+    as it has been listed. Directories appended to queue by the caller are listed too.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while queue or pending:
+                while queue and len(pending) < max_workers:
+                    directory = queue.popleft()
+                    pending[executor.submit(list_directory, directory)] = directory
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
 
 
 def create_short_lived_blob_sas(cmd, account_name, account_key, container, blob):
@@ -176,9 +226,23 @@ def _pattern_has_wildcards(p):
     return not p or p.find('*') != -1 or p.find('?') != -1 or p.find('[') != -1
 
 
+def _pattern_prefix(pattern):
+    """Return the literal part of the pattern before its first wildcard, which every matching path starts with."""
+    if not pattern:
+        return ''
+    wildcards = [i for i in (pattern.find('*'), pattern.find('?'), pattern.find('[')) if i != -1]
+    return pattern[:min(wildcards)] if wildcards else pattern
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern):
+    from fnmatch import translate
+    return re.compile(translate(os.path.normcase(pattern))).match
+
+
 def _match_path(path, pattern):
-    from fnmatch import fnmatch
-    return fnmatch(path, pattern)
+    # same semantics as fnmatch.fnmatch, without translating the pattern again for every path
+    return _compile_pattern(pattern)(os.path.normcase(path)) is not None
 
 
 def guess_content_type(file_path, original, settings_class):
@@ -235,3 +299,67 @@ def check_precondition_success(func):
                 raise
             return False, None
     return wrapper
+
+
+def retry_on_transient_error(max_retries=3, backoff=1.0):
+    """
+    Decorator that retries the call on connection failures and transient HTTP status codes, sleeping
+    backoff * 2 ** attempt seconds between attempts. Other errors, including precondition failures, are raised
+    immediately.
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            import time
+            from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except (ServiceRequestError, ServiceResponseError, HttpResponseError) as ex:
+                    if isinstance(ex, HttpResponseError) and ex.status_code not in TRANSIENT_STATUS_CODES:
+                        raise
+                    if attempt >= max_retries:
+                        raise
+                    delay = backoff * 2 ** attempt
+                    attempt += 1
+                    logger.warning('Retrying (%s/%s) in %.1fs after transient error: %s',
+                                   attempt, max_retries, delay, ex)
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+
+def run_in_parallel(func, items, concurrency=1):
+    """
+    Apply func to every item on a bounded thread pool and yield (item, result) tuples as the calls complete.
+    Items are pulled from the iterable lazily so at most 2 * concurrency calls are queued at any time. The first
+    exception raised by func cancels the calls that have not started yet and is re-raised to the caller.
+    """
+    if concurrency is None or concurrency <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    items = iter(items)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        def _fill():
+            while len(pending) < 2 * concurrency:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                pending[executor.submit(func, item)] = item
+
+        try:
+            _fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    yield item, future.result()
+                _fill()
+        finally:
+            for future in pending:
+                future.cancel()
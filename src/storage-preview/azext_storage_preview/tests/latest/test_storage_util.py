@@ -0,0 +1,42 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from ...util import collect_blobs, _match_path, _pattern_prefix
+
+
+class TestCollectBlobs(unittest.TestCase):
+    def setUp(self):
+        names = ['logs/2026/10/a', 'logs/2026/10/b.txt', 'logs/2026/09/c', 'data/d']
+        self.blob_service = mock.Mock()
+        self.blob_service.list_blobs.side_effect = lambda container, prefix=None: [
+            SimpleNamespace(name=n) for n in names if n.startswith(prefix or '')]
+
+    def test_pattern_prefix(self):
+        self.assertEqual(_pattern_prefix('logs/2026/10/*'), 'logs/2026/10/')
+        self.assertEqual(_pattern_prefix('logs/[ab]?/*'), 'logs/')
+        self.assertEqual(_pattern_prefix('*/file_0'), '')
+
+    def test_match_path(self):
+        self.assertTrue(_match_path('logs/2026/10/a', 'logs/*'))
+        self.assertTrue(_match_path('logs/a', '*/[ab]'))
+        self.assertFalse(_match_path('logs/c', '*/[ab]'))
+
+    def test_prefix_is_pushed_to_the_service(self):
+        blobs = collect_blobs(self.blob_service, 'container', 'logs/2026/10/*')
+        self.assertEqual(list(blobs), ['logs/2026/10/a', 'logs/2026/10/b.txt'])
+        self.blob_service.list_blobs.assert_called_once_with('container', prefix='logs/2026/10/')
+
+    def test_pattern_without_prefix_lists_the_container(self):
+        self.assertEqual(list(collect_blobs(self.blob_service, 'container', '*.txt')), ['logs/2026/10/b.txt'])
+        self.blob_service.list_blobs.assert_called_once_with('container', prefix=None)
+
+    def test_pattern_without_wildcards(self):
+        self.blob_service.exists.return_value = True
+        self.assertEqual(list(collect_blobs(self.blob_service, 'container', 'data/d')), ['data/d'])
+        self.blob_service.list_blobs.assert_not_called()
@@ -5,11 +5,15 @@
 
 
 import os
+import re
+from functools import lru_cache
 
 
 def collect_blobs(blob_service, container, pattern=None):
     """
     List the blobs in the given blob container, filter the blob by comparing their path to the given pattern.
+    The literal prefix of the pattern is sent to the service so only the blobs that can match are listed, and the
+    names are yielded as the listing pages arrive.
     """
     if not blob_service:
         raise ValueError('missing parameter blob_service')
@@ -18,10 +22,11 @@ def collect_blobs(blob_service, container, pattern=None):
         raise ValueError('missing parameter container')
 
     if not _pattern_has_wildcards(pattern):
-        return [pattern] if blob_service.exists(container, pattern) else []
+        if blob_service.exists(container, pattern):
+            yield pattern
+        return
 
-    results = []
-    for blob in blob_service.list_blobs(container):
+    for blob in blob_service.list_blobs(container, prefix=_pattern_prefix(pattern) or None):
         try:
             blob_name = blob.name.encode(
                 'utf-8') if isinstance(blob.name, unicode) else blob.name
@@ -29,9 +34,7 @@ def collect_blobs(blob_service, container, pattern=None):
             blob_name = blob.name
 
         if not pattern or _match_path(blob_name, pattern):
-            results.append(blob_name)
-
-    return results
+            yield blob_name
 
 
 def collect_files(cmd, file_service, share, pattern=None):
@@ -173,9 +176,23 @@ def _pattern_has_wildcards(p):
     return not p or p.find('*') != -1 or p.find('?') != -1 or p.find('[') != -1
 
 
+def _pattern_prefix(pattern):
+    """Return the literal part of the pattern before its first wildcard, which every matching path starts with."""
+    if not pattern:
+        return ''
+    wildcards = [i for i in (pattern.find('*'), pattern.find('?'), pattern.find('[')) if i != -1]
+    return pattern[:min(wildcards)] if wildcards else pattern
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern):
+    from fnmatch import translate
+    return re.compile(translate(os.path.normcase(pattern))).match
+
+
 def _match_path(path, pattern):
-    from fnmatch import fnmatch
-    return fnmatch(path, pattern)
+    # same semantics as fnmatch.fnmatch, without translating the pattern again for every path
+    return _compile_pattern(pattern)(os.path.normcase(path)) is not None
 
 
 def guess_content_type(file_path, original, settings_class):
@@ -0,0 +1,86 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from azext_webapp.tunnel_benchmark import LoopbackTunnelServer, LoopbackWebSocket, _echo
+
+
+class _RecordingTunnelServer(LoopbackTunnelServer):
+    """Keeps the loopback websocket of every connection"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.web_sockets = []
+
+    def _create_web_socket(self):
+        web_socket = LoopbackWebSocket()
+        self.web_sockets.append(web_socket)
+        return web_socket
+
+
+class TunnelServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = _RecordingTunnelServer()
+        # queue the connections opened before the listener runs instead of refusing them
+        self.server.sock.listen(100)
+        self.loop = asyncio.new_event_loop()
+        self.listener = self.loop.create_task(self.server._listen())  # pylint: disable=protected-access
+        self.server_thread = threading.Thread(target=self.loop.run_until_complete,
+                                              args=(asyncio.wait([self.listener]),))
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.listener.cancel)
+        self.server_thread.join(10)
+        self.loop.close()
+        self.server.sock.close()
+
+    def _wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('Timed out waiting for the tunnel')
+            time.sleep(0.01)
+
+    def test_concurrent_echoes(self):
+        size = 512 * 1024
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            received = list(pool.map(lambda _: _echo(self.server.local_port, size), range(8)))
+
+        self.assertEqual(received, [size] * 8)
+        self.assertEqual(len(self.server.web_sockets), 8)
+        # every websocket is closed once its client hung up
+        self._wait_for(lambda: not any(web_socket.connected for web_socket in self.server.web_sockets))
+
+    def test_client_disconnect_closes_its_websocket(self):
+        with socket.create_connection(('127.0.0.1', self.server.local_port)) as client:
+            client.sendall(b'ping')
+            self.assertEqual(client.recv(4), b'ping')
+            self.assertEqual(len(self.server.web_sockets), 1)
+            web_socket = self.server.web_sockets[0]
+            self.assertTrue(web_socket.connected)
+
+        self._wait_for(lambda: not web_socket.connected)
+
+        # the other connections are still served
+        self.assertEqual(_echo(self.server.local_port, 1024), 1024)
+
+    def test_stopping_the_server_closes_open_connections(self):
+        with socket.create_connection(('127.0.0.1', self.server.local_port)) as client:
+            client.sendall(b'ping')
+            self.assertEqual(client.recv(4), b'ping')
+
+            self.loop.call_soon_threadsafe(self.listener.cancel)
+            self.server_thread.join(10)
+
+            self.assertFalse(self.server_thread.is_alive())
+            self.assertFalse(self.server.web_sockets[0].connected)
+            self.assertEqual(client.recv(4), b'')
@@ -4,15 +4,16 @@
 # --------------------------------------------------------------------------------------------
 
 # pylint: disable=import-error,unused-import,import-outside-toplevel,super-with-arguments
+import asyncio
 import sys
 import ssl
 import socket
 import time
 import traceback
 import logging as logs
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 from datetime import datetime
-from threading import Thread
 
 import websocket
 from websocket import create_connection, WebSocket
@@ -21,22 +22,22 @@ from knack.util import CLIError
 from knack.log import get_logger
 logger = get_logger(__name__)
 
+TUNNEL_BUFFER_SIZE = 64 * 1024
+TUNNEL_MAX_CONNECTIONS = 100
+TUNNEL_IDLE_TIMEOUT = 1800
+
 
 class TunnelWebSocket(WebSocket):
     def recv_frame(self):
         frame = super(TunnelWebSocket, self).recv_frame()
-        logger.info('Received frame: %s', frame)
+        logger.debug('Received frame, opcode: %s, length: %s', frame.opcode, len(frame.data))
         return frame
 
-    def recv(self):
-        data = super(TunnelWebSocket, self).recv()
-        logger.info('Received websocket data: %s', data)
-        return data
-
 
 # pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
 class TunnelServer(object):
-    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password):
+    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password,
+                 max_connections=TUNNEL_MAX_CONNECTIONS, buffer_size=TUNNEL_BUFFER_SIZE):
         self.local_addr = local_addr
         self.local_port = local_port
         if self.local_port != 0 and not self.is_port_open():
@@ -44,8 +45,8 @@ class TunnelServer(object):
         self.remote_addr = remote_addr
         self.remote_user_name = remote_user_name
         self.remote_password = remote_password
-        self.client = None
-        self.ws = None
+        self.max_connections = max_connections
+        self.buffer_size = buffer_size
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -102,89 +103,102 @@ class TunnelServer(object):
             return True
         return False
 
-    def _listen(self):
+    def _create_web_socket(self):
+        host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
+        basic_auth_header = 'Authorization: Basic {}'.format(self.create_basic_auth())
+        return create_connection(host,
+                                 sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                 class_=TunnelWebSocket,
+                                 header=[basic_auth_header],
+                                 sslopt={'cert_reqs': ssl.CERT_NONE},
+                                 enable_multithread=True)
+
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
         self.sock.listen(100)
+        self.sock.setblocking(False)
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
+        if is_verbose:
+            logger.info('Websocket tracing enabled')
+            websocket.enableTrace(True)
+        else:
+            logger.warning('Websocket tracing disabled, use --verbose flag to enable')
+            websocket.enableTrace(False)
+        # stop accepting new connections while max_connections are open
+        slots = asyncio.Semaphore(self.max_connections)
+        connections = set()
         index = 0
-        basic_auth_string = self.create_basic_auth()
-        while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(1800)
-            host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.warning('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=[basic_auth_header],
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
-            index = index + 1
-            logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
-            web_socket_thread.start()
-            logger.info('Both debugger and websocket threads started...')
+        try:
+            while True:
+                await slots.acquire()
+                client, _address = await loop.sock_accept(self.sock)
+                index = index + 1
+                logger.info('Got debugger connection... index: %s', index)
+                connection = loop.create_task(self._serve_client(client, index))
+                connections.add(connection)
+                connection.add_done_callback(connections.discard)
+                connection.add_done_callback(lambda _: slots.release())
+        finally:
+            for connection in connections:
+                connection.cancel()
+            await asyncio.gather(*connections, return_exceptions=True)
+
+    async def _serve_client(self, client, index):
+        loop = asyncio.get_running_loop()
+        client.setblocking(False)
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # websocket-client is blocking, each connection runs its websocket calls on its own threads
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tunnel-{}'.format(index))
+        ws_socket = None
+        directions = []
+        try:
+            ws_socket = await loop.run_in_executor(executor, self._create_web_socket)
+            logger.info('Websocket, connected status: %s, index: %s', ws_socket.connected, index)
             logger.warning('Successfully connected to local server..')
-            debugger_thread.join()
-            web_socket_thread.join()
-            logger.info('Both debugger and websocket threads stopped...')
-            logger.warning('Stopped local server..')
-
-    def _listen_to_web_socket(self, client, ws_socket, index):
+            directions = [loop.create_task(self._listen_to_client(client, ws_socket, executor, index)),
+                          loop.create_task(self._listen_to_web_socket(client, ws_socket, executor, index))]
+            done, _ = await asyncio.wait(directions, return_when=asyncio.FIRST_COMPLETED)
+            for direction in done:
+                if direction.exception() is not None:
+                    logger.warning('Connection %s closed: %s', index, direction.exception())
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Failed to connect to the websocket, index: %s, error: %s', index, ex)
+        finally:
+            for direction in directions:
+                direction.cancel()
+            client.close()
+            if ws_socket is not None:
+                # closing the websocket also unblocks the thread waiting for websocket data
+                await loop.run_in_executor(executor, ws_socket.close)
+            await asyncio.gather(*directions, return_exceptions=True)
+            executor.shutdown(wait=False)
+            logger.info('Stopped connection, index: %s', index)
+
+    async def _listen_to_web_socket(self, client, ws_socket, executor, index):
+        loop = asyncio.get_running_loop()
         while True:
-            try:
-                logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
-                data = ws_socket.recv()
-                logger.info('Received websocket data: %s, index: %s', data, index)
-                if data:
-                    # Set the response to echo back the recieved data
-                    response = data
-                    logger.info('Sending to debugger, response: %s, index: %s', response, index)
-                    client.sendall(response)
-                    logger.info('Done sending to debugger, index: %s', index)
-                else:
-                    logger.info('Client disconnected!, index: %s', index)
-                    client.close()
-                    ws_socket.close()
-                    break
-            except:
-                traceback.print_exc(file=sys.stdout)
-                client.close()
-                ws_socket.close()
-                return False
-
-    def _listen_to_client(self, client, ws_socket, index):
+            data = await loop.run_in_executor(executor, ws_socket.recv)
+            if not data:
+                logger.info('Websocket disconnected, index: %s', index)
+                return
+            logger.debug('Sending %s bytes to debugger, index: %s', len(data), index)
+            # the websocket is not read again until the debugger took all the data
+            await loop.sock_sendall(client, data)
+
+    async def _listen_to_client(self, client, ws_socket, executor, index):
+        loop = asyncio.get_running_loop()
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
         while True:
-            try:
-                logger.info('Waiting for debugger data, index: %s', index)
-                buf = bytearray(4096)
-                nbytes = client.recv_into(buf, 4096)
-                logger.info('Received debugger data, nbytes: %s, index: %s', nbytes, index)
-                if nbytes > 0:
-                    responseData = buf[0:nbytes]
-                    logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
-                    ws_socket.send_binary(responseData)
-                    logger.info('Done sending to websocket, index: %s', index)
-                else:
-                    logger.warning('Client disconnected %s', index)
-                    client.close()
-                    ws_socket.close()
-                    break
-            except:
-                traceback.print_exc(file=sys.stdout)
-                client.close()
-                ws_socket.close()
-                return False
+            nbytes = await asyncio.wait_for(loop.sock_recv_into(client, buf), TUNNEL_IDLE_TIMEOUT)
+            if not nbytes:
+                logger.warning('Client disconnected %s', index)
+                return
+            logger.debug('Sending %s bytes to websocket, index: %s', nbytes, index)
+            # the buffer is only reused, and the debugger read again, once the frame is sent
+            await loop.run_in_executor(executor, ws_socket.send_binary, view[:nbytes])
 
     def start_server(self):
         logger.warning('Start your favorite client and connect to port %s', self.local_port)
-        self._listen()
+        asyncio.run(self._listen())
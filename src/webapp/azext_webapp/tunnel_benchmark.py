@@ -0,0 +1,123 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark of the tunnel engine against a loopback stand-in of the App Service tunnel WebSocket.
+
+Usage: python -m azext_webapp.tunnel_benchmark [--connections 20] [--size-mb 8] [--handshakes 200]
+"""
+
+# pylint: disable=import-outside-toplevel
+import argparse
+import asyncio
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azext_webapp.tunnel import TunnelServer
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class LoopbackWebSocket(object):
+    """Echoes every frame sent to it, holding at most max_frames before blocking the sender."""
+
+    def __init__(self, max_frames=64):
+        self._frames = queue.Queue(maxsize=max_frames)
+        self.connected = True
+
+    def send_binary(self, data):
+        # the tunnel reuses its buffer once the frame is sent
+        self._frames.put(bytes(data))
+
+    def recv(self):
+        while self.connected:
+            try:
+                return self._frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return b''
+
+    def close(self):
+        self.connected = False
+
+
+class LoopbackTunnelServer(TunnelServer):
+    def __init__(self, **kwargs):
+        super(LoopbackTunnelServer, self).__init__('127.0.0.1', 0, 'loopback', 'user', 'password', **kwargs)
+
+    def _create_web_socket(self):
+        return LoopbackWebSocket()
+
+
+def _echo(port, size):
+    with socket.create_connection(('127.0.0.1', port)) as client:
+        def _send():
+            payload = b'x' * _CHUNK_SIZE
+            sent = 0
+            while sent < size:
+                sent += client.send(payload[:size - sent])
+
+        sender = threading.Thread(target=_send)
+        sender.start()
+        received = 0
+        while received < size:
+            data = client.recv(_CHUNK_SIZE)
+            if not data:
+                raise RuntimeError('Tunnel closed after {} of {} bytes'.format(received, size))
+            received += len(data)
+        sender.join()
+    return received
+
+
+def run_benchmark(connections=20, size=8 * 1024 * 1024, handshakes=200):
+    """Returns the throughput in MB/s of `connections` concurrent echoes of `size` bytes and the
+    connections/s of `handshakes` short connections."""
+    import logging
+    logging.getLogger('cli.azext_webapp.tunnel').setLevel(logging.ERROR)
+
+    server = LoopbackTunnelServer()
+    loop = asyncio.new_event_loop()
+    listener = loop.create_task(server._listen())  # pylint: disable=protected-access
+    server_thread = threading.Thread(target=loop.run_until_complete, args=(asyncio.wait([listener]),))
+    server_thread.start()
+    # wait for the server to listen
+    for _ in range(50):
+        try:
+            _echo(server.local_port, 1)
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.1)
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        start = time.perf_counter()
+        total = sum(pool.map(lambda _: _echo(server.local_port, size), range(connections)))
+        throughput = total / (1024 * 1024) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        list(pool.map(lambda _: _echo(server.local_port, 1), range(handshakes)))
+        connection_rate = handshakes / (time.perf_counter() - start)
+
+    # cancelling the listener also closes its connections
+    loop.call_soon_threadsafe(listener.cancel)
+    server_thread.join()
+    loop.close()
+    return throughput, connection_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the webapp tunnel with a loopback websocket.')
+    parser.add_argument('--connections', type=int, default=20, help='Concurrent connections.')
+    parser.add_argument('--size-mb', type=float, default=8, help='Data echoed through each connection, in MB.')
+    parser.add_argument('--handshakes', type=int, default=200, help='Short connections to open.')
+    args = parser.parse_args()
+    throughput, connection_rate = run_benchmark(args.connections, int(args.size_mb * 1024 * 1024), args.handshakes)
+    print('Throughput: {:.1f} MB/s over {} connections'.format(throughput, args.connections))
+    print('Connections: {:.1f} connections/s'.format(connection_rate))
+
+
+if __name__ == '__main__':
+    main()